@@ -4,5 +4,9 @@ set -o errexit
 
 pip install -r requirements.txt
 
-python manage.py collectstatic --no-input
 python manage.py migrate
+python manage.py render_content
+python manage.py rebuild_related_projects
+python manage.py rebuild_related_posts
+python manage.py build_assets
+python manage.py collectstatic --no-input
@@ -1,7 +1,9 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+
+from . import assets
 from .models import (
     PersonalInfo, Skill, Project, Experience, 
-    Education, Certification, Contact, BlogPost
+    Education, Certification, Contact, BlogPost, RateLimitStat
 )
 
 @admin.register(PersonalInfo)
@@ -17,6 +19,17 @@ class SkillAdmin(admin.ModelAdmin):
     search_fields = ['name']
     ordering = ['category', 'order', 'name']
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        missing = assets.missing_icons([obj.icon])
+        if missing:
+            self.message_user(
+                request,
+                f'The built Font Awesome subset lacks {", ".join(sorted(missing))}; pages load '
+                'the complete Font Awesome until manage.py build_assets runs again.',
+                messages.WARNING,
+            )
+
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
     list_display = ['title', 'featured', 'order', 'created_at']
@@ -71,3 +84,15 @@ class BlogPostAdmin(admin.ModelAdmin):
     search_fields = ['title', 'content']
     prepopulated_fields = {'slug': ('title',)}
     readonly_fields = ['created_at', 'updated_at']
+
+@admin.register(RateLimitStat)
+class RateLimitStatAdmin(admin.ModelAdmin):
+    list_display = ['period', 'view_name', 'reason', 'rejected']
+    list_filter = ['reason', 'view_name']
+    date_hierarchy = 'period'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,334 @@
+"""
+Read-only JSON API over the portfolio content, mounted at ``/api/``.
+
+``GET /api/<resource>/`` lists a resource in ``RESOURCES`` and
+``GET /api/<resource>/<id>/`` (``<slug>`` for posts) returns one object,
+both as ``{"data": ...}``. Only published blog posts are exposed.
+
+Query parameters:
+
+* ``fields=id,title``: sparse fieldsets. Listings default to the resource's
+  ``list_fields``, which leave out long bodies; detail responses to every
+  field.
+* ``embed=technologies,related``: related objects inline, with the listing
+  fields of their resource. An embed costs two queries per response, however
+  many rows it covers.
+* ``limit`` (up to ``MAX_LIMIT``) and ``cursor``: keyset pages from
+  ``portfolio.pagination``. Listings carry ``next`` and ``previous`` URLs.
+
+Rows are read with ``values()``, so no model instances are built. Encoded
+responses are cached per URL under the ``api:<resource>`` entries of
+``caching.DEPENDENCIES`` until a model they are read from changes, and
+carry weak ETags and Last-Modified headers from the same model versions
+(see ``portfolio.conditional``). Reads go to the replica when there is one
+(see ``portfolio.db_router``).
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import FileField
+from django.http import HttpResponse, JsonResponse
+from django.urls import path, reverse
+from django.views.decorators.http import require_safe
+
+from . import caching, conditional
+from .db_router import replica_reads
+from .models import (
+    BlogPost, Certification, Education, Experience, PersonalInfo, Project, ProjectSimilarity,
+    RelatedPost, Skill,
+)
+from .pagination import BLOG_ORDERING, PROJECT_ORDERING, CursorPaginator, InvalidCursor
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 1000
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class Embed:
+    """
+    Objects of another resource listed under each row. ``links(pks)`` yields
+    ``(row pk, embedded pk)`` pairs in display order; with ``target_order``
+    the embedded objects follow their own resource's ordering instead.
+    """
+
+    def __init__(self, resource, links, target_order=False):
+        self.resource = resource
+        self.links = links
+        self.target_order = target_order
+
+    @classmethod
+    def many_to_many(cls, resource, model, name):
+        field = model._meta.get_field(name)
+        through = field.remote_field.through
+        source = f'{field.m2m_field_name()}_id'
+        target = f'{field.m2m_reverse_field_name()}_id'
+
+        def links(pks):
+            return through.objects.filter(**{f'{source}__in': pks}).values_list(source, target)
+        return cls(resource, links, target_order=True)
+
+    def load(self, pks):
+        """{row pk: [embedded objects]}"""
+        links = list(self.links(pks))
+        target = RESOURCES[self.resource]
+        rows = target.rows(target.list_fields, pk__in={pk for _, pk in links})
+        position = {row['id']: index for index, row in enumerate(rows)}
+        objects = dict(zip(position, target.serialize(rows, target.list_fields)))
+        if self.target_order:
+            links.sort(key=lambda link: position.get(link[1], -1))
+        embedded = {pk: [] for pk in pks}
+        for pk, target_pk in links:
+            if target_pk in objects:
+                embedded[pk].append(objects[target_pk])
+        return embedded
+
+
+class Resource:
+    """One model exposed by the API"""
+
+    def __init__(self, queryset, fields, ordering, list_fields=None, lookup='pk', embeds=None):
+        self.queryset = queryset
+        self.model = queryset.model
+        self.fields = fields
+        self.list_fields = list_fields or fields
+        self.ordering = ordering
+        self.lookup = lookup
+        self.embeds = embeds or {}
+        self.files = {
+            name: self.model._meta.get_field(name).storage
+            for name in fields if isinstance(self.model._meta.get_field(name), FileField)
+        }
+
+    def _select(self, fields):
+        """Fields to read: the requested ones, the ordering and the pk"""
+        ordering = [name.lstrip('-') for name in self.ordering]
+        keys = ['id', *('id' if name == 'pk' else name for name in ordering)]
+        return [*fields, *(key for key in dict.fromkeys(keys) if key not in fields)]
+
+    def values(self, fields):
+        return self.queryset.order_by(*self.ordering).values(*self._select(fields))
+
+    def rows(self, fields, **filters):
+        return list(self.values(fields).filter(**filters))
+
+    def serialize(self, rows, fields, embeds=()):
+        """Shape ``rows`` (values() dicts) in place into API objects"""
+        if not rows:
+            return rows
+        for name in embeds:
+            embedded = self.embeds[name].load([row['id'] for row in rows])
+            for row in rows:
+                row[name] = embedded[row['id']]
+        files = [(name, storage) for name, storage in self.files.items() if name in fields]
+        extra = set(rows[0]) - set(fields) - set(embeds)
+        for row in rows:
+            for name, storage in files:
+                row[name] = storage.url(row[name]) if row[name] else None
+            for key in extra:
+                del row[key]
+        return rows
+
+
+RESOURCES = {
+    'profile': Resource(
+        PersonalInfo.objects.all(),
+        fields=[
+            'id', 'name', 'title', 'email', 'phone', 'location', 'linkedin', 'github', 'website',
+            'profile_picture', 'about_me', 'summary', 'updated_at',
+        ],
+        ordering=('pk',),
+    ),
+    'skills': Resource(
+        Skill.objects.all(),
+        fields=['id', 'name', 'category', 'proficiency', 'icon', 'order'],
+        ordering=('category', 'order', 'name', 'pk'),
+    ),
+    'projects': Resource(
+        Project.objects.all(),
+        fields=[
+            'id', 'title', 'short_description', 'description', 'description_html', 'image',
+            'github_url', 'live_url', 'featured', 'order', 'word_count', 'reading_time',
+            'created_at', 'updated_at',
+        ],
+        list_fields=[
+            'id', 'title', 'short_description', 'image', 'github_url', 'live_url', 'featured',
+            'reading_time', 'created_at', 'updated_at',
+        ],
+        ordering=PROJECT_ORDERING,
+        embeds={
+            'technologies': Embed.many_to_many('skills', Project, 'technologies'),
+            'related': Embed('projects', lambda pks: ProjectSimilarity.objects.filter(
+                project_id__in=pks,
+            ).order_by('project_id', 'rank').values_list('project_id', 'neighbour_id')),
+        },
+    ),
+    'experience': Resource(
+        Experience.objects.all(),
+        fields=[
+            'id', 'company', 'position', 'location', 'start_date', 'end_date', 'current',
+            'description', 'achievements', 'order',
+        ],
+        ordering=('-start_date', 'order', 'pk'),
+        embeds={'technologies': Embed.many_to_many('skills', Experience, 'technologies_used')},
+    ),
+    'education': Resource(
+        Education.objects.all(),
+        fields=[
+            'id', 'institution', 'degree', 'field_of_study', 'start_date', 'end_date', 'current',
+            'gpa', 'description', 'order',
+        ],
+        ordering=('-start_date', 'order', 'pk'),
+    ),
+    'certifications': Resource(
+        Certification.objects.all(),
+        fields=[
+            'id', 'name', 'issuing_organization', 'issue_date', 'expiry_date', 'credential_id',
+            'credential_url', 'image', 'order',
+        ],
+        ordering=('-issue_date', 'order', 'pk'),
+    ),
+    'posts': Resource(
+        BlogPost.objects.filter(published=True),
+        fields=[
+            'id', 'slug', 'title', 'excerpt', 'summary', 'content', 'content_html', 'image',
+            'word_count', 'reading_time', 'created_at', 'updated_at',
+        ],
+        list_fields=[
+            'id', 'slug', 'title', 'summary', 'image', 'reading_time', 'created_at', 'updated_at',
+        ],
+        ordering=BLOG_ORDERING,
+        lookup='slug',
+        embeds={
+            'related': Embed('posts', lambda pks: RelatedPost.objects.filter(
+                post_id__in=pks,
+            ).order_by('post_id', 'rank').values_list('post_id', 'related_id')),
+        },
+    ),
+}
+
+
+def _resource(name):
+    try:
+        return RESOURCES[name]
+    except KeyError:
+        raise ApiError(f'Unknown resource {name!r}', status=404) from None
+
+
+def _names(request, parameter, allowed, default):
+    value = request.GET.get(parameter)
+    if value is None:
+        return list(default)
+    names = list(dict.fromkeys(part.strip() for part in value.split(',') if part.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ApiError(f'Unknown {parameter} {", ".join(unknown)}; choose from {", ".join(allowed)}')
+    return names
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(f'limit must be a number from 1 to {MAX_LIMIT}')
+    return limit
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={'separators': (',', ':')})
+
+
+def _encode(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+
+
+def _validators(request, resource, key=None):
+    if resource not in RESOURCES:
+        return None
+    return conditional.page_validators(f'api:{resource}')(request)
+
+
+def _list_body(request, resource):
+    fields = _names(request, 'fields', resource.fields, resource.list_fields)
+    embeds = _names(request, 'embed', resource.embeds, ())
+    paginator = CursorPaginator(resource.values(fields), _limit(request), resource.ordering)
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        raise ApiError('Invalid cursor') from None
+    # Cursors are read from the rows before serialising drops their keys.
+    next_url = _page_url(request, page.next_cursor)
+    previous_url = _page_url(request, page.previous_cursor)
+    return _encode({
+        'data': resource.serialize(page.object_list, fields, embeds),
+        'next': next_url,
+        'previous': previous_url,
+    })
+
+
+def _detail_body(request, resource, key):
+    fields = _names(request, 'fields', resource.fields, resource.fields)
+    embeds = _names(request, 'embed', resource.embeds, ())
+    if resource.lookup == 'pk' and not key.isdigit():
+        raise ApiError('Not found', status=404)
+    rows = resource.rows(fields, **{resource.lookup: key})
+    if not rows:
+        raise ApiError('Not found', status=404)
+    return _encode({'data': resource.serialize(rows, fields, embeds)[0]})
+
+
+@require_safe
+def index(request):
+    """Links to every resource"""
+    return _json({'resources': {
+        name: request.build_absolute_uri(reverse('api:list', args=[name])) for name in RESOURCES
+    }})
+
+
+@require_safe
+@replica_reads
+@conditional.conditional_page(_validators)
+def resource_list(request, resource):
+    """One page of a resource"""
+    try:
+        name, resource = f'api:{resource}', _resource(resource)
+        body = caching.get_or_render(name, lambda: _list_body(request, resource), request.get_full_path())
+    except ApiError as error:
+        return _json({'error': str(error)}, status=error.status)
+    return HttpResponse(body, content_type='application/json')
+
+
+@require_safe
+@replica_reads
+@conditional.conditional_page(_validators)
+def resource_detail(request, resource, key):
+    """One object of a resource, by id (or slug for posts)"""
+    try:
+        name, resource = f'api:{resource}', _resource(resource)
+        body = caching.get_or_render(name, lambda: _detail_body(request, resource, key), request.get_full_path())
+    except ApiError as error:
+        return _json({'error': str(error)}, status=error.status)
+    return HttpResponse(body, content_type='application/json')
+
+
+app_name = 'api'
+
+urlpatterns = [
+    path('', index, name='index'),
+    path('<str:resource>/', resource_list, name='list'),
+    path('<str:resource>/<str:key>/', resource_detail, name='detail'),
+]
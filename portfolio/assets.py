@@ -0,0 +1,426 @@
+"""
+Front-end asset bundles.
+
+``manage.py build_assets`` downloads the pinned front-end libraries once,
+cuts them down to what the site uses and writes minified bundles to
+``PORTFOLIO_BUILD_DIR/static``, which is a static files directory:
+
+* Font Awesome keeps only the CSS rules and glyphs of the ``fa-*`` classes
+  found in templates, static JavaScript, skill icons stored in the database
+  and ``PORTFOLIO_EXTRA_ICONS``. Glyph subsetting needs fontTools; without
+  it the complete fonts are used. Skill icons saved after the build may be
+  missing from the subset: pages then also link the complete Font Awesome
+  CSS from the CDN (``{% font_awesome_fallback %}``) until the next build.
+* Inter keeps the weights used by our CSS, templates and Bootstrap, in the
+  ``INTER_SUBSETS`` scripts only.
+* ``BUNDLES`` are concatenated and minified into ``bundles/<name>``.
+
+``collectstatic`` then fingerprints and compresses the bundles (see
+``STORAGES``) and WhiteNoise serves them with far-future cache headers.
+
+The ``{% asset_bundle %}`` tag in ``portfolio_assets`` links a bundle, or its
+individual sources when the build has not run, using the public CDNs for
+libraries that have not been downloaded. Development works without a build.
+"""
+import functools
+import json
+import posixpath
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+BOOTSTRAP_VERSION = '5.3.0'
+FONT_AWESOME_VERSION = '6.4.0'
+
+BOOTSTRAP_FILES = {
+    'vendor/bootstrap/bootstrap.min.css':
+        f'https://cdn.jsdelivr.net/npm/bootstrap@{BOOTSTRAP_VERSION}/dist/css/bootstrap.min.css',
+    'vendor/bootstrap/bootstrap.bundle.min.js':
+        f'https://cdn.jsdelivr.net/npm/bootstrap@{BOOTSTRAP_VERSION}/dist/js/bootstrap.bundle.min.js',
+}
+FONT_AWESOME_URL = f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/{FONT_AWESOME_VERSION}'
+FONT_AWESOME_CSS = 'vendor/fontawesome/fontawesome.css'
+# fa-* classes the built subset has rules for, written next to it.
+FONT_AWESOME_ICONS = 'vendor/fontawesome/icons.json'
+FONT_AWESOME_FONTS = ('fa-solid-900', 'fa-regular-400', 'fa-brands-400')
+# Classes every icon needs, besides the fa-<icon> and modifier classes in use.
+FONT_AWESOME_BASE_CLASSES = {
+    'fa', 'fas', 'far', 'fab', 'fa-solid', 'fa-regular', 'fa-brands', 'fa-classic',
+}
+
+INTER_URL = 'https://fonts.googleapis.com/css2?family=Inter:wght@{weights}&display=swap'
+INTER_CSS = 'vendor/inter/inter.css'
+INTER_SUBSETS = ('latin', 'latin-ext')
+# Weights Bootstrap's own rules use: body text, headings and <strong>/badges.
+BOOTSTRAP_WEIGHTS = {400, 500, 700}
+
+# Where each vendored file comes from when the build has not run.
+CDN_FALLBACKS = {
+    **BOOTSTRAP_FILES,
+    FONT_AWESOME_CSS: f'{FONT_AWESOME_URL}/css/all.min.css',
+    INTER_CSS: INTER_URL.format(weights='300;400;500;600;700'),
+}
+
+BUNDLE_DIR = 'bundles'
+BUNDLES = {
+    'site.css': [
+        'vendor/bootstrap/bootstrap.min.css',
+        FONT_AWESOME_CSS,
+        INTER_CSS,
+        'css/style.css',
+    ],
+    'site.js': [
+        'vendor/bootstrap/bootstrap.bundle.min.js',
+        'js/main.js',
+    ],
+    'about.css': ['css/pages/about.css'],
+    'blog.css': ['css/pages/blog.css'],
+    'blog_detail.css': ['css/pages/blog_detail.css'],
+    'contact.css': ['css/pages/contact.css'],
+    'project_detail.css': ['css/pages/project_detail.css'],
+    'projects.css': ['css/pages/projects.css'],
+    'skills.css': ['css/pages/skills.css'],
+    'blog.js': ['js/pages/blog.js'],
+    'contact.js': ['js/pages/contact.js'],
+    'skills.js': ['js/pages/skills.js'],
+    'share.js': ['js/share.js'],
+}
+
+_SOURCE_MAP_RE = re.compile(r'/\*# sourceMappingURL=.*?\*/|^//# sourceMappingURL=.*$', re.M)
+_URL_RE = re.compile(r'''url\(\s*(['"]?)(?!data:|https?:|/|#)([^'")]+)\1\s*\)''')
+_CLASS_RE = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+_GLYPH_RE = re.compile(r'''(?:content|--fa)\s*:\s*["']\\([0-9a-fA-F]+)["']''')
+_JS_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+# Elements whose content is left alone (pre, textarea) or minified as CSS/JS.
+_HTML_RAW_RE = re.compile(r'(<(pre|textarea|script|style)\b([^>]*)>)(.*?)(</\2\s*>)', re.S | re.I)
+_HTML_COMMENT_RE = re.compile(r'<!--(?!\[if|<!|>).*?-->', re.S)
+_HTML_SPACE_RE = re.compile(r'\s+')
+_SCRIPT_TYPE_RE = re.compile(r'''\btype\s*=\s*["']?([^"'\s>]+)''', re.I)
+
+
+def build_dir():
+    return settings.PORTFOLIO_BUILD_DIR / 'static'
+
+
+@functools.lru_cache(maxsize=None)
+def _collected(path):
+    return staticfiles_storage.exists(path)
+
+
+def is_available(path):
+    """Whether a static file exists (built, vendored or in static/)"""
+    if settings.DEBUG:
+        return finders.find(path) is not None
+    return _collected(path)
+
+
+def bundle_urls(name):
+    """URLs to link for a bundle: the built bundle, else its sources"""
+    built = f'{BUNDLE_DIR}/{name}'
+    if is_available(built):
+        return [static(built)]
+    return [
+        CDN_FALLBACKS[source] if source in CDN_FALLBACKS and not is_available(source) else static(source)
+        for source in BUNDLES[name]
+    ]
+
+
+def strip_source_maps(text):
+    return _SOURCE_MAP_RE.sub('', text)
+
+
+def rebase_urls(css, source, target):
+    """Rewrite relative url()s in ``source`` so they resolve from ``target``"""
+    source_dir = posixpath.dirname(source)
+    target_dir = posixpath.dirname(target)
+
+    def rebase(match):
+        path = posixpath.normpath(posixpath.join(source_dir, match.group(2).strip()))
+        return f'url("{posixpath.relpath(path, target_dir or ".")}")'
+
+    return _URL_RE.sub(rebase, css)
+
+
+def _skip_string(text, start):
+    """Index just past the quoted string (or template literal) at ``start``"""
+    quote = text[start]
+    index = start + 1
+    while index < len(text) and text[index] != quote:
+        index += 2 if text[index] == '\\' else 1
+    return index + 1
+
+
+def minify_css(text):
+    """Drop comments (except /*! licences) and redundant whitespace"""
+    if rcssmin is not None:
+        return rcssmin.cssmin(text, keep_bang_comments=True)
+    out = []
+    index, length = 0, len(text)
+    pending_space = False
+    while index < length:
+        char = text[index]
+        if text.startswith('/*', index):
+            end = text.find('*/', index + 2)
+            end = length if end < 0 else end + 2
+            if text.startswith('/*!', index):
+                out.append(text[index:end] + '\n')
+            index = end
+            continue
+        if char.isspace():
+            pending_space = True
+            index += 1
+            continue
+        if pending_space and out and out[-1][-1:] not in '{};,>~(:\n' and char not in '{};,>~)':
+            out.append(' ')
+        pending_space = False
+        if char in '"\'':
+            end = _skip_string(text, index)
+            out.append(text[index:end])
+            index = end
+            continue
+        if char == '}' and out and out[-1] == ';':
+            out.pop()
+        out.append(char)
+        index += 1
+    return ''.join(out).strip() + '\n'
+
+
+def minify_js(text):
+    """
+    Drop comments, indentation and blank lines. Lines are never joined, so
+    automatic semicolon insertion is unaffected.
+    """
+    if rjsmin is not None:
+        return rjsmin.jsmin(text, keep_bang_comments=True)
+    out = []
+    index, length = 0, len(text)
+    last = ''
+    while index < length:
+        char = text[index]
+        if char in '"\'`':
+            end = _skip_string(text, index)
+            out.append(text[index:end])
+            last, index = char, end
+        elif text.startswith('//', index):
+            end = text.find('\n', index)
+            index = length if end < 0 else end
+        elif text.startswith('/*', index):
+            end = text.find('*/', index + 2)
+            index = length if end < 0 else end + 2
+            if not out or out[-1] != ' ':
+                out.append(' ')
+        elif char == '/' and (not last or last in _JS_REGEX_PRECEDERS):
+            # A regular expression literal; '/' inside a [class] does not end it.
+            end, in_class = index + 1, False
+            while end < length and (in_class or text[end] != '/') and text[end] != '\n':
+                if text[end] == '\\':
+                    end += 1
+                elif text[end] == '[':
+                    in_class = True
+                elif text[end] == ']':
+                    in_class = False
+                end += 1
+            out.append(text[index:end + 1])
+            last, index = '/', end + 1
+        elif char.isspace():
+            end = index
+            while end < length and text[end].isspace():
+                end += 1
+            if '\n' in text[index:end]:
+                if out and out[-1] != '\n':
+                    if out[-1] == ' ':
+                        out.pop()
+                    out.append('\n')
+            elif out and out[-1] not in (' ', '\n'):
+                out.append(' ')
+            index = end
+        else:
+            out.append(char)
+            last, index = char, index + 1
+    return ''.join(out).strip() + '\n'
+
+
+def _minify_html_text(text):
+    text = _HTML_COMMENT_RE.sub('', text)
+    # Runs of whitespace render as one space between inline elements, so
+    # they are collapsed rather than dropped.
+    return _HTML_SPACE_RE.sub(lambda match: '\n' if '\n' in match.group() else ' ', text)
+
+
+def _minify_html_element(match):
+    start, tag, attributes, content, end = match.groups()
+    tag = tag.lower()
+    if tag == 'style':
+        content = minify_css(content).strip()
+    elif tag == 'script' and content.strip():
+        script_type = _SCRIPT_TYPE_RE.search(attributes)
+        if script_type is None or script_type.group(1).lower() in ('text/javascript', 'module'):
+            content = minify_js(content).strip()
+    return _minify_html_text(start) + content + end
+
+
+def minify_html(html):
+    """
+    Drop comments and collapse whitespace, leaving ``<pre>`` and
+    ``<textarea>`` as they are and minifying inline styles and scripts.
+    """
+    out = []
+    position = 0
+    for match in _HTML_RAW_RE.finditer(html):
+        out.append(_minify_html_text(html[position:match.start()]))
+        out.append(_minify_html_element(match))
+        position = match.end()
+    out.append(_minify_html_text(html[position:]))
+    return ''.join(out).strip() + '\n'
+
+
+def split_rules(css):
+    """Top-level ``(prelude, body)`` pairs of a comment-free stylesheet"""
+    rules = []
+    depth = start = prelude_end = 0
+    index = 0
+    while index < len(css):
+        char = css[index]
+        if char in '"\'':
+            index = _skip_string(css, index)
+            continue
+        if char == '{':
+            if depth == 0:
+                prelude_end = index
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                rules.append((css[start:prelude_end].strip(), css[prelude_end + 1:index]))
+                start = index + 1
+        index += 1
+    return rules
+
+
+def _keep_selector(selector, classes):
+    return all(name in classes for name in _CLASS_RE.findall(selector))
+
+
+def _filter_rules(css, classes):
+    kept = []
+    for prelude, body in split_rules(css):
+        if prelude.startswith(('@media', '@supports')):
+            inner = _filter_rules(body, classes)
+            if inner:
+                kept.append(f'{prelude}{{{"".join(inner)}}}')
+        elif prelude.startswith('@'):
+            kept.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = [s.strip() for s in prelude.split(',') if _keep_selector(s, classes)]
+            if selectors:
+                kept.append(f'{",".join(selectors)}{{{body}}}')
+    return kept
+
+
+def subset_font_awesome(css, used_classes, font_extension='woff2'):
+    """
+    Cut Font Awesome's all.css down to ``used_classes``. Returns the CSS,
+    which expects its fonts in ``webfonts/<font>.<font_extension>``, and the
+    code points the remaining icons need.
+    """
+    licence = re.match(r'\s*(/\*!.*?\*/)', css, re.S)
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    classes = FONT_AWESOME_BASE_CLASSES | set(used_classes)
+
+    kept, keyframes = [], []
+    for rule in _filter_rules(css, classes):
+        prelude = rule[:rule.index('{')]
+        if prelude.startswith('@font-face'):
+            match = re.search(r'(%s)\.(?:woff2|ttf)' % '|'.join(FONT_AWESOME_FONTS), rule)
+            if match and 'Font Awesome 6' in rule:
+                rule = re.sub(
+                    r'src:[^;}]*',
+                    f'src:url(webfonts/{match.group(1)}.{font_extension}) format("{font_extension}")',
+                    rule,
+                )
+                kept.append(rule)
+        elif 'keyframes' in prelude:
+            keyframes.append((prelude.split()[-1], rule))
+        else:
+            kept.append(rule)
+
+    text = ''.join(kept)
+    # Animations are only kept if a remaining rule refers to them.
+    text += ''.join(rule for name, rule in keyframes if name in text)
+    codepoints = {int(value, 16) for value in _GLYPH_RE.findall(text)}
+    header = licence.group(1) + '\n' if licence else ''
+    return header + text + '\n', codepoints
+
+
+def subset_font(source, target, codepoints, flavor='woff2'):
+    """Keep only ``codepoints`` of a font; returns False if fontTools is missing"""
+    try:
+        from fontTools import subset
+    except ImportError:
+        return False
+    options = subset.Options()
+    options.flavor = flavor
+    options.layout_features = ['*']
+    font = subset.load_font(source, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    subset.save_font(font, target, options)
+    return True
+
+
+def font_weights(texts):
+    """Font weights used by stylesheets and templates, plus Bootstrap's own"""
+    weights = set(BOOTSTRAP_WEIGHTS)
+    keywords = {'normal': 400, 'bold': 700, 'bolder': 700, 'lighter': 300}
+    classes = {
+        'fw-light': 300, 'fw-lighter': 300, 'fw-normal': 400, 'fw-medium': 500,
+        'fw-semibold': 600, 'fw-bold': 700, 'fw-bolder': 700, 'lead': 300, 'display': 300,
+    }
+    for text in texts:
+        for value in re.findall(r'font-weight\s*:\s*(\d{3}|[a-z]+)', text):
+            weights.add(int(value) if value.isdigit() else keywords.get(value, 400))
+        for name in re.findall(r'\b(fw-[a-z]+|lead|display)(?:-\d)?\b', text):
+            if name in classes:
+                weights.add(classes[name])
+    return sorted(weight for weight in weights if 100 <= weight <= 900)
+
+
+def icon_classes(texts):
+    """``fa-*`` class names mentioned in templates, scripts or stored icons"""
+    classes = set()
+    for text in texts:
+        classes.update(re.findall(r'\bfa-[a-z0-9]+(?:-[a-z0-9]+)*', text))
+    return classes
+
+
+@functools.lru_cache(maxsize=None)
+def font_awesome_subset():
+    """``fa-*`` classes kept by the last ``build_assets``, or None before one"""
+    if not is_available(FONT_AWESOME_ICONS):
+        return None
+    path = finders.find(FONT_AWESOME_ICONS) if settings.DEBUG else None
+    with open(path, 'rb') if path else staticfiles_storage.open(FONT_AWESOME_ICONS) as file:
+        return frozenset(json.load(file))
+
+
+def missing_icons(texts):
+    """``fa-*`` classes in ``texts`` that the built Font Awesome subset lacks"""
+    subset = font_awesome_subset()
+    if subset is None:
+        # Without a build the complete CSS is linked anyway.
+        return set()
+    return icon_classes(texts) - subset
@@ -0,0 +1,341 @@
+"""
+A cache shared by every worker on one host, in a SQLite file.
+
+``SQLiteCache`` keeps entries in one table of the file at ``LOCATION``, so
+gunicorn workers warm one cache and see each other's invalidations (the
+model versions of ``portfolio.caching``) without a cache server. Each thread
+opens its own connection in WAL mode, so reads never wait for a write.
+
+* Writes are single statements: ``add`` inserts only over a missing or
+  expired row, and ``incr`` and ``incr_version`` update in place, so
+  version counters and locks are atomic across workers. Integers are stored
+  as SQLite integers for ``incr``; other values are pickled.
+* ``get_or_set`` recomputes a key in one worker at a time. The worker that
+  wins the entry's lock row rebuilds it; the others serve the expired value
+  meanwhile, or wait for the new one when there is none.
+* Before an entry expires, ``get_or_set`` may rebuild it early, with a
+  probability that rises as expiry nears and with how long the value took to
+  compute ("XFetch", ``EARLY_EXPIRY_BETA``; 0 turns it off). Expensive
+  entries are then refreshed before many requests find them expired at once.
+
+Expired rows are kept, as stale values, until the table grows past
+``MAX_ENTRIES``; then expired rows go first, then those closest to expiry.
+
+Hits, misses, stale values served and early rebuilds are counted in process
+and added to the file at most once a second; ``stats()`` reports them with
+the hit ratio (``manage.py cache_stats``).
+"""
+import math
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .sqlite import TUNED_PRAGMAS, apply_pragmas
+
+STATS_KINDS = ('hit', 'miss', 'stale', 'early')
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS cache_entry ('
+    ' key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, cost REAL NOT NULL DEFAULT 0'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_entry_expires ON cache_entry (expires)',
+    'CREATE TABLE IF NOT EXISTS cache_stat (kind TEXT PRIMARY KEY, count INTEGER NOT NULL)',
+]
+
+# Sets between two checks of the table size.
+CULL_INTERVAL = 100
+
+
+def _encode(value):
+    if type(value) is int:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _decode(raw):
+    if isinstance(raw, int):
+        return raw
+    return pickle.loads(raw)
+
+
+class SQLiteCache(BaseCache):
+    """
+    Options, besides Django's: ``LOCK_TIMEOUT`` (seconds a rebuild may hold
+    an entry's lock, default 30), ``EARLY_EXPIRY_BETA`` (default 1) and
+    ``STATS_INTERVAL`` (seconds between writes of the counters, default 1).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = Path(location)
+        self._lock_timeout = float(options.get('LOCK_TIMEOUT', 30))
+        self._beta = float(options.get('EARLY_EXPIRY_BETA', 1))
+        self._stats_interval = float(options.get('STATS_INTERVAL', 1))
+        self._local = threading.local()
+        self._pending = Counter()
+        self._pending_lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+        self._sets = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        # A new thread, or a worker forked from the process that opened it.
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self._path, timeout=5, isolation_level=None, check_same_thread=False)
+        apply_pragmas(connection, TUNED_PRAGMAS)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    # Counters
+
+    def _count(self, kind, count=1):
+        with self._pending_lock:
+            self._pending[kind] += count
+            due = time.monotonic() - self._flushed_at >= self._stats_interval
+        if due:
+            self._flush_stats()
+
+    def _flush_stats(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, Counter()
+            self._flushed_at = time.monotonic()
+        if pending:
+            self._connection().executemany(
+                'INSERT INTO cache_stat (kind, count) VALUES (?, ?) '
+                'ON CONFLICT (kind) DO UPDATE SET count = count + excluded.count',
+                list(pending.items()),
+            )
+
+    def stats(self):
+        """Counts of every kind in ``STATS_KINDS``, shared by all workers, and the hit ratio"""
+        self._flush_stats()
+        report = dict.fromkeys(STATS_KINDS, 0)
+        report.update(self._connection().execute('SELECT kind, count FROM cache_stat'))
+        served = report['hit'] + report['stale']
+        lookups = served + report['miss'] + report['early']
+        report['hit_ratio'] = served / lookups if lookups else None
+        return report
+
+    def reset_stats(self):
+        with self._pending_lock:
+            self._pending.clear()
+        self._connection().execute('DELETE FROM cache_stat')
+
+    # Rows
+
+    def _read(self, key):
+        """``(value, expires, cost)`` of a row, expired or not, or None"""
+        row = self._connection().execute(
+            'SELECT value, expires, cost FROM cache_entry WHERE key = ?', [key],
+        ).fetchone()
+        if row is None:
+            return None
+        return _decode(row[0]), row[1], row[2]
+
+    def _write(self, key, value, expires, cost=0.0):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cache_entry (key, value, expires, cost) VALUES (?, ?, ?, ?)',
+            [key, _encode(value), expires, cost],
+        )
+        self._sets += 1
+        if self._sets % CULL_INTERVAL == 0:
+            self._cull()
+
+    def _insert(self, key, value, expires, now):
+        """Insert a row unless a live one exists; returns whether it did"""
+        cursor = self._connection().execute(
+            'INSERT INTO cache_entry (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires, cost = 0 '
+            'WHERE cache_entry.expires IS NOT NULL AND cache_entry.expires <= ?',
+            [key, _encode(value), expires, now],
+        )
+        return cursor.rowcount == 1
+
+    def _cull(self):
+        connection = self._connection()
+        (count,) = connection.execute('SELECT COUNT(*) FROM cache_entry').fetchone()
+        if count <= self._max_entries:
+            return
+        connection.execute('DELETE FROM cache_entry WHERE expires <= ?', [time.time()])
+        (count,) = connection.execute('SELECT COUNT(*) FROM cache_entry').fetchone()
+        if count > self._max_entries:
+            # Rows without an expiry sort last.
+            connection.execute(
+                'DELETE FROM cache_entry WHERE key IN ('
+                ' SELECT key FROM cache_entry ORDER BY expires IS NULL, expires LIMIT ?'
+                ')',
+                [max(1, count // self._cull_frequency) if self._cull_frequency else count],
+            )
+
+    @staticmethod
+    def _live(expires, now):
+        return expires is None or expires > now
+
+    # Django's cache API
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._read(key)
+        if row is None or not self._live(row[1], time.time()):
+            self._count('miss')
+            return default
+        self._count('hit')
+        return row[0]
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not keys:
+            return {}
+        now = time.time()
+        placeholders = ', '.join('?' * len(keys))
+        rows = self._connection().execute(
+            f'SELECT key, value, expires FROM cache_entry WHERE key IN ({placeholders})', list(keys),
+        )
+        found = {keys[key]: _decode(value) for key, value, expires in rows if self._live(expires, now)}
+        self._count('hit', len(found))
+        self._count('miss', len(keys) - len(found))
+        return found
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute('SELECT expires FROM cache_entry WHERE key = ?', [key]).fetchone()
+        return row is not None and self._live(row[0], time.time())
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._write(key, value, self.get_backend_timeout(timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        for key, value in data.items():
+            self.set(key, value, timeout, version=version)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._insert(key, value, self.get_backend_timeout(timeout), time.time())
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            'UPDATE cache_entry SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            [self.get_backend_timeout(timeout), key, time.time()],
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute('DELETE FROM cache_entry WHERE key = ?', [key])
+        return cursor.rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            self._connection().execute(
+                f'DELETE FROM cache_entry WHERE key IN ({", ".join("?" * len(keys))})', keys,
+            )
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            'UPDATE cache_entry SET value = value + ? '
+            "WHERE key = ? AND (expires IS NULL OR expires > ?) AND typeof(value) = 'integer' "
+            'RETURNING value',
+            [delta, key, time.time()],
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Key '{key}' not found")
+        return row[0]
+
+    def incr_version(self, key, delta=1, version=None):
+        if version is None:
+            version = self.version
+        old = self.make_and_validate_key(key, version=version)
+        new = self.make_and_validate_key(key, version=version + delta)
+        moved = self._connection().execute(
+            'UPDATE OR REPLACE cache_entry SET key = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            [new, old, time.time()],
+        ).rowcount
+        if not moved:
+            raise ValueError(f"Key '{key}' not found")
+        return version + delta
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entry')
+
+    def close(self, **kwargs):
+        # Connections stay open for the life of the thread.
+        pass
+
+    # Single flight
+
+    def _refresh_early(self, expires, cost, now):
+        if expires is None or not self._beta or not cost:
+            return False
+        return cost * self._beta * -math.log(1 - random.random()) >= expires - now
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        The value of ``key``, computing it from ``default`` (a callable or a
+        value) when missing, expired or due for an early refresh. Only one
+        worker computes a key at a time.
+        """
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        row = self._read(key)
+        live = row is not None and self._live(row[1], now)
+        if live and not self._refresh_early(row[1], row[2], now):
+            self._count('hit')
+            return row[0]
+
+        lock = f'{key}:lock'
+        if self._insert(lock, 1, now + self._lock_timeout, now):
+            self._count('early' if live else 'miss')
+            return self._compute(key, lock, default, timeout, seen=row)
+        if row is not None:
+            # Another worker is computing it; serve what there is.
+            self._count('hit' if live else 'stale')
+            return row[0]
+
+        deadline = time.monotonic() + self._lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.02)
+            now = time.time()
+            row = self._read(key)
+            if row is not None and self._live(row[1], now):
+                self._count('hit')
+                return row[0]
+            if self._insert(lock, 1, now + self._lock_timeout, now):
+                # The other worker failed; compute it here.
+                self._count('miss')
+                return self._compute(key, lock, default, timeout, seen=row)
+        self._count('miss')
+        return self._compute(key, None, default, timeout)
+
+    def _compute(self, key, lock, default, timeout, seen=None):
+        try:
+            if lock is not None:
+                # Another worker may have written the entry and released its
+                # lock between reading ``seen`` and taking the lock here.
+                row = self._read(key)
+                if row is not None and self._live(row[1], time.time()) and (seen is None or row[1:] != seen[1:]):
+                    return row[0]
+            started = time.monotonic()
+            value = default() if callable(default) else default
+            if value is not None:
+                self._write(key, value, self.get_backend_timeout(timeout), time.monotonic() - started)
+            return value
+        finally:
+            if lock is not None:
+                self._connection().execute('DELETE FROM cache_entry WHERE key = ?', [lock])
@@ -0,0 +1,375 @@
+"""
+Dependency-tracked caching for whole pages and template fragments.
+
+Every cacheable page or fragment is registered in ``DEPENDENCIES`` with the
+models it is rendered from. Each model has a version number stored in the
+cache, and cache keys embed the versions of their dependencies. Saving or
+deleting a model (see ``portfolio.signals``) bumps its version, which makes
+exactly the entries that depend on it unreachable; they then expire on their
+own. Versions are bumped once the change commits, so no entry is ever stored
+under a new version from rows read before the commit.
+
+``cache_page`` stores whole pages minified, with gzip and (when the
+``brotli`` package is installed) Brotli bodies next to the plain one. Keys
+embed the versions, so a page is minified and compressed once per version of
+its dependencies, and hits are answered in the client's preferred coding with
+``Vary: Accept-Encoding``.
+
+Each model also has a last-modified time in the cache, set when its version
+is bumped, which ``portfolio.conditional`` turns into Last-Modified headers.
+
+Hits, misses and invalidations are counted per entry in the cache as well, so
+``manage.py cache_stats`` can report them.
+"""
+import functools
+import gzip
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from . import assets
+from .models import (
+    PersonalInfo, Skill, Project, Experience,
+    Education, Certification, Contact, BlogPost,
+    ProjectSimilarity, RelatedPost
+)
+
+# Cached entry or conditionally served page -> models it is rendered from.
+DEPENDENCIES = {
+    # Every page shows the site profile in its footer.
+    'page:home': [PersonalInfo, Skill, Project, Experience, Education, Certification],
+    'page:about': [PersonalInfo, Skill, Experience, Education, Certification],
+    'page:skills': [PersonalInfo, Skill],
+    'page:projects': [PersonalInfo, Project, Skill],
+    'page:blog': [PersonalInfo, BlogPost],
+    'page:contact': [PersonalInfo],
+    # Detail pages list neighbours from the related-project and related-post
+    # indexes, which are refreshed after the save that changes them.
+    'page:project_detail': [PersonalInfo, Project, Skill, ProjectSimilarity],
+    'page:blog_detail': [PersonalInfo, BlogPost, RelatedPost],
+    'api:profile': [PersonalInfo],
+    'api:skills': [Skill],
+    # ``embed=related`` reads the same indexes as the detail pages.
+    'api:projects': [Project, Skill, ProjectSimilarity],
+    'api:experience': [Experience, Skill],
+    'api:education': [Education],
+    'api:certifications': [Certification],
+    'api:posts': [BlogPost, RelatedPost],
+    'fragment:home_skills': [Skill],
+    'fragment:home_projects': [Project, Skill],
+    'fragment:home_experience': [Experience],
+    'fragment:skills_grid': [Skill],
+    'fragment:experience_timeline': [Experience, Skill],
+    'fragment:education_list': [Education],
+    'fragment:certifications_list': [Certification],
+}
+
+TRACKED_MODELS = [
+    PersonalInfo, Skill, Project, Experience, Education, Certification, Contact, BlogPost,
+    ProjectSimilarity, RelatedPost,
+]
+
+KEY_PREFIX = 'portfolio'
+# Content codings of cached pages, in order of preference.
+ENCODINGS = ('br', 'gzip')
+# Longest a worker may take to minify and compress a page before another
+# may try.
+LOCK_TIMEOUT = 30
+STATS_KINDS = ('hit', 'miss', 'invalidation')
+
+
+def _timeout():
+    return getattr(settings, 'PORTFOLIO_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def _version_key(model):
+    return f'{KEY_PREFIX}:version:{model._meta.label_lower}'
+
+
+def _modified_key(model):
+    return f'{KEY_PREFIX}:modified:{model._meta.label_lower}'
+
+
+def dependents(model):
+    """Names of the cached entries that depend on a model"""
+    return [name for name, models in DEPENDENCIES.items() if model in models]
+
+
+def _seed_versions(keys, found):
+    for key in keys:
+        if key not in found:
+            # Seed from the clock rather than 1: if the cache is cleared, a
+            # restarted counter must not reuse a version that was current
+            # before the clear.
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+    return {key: found[key] for key in keys}
+
+
+def versions(models):
+    """Current version of each model, as a {version key: version} dict"""
+    keys = [_version_key(model) for model in models]
+    return _seed_versions(keys, cache.get_many(keys))
+
+
+def _initial_modified(model):
+    """Last-modified time of a model unknown to the cache: its newest row, else now"""
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        latest = model._default_manager.aggregate(latest=Max('updated_at'))['latest']
+        if latest is not None:
+            return latest.timestamp()
+    return time.time()
+
+
+def validators(models):
+    """
+    ``({version key: version}, last modified timestamp)`` of ``models``,
+    read in one cache round trip.
+    """
+    version_keys = [_version_key(model) for model in models]
+    modified_keys = {_modified_key(model): model for model in models}
+    found = cache.get_many(version_keys + list(modified_keys))
+    modified = 0
+    for key, model in modified_keys.items():
+        if key not in found:
+            cache.add(key, _initial_modified(model), timeout=None)
+            found[key] = cache.get(key)
+        modified = max(modified, found[key])
+    return _seed_versions(version_keys, found), modified
+
+
+def bump(model):
+    """Invalidate every cached entry that depends on ``model``"""
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+    cache.set(_modified_key(model), time.time(), timeout=None)
+    for name in dependents(model):
+        stats.record(name, 'invalidation')
+
+
+def bump_on_commit(model, using=DEFAULT_DB_ALIAS):
+    """
+    Bump ``model`` once the current transaction commits (at once outside
+    one), once however many changes it holds. Bumping before the commit
+    would let a request in between cache the old rows under the new version.
+    """
+    pending = connections[using].run_on_commit
+    if any(getattr(func, 'bumps', None) is model for _, func, _ in pending):
+        return
+
+    def run():
+        bump(model)
+    run.bumps = model
+    transaction.on_commit(run, using=using)
+
+
+def entry_key(name, *vary_on):
+    """Cache key for an entry at the current versions of its dependencies"""
+    if name not in DEPENDENCIES:
+        raise KeyError(f'No cache dependencies registered for {name!r}')
+    current = versions(DEPENDENCIES[name])
+    parts = [name] + [str(current[key]) for key in sorted(current)] + [str(v) for v in vary_on]
+    digest = hashlib.md5(':'.join(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'{KEY_PREFIX}:entry:{name}:{digest}'
+
+
+class CacheStats:
+    """
+    Per-entry hit, miss and invalidation counters.
+
+    Counts are buffered in process and added to the shared cache at most once
+    a second, so counting does not cost a cache write per request.
+    """
+
+    flush_interval = 1.0
+
+    def __init__(self):
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    @staticmethod
+    def key(name, kind):
+        return f'{KEY_PREFIX}:stats:{kind}:{name}'
+
+    def record(self, name, kind):
+        with self._lock:
+            self._pending[(name, kind)] += 1
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due or kind == 'invalidation':
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        for (name, kind), count in pending.items():
+            key = self.key(name, kind)
+            try:
+                cache.incr(key, count)
+            except ValueError:
+                if not cache.add(key, count, timeout=None):
+                    cache.incr(key, count)
+
+    def report(self):
+        """{entry name: {'hit': n, 'miss': n, 'invalidation': n}}"""
+        self.flush()
+        keys = {self.key(name, kind): (name, kind) for name in DEPENDENCIES for kind in STATS_KINDS}
+        values = cache.get_many(list(keys))
+        report = {name: dict.fromkeys(STATS_KINDS, 0) for name in DEPENDENCIES}
+        for key, value in values.items():
+            name, kind = keys[key]
+            report[name][kind] = value
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._pending.clear()
+        cache.delete_many([self.key(name, kind) for name in DEPENDENCIES for kind in STATS_KINDS])
+
+
+stats = CacheStats()
+
+
+def get_or_render(name, render, *vary_on):
+    """
+    Return the cached value for an entry, rendering and storing it on a miss.
+    With ``portfolio.cache_backends.SQLiteCache`` one worker renders a
+    missing entry while the others wait for it.
+    """
+    rendered = []
+
+    def miss():
+        rendered.append(True)
+        return render()
+    value = cache.get_or_set(entry_key(name, *vary_on), miss, _timeout())
+    stats.record(name, 'miss' if rendered else 'hit')
+    return value
+
+
+def _is_cacheable(request):
+    if request.method not in ('GET', 'HEAD') or request.GET:
+        return False
+    user = getattr(request, 'user', None)
+    return not (user and user.is_authenticated)
+
+
+def accepted_encodings(header):
+    """Content codings an Accept-Encoding header allows, as a set"""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def compress(content):
+    """``{coding: body}`` of every supported coding that makes ``content`` smaller"""
+    variants = {'gzip': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(content, quality=11, mode=brotli.MODE_TEXT)
+    return {coding: body for coding, body in variants.items() if len(body) < len(content)}
+
+
+def _page_response(entry, request):
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    coding = next((coding for coding in ENCODINGS if coding in accepted and coding in entry['encoded']), None)
+    response = HttpResponse(
+        entry['encoded'][coding] if coding else entry['content'], content_type=entry['content_type'],
+    )
+    if coding:
+        response['Content-Encoding'] = coding
+    response['Content-Length'] = len(response.content)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def _store_page(key, response):
+    """
+    Minify and compress a rendered page and cache it. Only the worker holding
+    the entry's lock does so, so a page is compressed once per version; the
+    others serve the response uncompressed meanwhile.
+    """
+    lock = f'{key}:lock'
+    if not cache.add(lock, 1, timeout=LOCK_TIMEOUT):
+        return None
+    try:
+        content = response.content
+        if response['Content-Type'].startswith('text/html'):
+            content = assets.minify_html(content.decode(response.charset)).encode(response.charset)
+        entry = {
+            'content': content,
+            'content_type': response['Content-Type'],
+            'encoded': compress(content),
+        }
+        cache.set(key, entry, _timeout())
+        return entry
+    finally:
+        cache.delete(lock)
+
+
+def cache_page(name):
+    """
+    Cache a view's full response for anonymous GET requests until one of the
+    models registered for ``name`` changes, keyed on the view's URL arguments.
+
+    Pages are stored minified, with gzip (and Brotli, when installed) bodies
+    next to the plain one, and served in the best coding the client accepts.
+    Adds an ``X-Cache`` header.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _is_cacheable(request):
+                return view(request, *args, **kwargs)
+
+            key = entry_key(name, *args, *(kwargs[arg] for arg in sorted(kwargs)))
+            cached = cache.get(key)
+            if cached is not None:
+                stats.record(name, 'hit')
+                response = _page_response(cached, request)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            stats.record(name, 'miss')
+            response = view(request, *args, **kwargs)
+            if (
+                response.status_code == 200 and not response.streaming and not response.cookies
+                # A page showing a CSRF token is specific to the visitor.
+                and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+            ):
+                if hasattr(response, 'render') and callable(response.render):
+                    response.render()
+                entry = _store_page(key, response)
+                if entry is not None:
+                    vary = response.get('Vary')
+                    response = _page_response(entry, request)
+                    if vary:
+                        patch_vary_headers(response, [field.strip() for field in vary.split(',')])
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,166 @@
+"""
+Conditional GET for the public pages.
+
+``conditional_page`` answers a GET or HEAD with a 304 when the request's
+``If-None-Match`` or ``If-Modified-Since`` still matches, before the view
+(or its page cache) runs. Validators are cheap by design:
+
+* Pages rendered from whole tables use the model versions and last-modified
+  times of their ``caching.DEPENDENCIES`` entry, which the signals in
+  ``portfolio.signals`` keep current: one cache round trip, no query.
+* Detail pages are validated per object, from the ``updated_at`` of the
+  object and of the related objects shown next to it: one indexed query.
+  The versions of the related-object indexes are included as well, since
+  a refresh of the index changes which objects are shown.
+
+Versions are bumped once a change commits (``caching.bump_on_commit``), so
+a validator never advances while the rows it describes are still
+uncommitted.
+
+ETags are weak: cached pages are served gzip or Brotli encoded as well as
+plain, and each coding is the same page.
+
+Every ETag also covers a fingerprint of the templates and code, so a deploy
+does not leave browsers with pages rendered by the previous release.
+Responses carry ``Cache-Control: no-cache``: browsers keep the page but
+revalidate it on each visit instead of guessing a freshness lifetime from
+Last-Modified.
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import Q
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from . import caching
+from .models import BlogPost, PersonalInfo, Project, ProjectSimilarity, RelatedPost, Skill
+
+SAFE_METHODS = ('GET', 'HEAD')
+# Seconds between checks for changed templates and code under DEBUG.
+DEBUG_CHECK_INTERVAL = 1.0
+
+# (when checked, code_stamp()) under DEBUG.
+_debug_stamp = (float('-inf'), None)
+
+
+@functools.lru_cache(maxsize=1)
+def _release(stamp):
+    from .export import code_fingerprint
+
+    return code_fingerprint()
+
+
+def release():
+    """Fingerprint of the templates and code pages are rendered with"""
+    global _debug_stamp
+    if not settings.DEBUG:
+        return _release(None)
+    # Templates change without a restart while developing. Their modification
+    # times are checked at most once a second, and the files hashed again
+    # only when one has changed.
+    from .export import code_stamp
+
+    checked, stamp = _debug_stamp
+    if time.monotonic() - checked >= DEBUG_CHECK_INTERVAL:
+        stamp = code_stamp()
+        _debug_stamp = (time.monotonic(), stamp)
+    return _release(stamp)
+
+
+def _etag(*parts):
+    text = ':'.join(str(part) for part in (release(), *parts))
+    return hashlib.md5(text.encode(), usedforsecurity=False).hexdigest()
+
+
+def _models_etag(models):
+    current, modified = caching.validators(models)
+    return [current[key] for key in sorted(current)], modified
+
+
+def page_validators(name):
+    """Validators of a page rendered from the models registered for ``name``"""
+    models = caching.DEPENDENCIES[name]
+
+    def validators(request, *args, **kwargs):
+        parts, modified = _models_etag(models)
+        return _etag(name, *parts), modified
+    return validators
+
+
+def contact_validators(request):
+    """The contact page also embeds the visitor's CSRF token and flash messages"""
+    if messages.get_messages(request):
+        return None
+    parts, modified = _models_etag(caching.DEPENDENCIES['page:contact'])
+    return _etag('page:contact', request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''), *parts), modified
+
+
+def project_validators(request, project_id):
+    """A project and the related projects listed on its page"""
+    rows = dict(
+        Project.objects.filter(Q(pk=project_id) | Q(neighbour_of__project_id=project_id))
+        .values_list('pk', 'updated_at').distinct()
+    )
+    if project_id not in rows:
+        return None
+    # Technologies are shown by name and icon, and the site profile in the
+    # footer. The neighbour list can change without any shown row changing,
+    # when the index is refreshed, so its version moves Last-Modified too.
+    parts, models_modified = _models_etag([Skill, PersonalInfo, ProjectSimilarity])
+    shown = [f'{pk}@{rows[pk].timestamp()}' for pk in sorted(rows)]
+    modified = max(models_modified, *(updated_at.timestamp() for updated_at in rows.values()))
+    return _etag('project', project_id, *parts, *shown), modified
+
+
+def blog_post_validators(request, slug):
+    """A published post and the related posts listed on its page"""
+    rows = list(
+        BlogPost.objects.filter(published=True)
+        .filter(Q(slug=slug) | Q(related_to_entries__post__slug=slug))
+        .values_list('pk', 'slug', 'updated_at').distinct()
+    )
+    if not any(row_slug == slug for _, row_slug, _ in rows):
+        return None
+    parts, models_modified = _models_etag([PersonalInfo, RelatedPost])
+    shown = [f'{pk}@{updated_at.timestamp()}' for pk, _, updated_at in sorted(rows)]
+    modified = max(models_modified, *(updated_at.timestamp() for _, _, updated_at in rows))
+    return _etag('post', slug, *parts, *shown), modified
+
+
+def conditional_page(validators, vary=()):
+    """
+    Answer GET and HEAD requests with a 304 when their validators match.
+
+    ``validators(request, *args, **kwargs)`` returns ``(etag, last modified
+    timestamp)``, or None to always run the view. ``vary`` names request
+    headers the validators read.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in SAFE_METHODS:
+                return view(request, *args, **kwargs)
+            found = validators(request, *args, **kwargs)
+            if found is None:
+                return view(request, *args, **kwargs)
+
+            etag, modified = 'W/' + quote_etag(found[0]), int(found[1])
+            response = get_conditional_response(request, etag=etag, last_modified=modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            if not response.has_header('ETag'):
+                response['ETag'] = etag
+            if not response.has_header('Last-Modified'):
+                response['Last-Modified'] = http_date(modified)
+            patch_cache_control(response, no_cache=True)
+            if vary:
+                patch_vary_headers(response, vary)
+            return response
+        return wrapper
+    return decorator
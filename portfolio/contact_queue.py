@@ -0,0 +1,326 @@
+"""
+Write-behind queue for contact form submissions.
+
+Accepted submissions are written to a spool directory instead of the
+database, so a burst of messages never holds SQLite's write lock while
+pages are being read. Each message is one JSON file that moves through
+sub-directories of ``PORTFOLIO_CONTACT_QUEUE_DIR``:
+
+* ``new/``: written by ``enqueue()`` (to a temporary file that is fsynced and
+  renamed, so a message is either complete or absent).
+* ``work/``: claimed by a worker with an atomic rename, so two workers never
+  take the same message. Claims left behind by a crashed worker go back to
+  ``new/`` after ``STALE_AFTER`` seconds.
+* ``notify/``: saved as a ``Contact`` row, waiting for the owner notification
+  email. Failed sends are retried with exponential backoff.
+* ``sending/``: a due notification claimed by a worker, again with an atomic
+  rename, so it is sent by one worker only. Claims left behind go back to
+  ``notify/`` after ``STALE_AFTER`` seconds.
+* ``failed/``: notifications that still failed after ``max_attempts``.
+
+``process()`` saves messages in batches with one ``bulk_create`` per batch
+and sends the notifications. By default every web process runs it on a
+background thread (``drainer``), woken by each submission and every
+``Drainer.poll_interval`` seconds, so the queue needs nothing besides the
+web server. With ``PORTFOLIO_CONTACT_WORKER`` on, a separate
+``manage.py process_contact_queue --loop`` does it instead; it must see the
+same spool directory (the same host or a shared volume). Delivery is
+at-least-once: a worker that dies between committing a batch and moving its
+files may save those messages again, and one that dies while sending may
+send a notification twice.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import caching, site_profile
+from .models import Contact
+from .sqlite import retry_on_lock
+
+logger = logging.getLogger('portfolio.contact_queue')
+
+FIELDS = ('name', 'email', 'subject', 'message')
+STAGES = ('tmp', 'new', 'work', 'notify', 'sending', 'failed')
+STALE_AFTER = 10 * 60
+RETRY_BASE = 30
+RETRY_MAX = 60 * 60
+
+
+def queue_dir():
+    return Path(getattr(settings, 'PORTFOLIO_CONTACT_QUEUE_DIR', settings.BASE_DIR / 'var' / 'contact_queue'))
+
+
+def _stage(name):
+    path = queue_dir() / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _fsync_directory(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write(stage, message):
+    """Durably write a message into a stage, replacing any previous copy there"""
+    tmp = _stage('tmp') / f"{message['id']}.{uuid.uuid4().hex[:8]}"
+    with open(tmp, 'w', encoding='utf-8') as handle:
+        json.dump(message, handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+    target = _stage(stage) / message['id']
+    os.replace(tmp, target)
+    _fsync_directory(target.parent)
+    return target
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def enqueue(data):
+    """Queue a validated submission (e.g. ``ContactForm.cleaned_data``); returns its id"""
+    message = {
+        # Names sort in submission order.
+        'id': f'{time.time_ns():020d}-{uuid.uuid4().hex[:12]}.json',
+        'submitted_at': timezone.now().isoformat(),
+        'data': {field: data[field] for field in FIELDS},
+        'contact_id': None,
+        'attempts': 0,
+        'retry_at': 0,
+    }
+    _write('new', message)
+    if not getattr(settings, 'PORTFOLIO_CONTACT_WORKER', False):
+        drainer.wake()
+    return message['id']
+
+
+def pending():
+    """Number of messages per stage"""
+    return {stage: len(os.listdir(_stage(stage))) for stage in STAGES if stage != 'tmp'}
+
+
+def recover(stale_after=STALE_AFTER):
+    """Return claims abandoned by crashed workers to the queue; returns how many"""
+    cutoff = time.time() - stale_after
+    recovered = 0
+    for claimed, queued in (('work', 'new'), ('sending', 'notify')):
+        for entry in os.scandir(_stage(claimed)):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.rename(entry.path, _stage(queued) / entry.name)
+                    recovered += 1
+            except FileNotFoundError:
+                pass
+    return recovered
+
+
+def claim(limit):
+    """Move up to ``limit`` of the oldest queued messages to ``work/``; [(path, message)]"""
+    claimed = []
+    work = _stage('work')
+    for name in sorted(os.listdir(_stage('new'))):
+        if len(claimed) >= limit:
+            break
+        target = work / name
+        try:
+            os.rename(_stage('new') / name, target)
+        except FileNotFoundError:
+            # Another worker got there first.
+            continue
+        # Mark the claim time for recover().
+        os.utime(target)
+        try:
+            claimed.append((target, _read(target)))
+        except ValueError:
+            logger.error('Discarding unreadable contact message %s', name)
+            os.rename(target, _stage('failed') / name)
+    return claimed
+
+
+@retry_on_lock
+def _insert(claimed, using):
+    contacts = [Contact(**message['data']) for _, message in claimed]
+    with transaction.atomic(using=using):
+        Contact.objects.using(using).bulk_create(contacts)
+        # auto_now_add stamps the insert time; keep the submission time instead.
+        for contact, (_, message) in zip(contacts, claimed):
+            contact.created_at = datetime.fromisoformat(message['submitted_at'])
+        Contact.objects.using(using).bulk_update(contacts, ['created_at'])
+    return contacts
+
+
+def save_batch(claimed, using=None):
+    """Insert claimed messages as Contact rows and queue their notifications"""
+    if not claimed:
+        return []
+    contacts = _insert(claimed, using)
+    caching.bump(Contact)
+
+    for contact, (path, message) in zip(contacts, claimed):
+        message['contact_id'] = contact.pk
+        _write('notify', message)
+        os.remove(path)
+    return contacts
+
+
+def recipients():
+    configured = getattr(settings, 'PORTFOLIO_CONTACT_NOTIFY', None)
+    if configured:
+        return list(configured)
+    owner = site_profile.get().info
+    return [owner.email] if owner and owner.email else []
+
+
+def _notification(message, to):
+    data = message['data']
+    body = (
+        f"From: {data['name']} <{data['email']}>\n"
+        f"Sent: {message['submitted_at']}\n\n"
+        f"{data['message']}\n"
+    )
+    return EmailMessage(
+        subject=f"[Portfolio contact] {data['subject']}",
+        body=body,
+        to=to,
+        reply_to=[data['email']],
+    )
+
+
+def deliver_notifications(max_attempts=5, limit=None):
+    """Send due owner notifications; returns (sent, retried, failed)"""
+    sent = retried = failed = 0
+    now = time.time()
+    due = []
+    sending = _stage('sending')
+    for path in sorted(_stage('notify').iterdir()):
+        if limit is not None and len(due) >= limit:
+            break
+        try:
+            if _read(path)['retry_at'] > now:
+                continue
+            # Claimed like messages in claim(), so one worker sends it.
+            target = sending / path.name
+            os.rename(path, target)
+        except FileNotFoundError:
+            # Another worker got there first.
+            continue
+        os.utime(target)
+        due.append((target, _read(target)))
+    if not due:
+        return sent, retried, failed
+
+    to = recipients()
+    if not to:
+        logger.warning('No recipient for contact notifications; dropping %d', len(due))
+        for path, _ in due:
+            os.remove(path)
+        return sent, retried, failed
+
+    connection = get_connection()
+    try:
+        for path, message in due:
+            email = _notification(message, to)
+            email.connection = connection
+            try:
+                email.send()
+            except Exception as exc:
+                message['attempts'] += 1
+                message['last_error'] = f'{type(exc).__name__}: {exc}'
+                if message['attempts'] >= max_attempts:
+                    logger.error('Giving up on notification for contact %s: %s',
+                                 message['contact_id'], message['last_error'])
+                    _write('failed', message)
+                    os.remove(path)
+                    failed += 1
+                else:
+                    delay = min(RETRY_MAX, RETRY_BASE * 2 ** (message['attempts'] - 1))
+                    message['retry_at'] = time.time() + delay
+                    _write('notify', message)
+                    os.remove(path)
+                    retried += 1
+                continue
+            os.remove(path)
+            sent += 1
+    finally:
+        connection.close()
+    return sent, retried, failed
+
+
+def process(batch_size=100, max_attempts=5):
+    """
+    Save every queued message and send the due notifications; returns
+    (recovered, saved, sent, retried, failed).
+    """
+    recovered = recover()
+    saved = 0
+    while True:
+        claimed = claim(batch_size)
+        if not claimed:
+            break
+        saved += len(save_batch(claimed))
+    return (recovered, saved, *deliver_notifications(max_attempts))
+
+
+class Drainer:
+    """
+    Runs ``process()`` on a background thread of this process, when woken by
+    a submission and every ``poll_interval`` seconds (for notification
+    retries and messages left by a previous process). Several processes may
+    drain one spool: messages and notifications are both claimed with atomic
+    renames, so each is handled by one of them.
+    """
+
+    poll_interval = 30
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _running(self):
+        # A forked worker does not inherit its parent's thread.
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def start(self):
+        if self._running():
+            return
+        with self._lock:
+            if self._running():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='contact-queue', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                process()
+            except Exception:
+                logger.exception('Could not process the contact queue')
+            finally:
+                connections.close_all()
+            self._wake.wait(self.poll_interval)
+
+
+drainer = Drainer()
@@ -0,0 +1,135 @@
+"""
+Read-replica routing.
+
+With a ``replica`` database configured (``REPLICA_DATABASE_URL``), views
+decorated with ``replica_reads`` (the public pages and the API) read from
+it for GET and HEAD requests. Everything else reads and writes the primary
+(``default``): the contact page and form posts, the admin, management
+commands and workers.
+
+Reads that follow a write stay on the primary:
+
+* once a request has written anything, the rest of it reads the primary;
+* every write to a table the public pages are rendered from (the models in
+  ``caching.DEPENDENCIES`` and their many-to-many tables) marks the site as
+  recently written, in the cache, for ``PORTFOLIO_REPLICA_LAG`` seconds, and
+  decorated views read the primary meanwhile. An editor following their own
+  save sees its result, and pages cached under a freshly bumped version (see
+  ``portfolio.caching``) are never rendered from a replica that has not
+  caught up with it. Sessions, contact messages and other bookkeeping don't
+  mark the site, so a steady trickle of them does not keep every page on
+  the primary.
+
+Locally, two SQLite files stand in for the primary and the replica, and
+``manage.py sync_replica`` copies the primary over the replica.
+
+In publish mode (``SNAPSHOT_DIR``, see ``portfolio.snapshot``) the same
+views read the current immutable snapshot instead, once one is published,
+under the same rules.
+"""
+import contextvars
+import functools
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from . import caching, snapshot
+
+REPLICA = 'replica'
+RECENT_WRITE_KEY = 'portfolio:db:recent_write'
+SAFE_METHODS = ('GET', 'HEAD')
+
+# Routing of the current request: {'read': alias, 'written': bool}, or None
+# for primary-only code.
+_state = contextvars.ContextVar('portfolio_db_routing', default=None)
+
+# When this process last marked a write, to mark at most once a second.
+_marked_at = 0.0
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def mark_written():
+    """Send decorated views to the primary for the next few seconds"""
+    global _marked_at
+    now = time.monotonic()
+    if now - _marked_at < 1:
+        return
+    _marked_at = now
+    cache.set(RECENT_WRITE_KEY, 1, timeout=getattr(settings, 'PORTFOLIO_REPLICA_LAG', 10))
+
+
+@functools.cache
+def page_models():
+    """Models whose writes public pages must not miss on a lagging replica"""
+    models = set()
+    for dependencies in caching.DEPENDENCIES.values():
+        for model in dependencies:
+            models.add(model)
+            models.update(field.remote_field.through for field in model._meta.many_to_many)
+    return frozenset(models)
+
+
+def recently_written():
+    return cache.get(RECENT_WRITE_KEY) is not None
+
+
+def _read_alias():
+    """Where reads can go instead of the primary: the snapshot, else the replica"""
+    if snapshot.connect():
+        return snapshot.SNAPSHOT
+    if replica_configured():
+        return REPLICA
+    return None
+
+
+def replica_reads(view):
+    """Let a read-only view read from the snapshot or replica, unless a write was recent"""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS or not (snapshot.configured() or replica_configured()):
+            return view(request, *args, **kwargs)
+        read = None if recently_written() else _read_alias()
+        if read is None:
+            return view(request, *args, **kwargs)
+        token = _state.set({'read': read, 'written': False})
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Reads in ``replica_reads`` views go to the snapshot or replica, the rest to the primary"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state['written']:
+            return None
+        return state['read']
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state['written'] = True
+        if model in page_models():
+            mark_written()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica and the snapshot hold the primary's rows.
+        aliases = {DEFAULT_DB_ALIAS, REPLICA, snapshot.SNAPSHOT}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Snapshots are copies of the migrated primary, and read-only.
+        if db == snapshot.SNAPSHOT:
+            return False
+        return None
@@ -0,0 +1,316 @@
+"""
+Static export of the public pages.
+
+``manage.py export_site`` renders every public route in ``portfolio/urls.py``
+to ``<output>/<path>/index.html``: the single pages, every project and
+published blog post, and every numbered page of the project and blog
+listings as ``projects/page/<n>/``.
+
+Each page lists what it is rendered from as dependency keys: whole tables
+(``portfolio.skill``) or the rows of one object (``portfolio.project:12``,
+``portfolio.projectsimilarity:12`` for the neighbours of project 12). Every
+key has a fingerprint, a hash of the rows it covers, and a page's signature
+hashes the fingerprints of its keys together with the templates and code.
+The signatures are kept in ``MANIFEST_NAME`` next to the pages, so a later
+export only re-renders pages whose signature changed, and deletes pages
+whose object is gone.
+
+``StaticPages`` wraps the WSGI application (see ``portfolio_project/wsgi.py``)
+to serve exported pages through WhiteNoise, falling through to Django for
+anything else, including any request with a query string.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.template.utils import get_app_template_dirs
+from django.urls import URLPattern, reverse
+
+from . import caching
+from .models import (
+    BlogPost, BlogPostTerms, Contact, Project, ProjectSimilarity, RateLimitStat, RelatedPost,
+)
+from .views import BLOG_POSTS_PER_PAGE, PROJECTS_PER_PAGE
+
+MANIFEST_NAME = '.export-manifest.json'
+MANIFEST_VERSION = 1
+
+# Routes that are not exported: forms carry per-visitor CSRF tokens, and
+# the rest is staff-only or POST-only.
+EXCLUDED_ROUTES = {'contact', 'contact_submit', 'timing_panel'}
+
+# Tables no public page is rendered from.
+IGNORED_MODELS = {Contact, RateLimitStat, BlogPostTerms}
+
+# Tables fingerprinted per object as well, by this column.
+GROUP_BY = {
+    Project: 'id',
+    Project.technologies.through: 'project_id',
+    ProjectSimilarity: 'project_id',
+    BlogPost: 'id',
+    RelatedPost: 'post_id',
+}
+
+# Every page shows the site owner's details.
+SHARED_DEPENDENCIES = ['portfolio.personalinfo']
+
+# Listings: (items per page, tables they are rendered from).
+LISTINGS = {
+    'projects': (PROJECTS_PER_PAGE, ['portfolio.project', 'portfolio.project_technologies', 'portfolio.skill']),
+    'blog': (BLOG_POSTS_PER_PAGE, ['portfolio.blogpost']),
+}
+
+_PAGE_LINK_RE = re.compile(r'href="\?page=(\d+)"')
+
+
+class Page:
+    """One exported page: where it is written, the URL rendered and its dependencies"""
+
+    def __init__(self, path, url, dependencies, listing=None):
+        self.path = path
+        self.url = url
+        self.dependencies = sorted(set(dependencies) | set(SHARED_DEPENDENCIES))
+        self.listing = listing
+
+    def signature(self, fingerprints, code):
+        digest = hashlib.sha256(code.encode())
+        for key in self.dependencies:
+            digest.update(f'{key}={fingerprints.get(key, "")};'.encode())
+        return digest.hexdigest()
+
+    def file(self, root):
+        return Path(root) / self.path.strip('/') / 'index.html'
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def _table_labels(models):
+    """Labels of ``models`` and of their many-to-many tables"""
+    labels = []
+    for model in models:
+        labels.append(_label(model))
+        labels.extend(_label(field.remote_field.through) for field in model._meta.local_many_to_many)
+    return labels
+
+
+def _models():
+    return [
+        model for model in apps.get_app_config('portfolio').get_models(include_auto_created=True)
+        if model not in IGNORED_MODELS
+    ]
+
+
+def fingerprints(using=None):
+    """Hash of every exported table, and of each object's rows in ``GROUP_BY`` tables"""
+    prints = {}
+    for model in _models():
+        columns = [field.attname for field in model._meta.concrete_fields]
+        group_by = GROUP_BY.get(model)
+        table = hashlib.sha256()
+        groups = {}
+        rows = model._default_manager.using(using).order_by('pk').values_list(*columns)
+        for row in rows.iterator(chunk_size=2000):
+            data = repr(row).encode()
+            table.update(data)
+            if group_by is not None:
+                key = row[columns.index(group_by)]
+                groups.setdefault(key, hashlib.sha256()).update(data)
+        prints[_label(model)] = table.hexdigest()
+        for key, digest in groups.items():
+            prints[f'{_label(model)}:{key}'] = digest.hexdigest()
+    return prints
+
+
+def _code_files():
+    directories = [Path(d) for engine in settings.TEMPLATES for d in engine.get('DIRS', [])]
+    directories += [Path(d) for d in get_app_template_dirs('templates')]
+    directories.append(Path(__file__).resolve().parent)
+    for directory in directories:
+        for path in sorted(directory.rglob('*')):
+            if path.suffix in ('.html', '.py') and path.is_file():
+                yield path
+    manifest = Path(settings.STATIC_ROOT) / 'staticfiles.json'
+    if manifest.exists():
+        yield manifest
+
+
+def code_fingerprint():
+    """Hash of the templates and Python code pages are rendered with"""
+    digest = hashlib.sha256()
+    for path in _code_files():
+        digest.update(str(path).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def code_stamp():
+    """
+    Names and modification times of the files ``code_fingerprint()`` reads:
+    cheap to take, and changes whenever the fingerprint may have.
+    """
+    return tuple((str(path), path.stat().st_mtime_ns) for path in _code_files())
+
+
+def _project_pages(using):
+    neighbours = {}
+    for project_id, neighbour_id in ProjectSimilarity.objects.using(using).values_list('project_id', 'neighbour_id'):
+        neighbours.setdefault(project_id, []).append(neighbour_id)
+    for pk in Project.objects.using(using).values_list('pk', flat=True):
+        shown = [pk, *neighbours.get(pk, [])]
+        url = reverse('portfolio:project_detail', args=[pk])
+        yield Page(url, url, [
+            'portfolio.skill',
+            f'portfolio.projectsimilarity:{pk}',
+            *(f'portfolio.project:{shown_pk}' for shown_pk in shown),
+            *(f'portfolio.project_technologies:{shown_pk}' for shown_pk in shown),
+        ])
+
+
+def _blog_post_pages(using):
+    related = {}
+    for post_id, related_id in RelatedPost.objects.using(using).values_list('post_id', 'related_id'):
+        related.setdefault(post_id, []).append(related_id)
+    for pk, slug in BlogPost.objects.using(using).filter(published=True).values_list('pk', 'slug'):
+        url = reverse('portfolio:blog_detail', args=[slug])
+        yield Page(url, url, [
+            f'portfolio.relatedpost:{pk}',
+            *(f'portfolio.blogpost:{shown_pk}' for shown_pk in [pk, *related.get(pk, [])]),
+        ])
+
+
+def _listing_pages(name, count):
+    per_page, dependencies = LISTINGS[name]
+    url = reverse(f'portfolio:{name}')
+    yield Page(url, url + '?page=1', dependencies, listing=url)
+    for number in range(2, max(1, math.ceil(count / per_page)) + 1):
+        yield Page(f'{url}page/{number}/', f'{url}?page={number}', dependencies, listing=url)
+
+
+# Routes with URL parameters, and the pages they produce.
+OBJECT_ROUTES = {
+    'project_detail': _project_pages,
+    'blog_detail': _blog_post_pages,
+}
+
+
+def pages(using=None):
+    """Every page to export"""
+    from . import urls
+
+    for pattern in urls.urlpatterns:
+        if not isinstance(pattern, URLPattern) or pattern.name in EXCLUDED_ROUTES:
+            continue
+        name = pattern.name
+        if name in OBJECT_ROUTES:
+            yield from OBJECT_ROUTES[name](using)
+        elif name == 'projects':
+            yield from _listing_pages(name, Project.objects.using(using).count())
+        elif name == 'blog':
+            yield from _listing_pages(name, BlogPost.objects.using(using).filter(published=True).count())
+        elif not pattern.pattern.converters:
+            url = reverse(f'portfolio:{name}')
+            models = caching.DEPENDENCIES.get(f'page:{name}') or _models()
+            yield Page(url, url, _table_labels(models))
+
+
+def rewrite_page_links(html, listing):
+    """Point numbered pagination links at the exported page/<n>/ paths"""
+    def replace(match):
+        number = int(match.group(1))
+        return f'href="{listing}"' if number == 1 else f'href="{listing}page/{number}/"'
+
+    return _PAGE_LINK_RE.sub(replace, html)
+
+
+def load_manifest(root):
+    try:
+        with open(Path(root) / MANIFEST_NAME) as handle:
+            manifest = json.load(handle)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest['pages']
+
+
+def save_manifest(root, signatures):
+    path = Path(root) / MANIFEST_NAME
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w') as handle:
+        json.dump({'version': MANIFEST_VERSION, 'pages': signatures}, handle, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _host():
+    for host in settings.ALLOWED_HOSTS:
+        if host and not host.startswith(('.', '*')):
+            return host
+    return 'localhost'
+
+
+def render_pages(pages, root):
+    """Process pool task: render and write pages; [(path, error or None)]"""
+    from django.test import Client
+
+    client = Client(SERVER_NAME=_host(), raise_request_exception=False)
+    results = []
+    for page in pages:
+        response = client.get(page.url)
+        if response.status_code != 200:
+            results.append((page.path, f'HTTP {response.status_code}'))
+            continue
+        html = response.content.decode(response.charset or 'utf-8')
+        if page.listing:
+            html = rewrite_page_links(html, page.listing)
+        target = page.file(root)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix('.tmp')
+        tmp.write_text(html, encoding='utf-8')
+        os.replace(tmp, target)
+        results.append((page.path, None))
+    return results
+
+
+def worker_init():
+    """Process pool initializer for the export command"""
+    import django
+
+    django.setup()
+
+
+class StaticPages:
+    """
+    WSGI wrapper that serves exported pages with WhiteNoise. Requests with a
+    query string, other methods and paths without an exported page go to
+    the wrapped application; ``.../page/<n>/`` listing paths that were not
+    exported are passed on as ``...?page=<n>``.
+    """
+
+    page_path_re = re.compile(r'^(?P<listing>.*/)page/(?P<number>\d+)/$')
+
+    def __init__(self, application, root, max_age=60):
+        from whitenoise import WhiteNoise
+
+        self.application = application
+        self.root = Path(root)
+        self.whitenoise = WhiteNoise(application, root=str(self.root), index_file=True, autorefresh=True, max_age=max_age)
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if environ.get('QUERY_STRING') or environ.get('REQUEST_METHOD') not in ('GET', 'HEAD'):
+            return self.application(environ, start_response)
+        if '..' in path.split('/'):
+            return self.application(environ, start_response)
+        if path.endswith('/') and (self.root / path.strip('/') / 'index.html').is_file():
+            return self.whitenoise(environ, start_response)
+        match = self.page_path_re.match(path)
+        if match:
+            environ = {**environ, 'PATH_INFO': match['listing'], 'QUERY_STRING': f'page={match["number"]}'}
+        return self.application(environ, start_response)
@@ -0,0 +1,195 @@
+"""
+Server-side faceted filtering for the projects listing.
+
+Selections come from the query string (``?tech=3&tech=7&category=cloud``
+``&featured=1&year=2024``). Values within one facet are OR'ed together and
+different facets are AND'ed. Each facet's counts reflect the list filtered
+by every other facet, so the other options of a facet stay selectable once
+one is picked. Counting costs two grouped aggregates in total, however many
+facets or options there are.
+"""
+from django.db.models import Count, Exists, OuterRef, Q
+from django.db.models.functions import ExtractYear
+
+from .models import Project, Skill
+
+ProjectTechnology = Project.technologies.through
+
+# Query string parameters that are reset whenever a facet selection changes.
+PAGINATION_PARAMS = ('page', 'cursor')
+
+
+def _int_list(values):
+    result = []
+    for value in values:
+        try:
+            result.append(int(value))
+        except (TypeError, ValueError):
+            continue
+    return result
+
+
+def _has_technology(**lookups):
+    return Exists(ProjectTechnology.objects.filter(project_id=OuterRef('pk'), **lookups))
+
+
+def _count(condition):
+    return Count('pk', filter=condition) if condition else Count('pk')
+
+
+class ProjectFacets:
+    """Facet selections for one request, plus helpers to filter and count"""
+
+    category_labels = dict(Skill.SKILL_CATEGORIES)
+
+    def __init__(self, params, max_technologies=25):
+        self.params = params
+        self.max_technologies = max_technologies
+        self.technologies = _int_list(params.getlist('tech'))
+        self.categories = [c for c in params.getlist('category') if c in self.category_labels]
+        self.featured = {'1': True, '0': False}.get(params.get('featured'))
+        self.years = _int_list(params.getlist('year'))
+
+    @property
+    def active(self):
+        return bool(self.technologies or self.categories or self.years or self.featured is not None)
+
+    def condition(self, exclude=None):
+        """Q for the current selections, leaving out the ``exclude`` facet"""
+        condition = Q()
+        if self.technologies and exclude != 'tech':
+            condition &= Q(_has_technology(skill_id__in=self.technologies))
+        if self.categories and exclude != 'category':
+            condition &= Q(_has_technology(skill__category__in=self.categories))
+        if self.featured is not None and exclude != 'featured':
+            condition &= Q(featured=self.featured)
+        if self.years and exclude != 'year':
+            year_filter = Q()
+            for year in self.years:
+                year_filter |= Q(created_at__year=year)
+            condition &= year_filter
+        return condition
+
+    def filter(self, queryset):
+        """Narrow a Project queryset to the current selections"""
+        return queryset.filter(self.condition())
+
+    def counts(self, queryset):
+        """
+        Facet options with counts, and the number of projects matching every
+        selection as ``total``, for a queryset not yet narrowed by ``filter()``.
+
+        Each facet is counted over the projects matching the other facets'
+        selections, not its own: options are OR'ed within a facet, so a
+        count says how many projects selecting that option would add.
+        """
+        # Technologies: one GROUP BY over the through table.
+        project_ids = queryset.filter(self.condition(exclude='tech')).order_by().values('pk')
+        tech_rows = (
+            ProjectTechnology.objects
+            .filter(project_id__in=project_ids)
+            .values('skill_id', 'skill__name')
+            .annotate(count=Count('project_id'))
+            .order_by('-count', 'skill__name')
+        )
+        technologies = []
+        seen = set()
+        for row in tech_rows:
+            selected = row['skill_id'] in self.technologies
+            if len(technologies) >= self.max_technologies and not selected:
+                continue
+            seen.add(row['skill_id'])
+            technologies.append(self._option('tech', row['skill_id'], row['skill__name'], row['count']))
+        missing = [pk for pk in self.technologies if pk not in seen]
+        if missing:
+            for skill in Skill.objects.filter(pk__in=missing).only('pk', 'name'):
+                technologies.append(self._option('tech', skill.pk, skill.name, 0))
+
+        # Featured flag, year and skill category: one GROUP BY over projects,
+        # each count filtered by the other facets. The (featured, year) groups
+        # partition the projects, so counts can be summed across groups
+        # without double counting.
+        category_condition = self.condition(exclude='category')
+        category_counts = {
+            f'category_{key}': _count(Q(_has_technology(skill__category=key)) & category_condition)
+            for key in self.category_labels
+        }
+        rows = (
+            queryset.order_by()
+            .values('featured', year=ExtractYear('created_at'))
+            .annotate(
+                total=_count(self.condition()),
+                featured_total=_count(self.condition(exclude='featured')),
+                year_total=_count(self.condition(exclude='year')),
+                **category_counts,
+            )
+        )
+        total = 0
+        featured = {True: 0, False: 0}
+        years = {}
+        categories = dict.fromkeys(self.category_labels, 0)
+        for row in rows:
+            total += row['total']
+            featured[row['featured']] += row['featured_total']
+            if row['year_total']:
+                years[row['year']] = years.get(row['year'], 0) + row['year_total']
+            for key in categories:
+                categories[key] += row[f'category_{key}']
+
+        return {
+            'total': total,
+            'technologies': technologies,
+            'categories': [
+                self._option('category', key, label, categories[key])
+                for key, label in self.category_labels.items()
+                if categories[key] or key in self.categories
+            ],
+            'featured': [
+                self._option('featured', '1', 'Featured', featured[True]),
+                self._option('featured', '0', 'Other projects', featured[False]),
+            ],
+            'years': [
+                self._option('year', year, str(year), years.get(year, 0))
+                for year in sorted(set(years) | set(self.years), reverse=True)
+            ],
+        }
+
+    def _option(self, name, value, label, count):
+        if name == 'featured':
+            selected = self.params.get('featured') == value
+        else:
+            selected = str(value) in self.params.getlist(name)
+        return {
+            'value': value,
+            'label': label,
+            'count': count,
+            'selected': selected,
+            'url': '?' + self.toggle(name, value),
+        }
+
+    def toggle(self, name, value):
+        """Query string with one facet value switched on or off"""
+        params = self.params.copy()
+        for key in PAGINATION_PARAMS:
+            params.pop(key, None)
+        value = str(value)
+        if name == 'featured':
+            if params.get(name) == value:
+                params.pop(name)
+            else:
+                params[name] = value
+        else:
+            values = params.getlist(name)
+            if value in values:
+                values.remove(value)
+            else:
+                values.append(value)
+            params.setlist(name, values)
+        return params.urlencode()
+
+    def querystring(self):
+        """Current selections and search, without pagination parameters"""
+        params = self.params.copy()
+        for key in PAGINATION_PARAMS:
+            params.pop(key, None)
+        return params.urlencode()
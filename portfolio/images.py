@@ -0,0 +1,251 @@
+"""
+Responsive image derivatives.
+
+For every uploaded image, ``generate()`` writes resized WebP and JPEG copies
+at the ``WIDTHS`` that are narrower than the original, next to the original
+in the same storage (``projects/photo.jpg`` gets ``projects/photo.jpg.640w.webp``
+and so on), plus a JSON manifest ``projects/photo.jpg.json`` that lists them
+together with a tiny blurred placeholder encoded as a data URI.
+
+Derivatives are made off the request path: ``portfolio.signals`` schedules
+them on a small thread pool once the saving transaction commits, and
+``manage.py build_image_derivatives`` backfills existing media across a
+process pool. The ``{% responsive_image %}`` tag in ``portfolio_images``
+reads the manifest and falls back to the original until it exists.
+"""
+import base64
+import hashlib
+import io
+import json
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+logger = logging.getLogger('portfolio.images')
+
+# Image fields that get derivatives, as (model label, field name).
+IMAGE_FIELDS = (
+    ('portfolio.PersonalInfo', 'profile_picture'),
+    ('portfolio.Project', 'image'),
+    ('portfolio.BlogPost', 'image'),
+    ('portfolio.Certification', 'image'),
+)
+
+WIDTHS = (320, 640, 960, 1280, 1920)
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 75, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 80, 'optimize': True, 'progressive': True},
+}
+PLACEHOLDER_WIDTH = 24
+EXIF_ORIENTATION = 0x0112
+MANIFEST_VERSION = 1
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-derivatives')
+
+
+def image_fields():
+    """(model, field name) for every image field that gets derivatives"""
+    return [(apps.get_model(label), field) for label, field in IMAGE_FIELDS]
+
+
+def manifest_name(name):
+    return f'{name}.json'
+
+
+def derivative_name(name, width, extension):
+    return f'{name}.{width}w.{extension}'
+
+
+def _parse(name):
+    """``(source, width)`` a derivative or manifest name would be generated from, or None"""
+    if name.endswith('.json'):
+        return name[:-len('.json')], None
+    parts = name.rsplit('.', 2)
+    if len(parts) == 3 and parts[2] in FORMATS and parts[1].endswith('w') and parts[1][:-1].isdigit():
+        return parts[0], int(parts[1][:-1])
+    return None
+
+
+def is_derivative(name, storage=None):
+    """
+    Whether a stored file is a derivative or manifest rather than an upload.
+
+    The name alone is not enough: ``data.json`` or ``photo.640w.webp`` may
+    just as well be uploaded. A derivative's source must exist, and once its
+    manifest is written the derivative must be listed in it.
+    """
+    parsed = _parse(name)
+    if parsed is None or not posixpath.basename(parsed[0]):
+        return False
+    source, width = parsed
+    storage = storage or default_storage
+    if not storage.exists(source):
+        return False
+    if width is None:
+        return True
+    # No manifest yet while generate() is writing the derivatives.
+    manifest = load_manifest(source, storage=storage)
+    if manifest is None:
+        return True
+    return any(stored == name for entries in manifest['variants'].values() for _, stored in entries)
+
+
+def source_name(name, storage=None):
+    """The original image a derivative or manifest belongs to (``name`` itself otherwise)"""
+    if not is_derivative(name, storage=storage):
+        return name
+    return _parse(name)[0]
+
+
+def _manifest_cache_key(name):
+    return 'portfolio:images:' + hashlib.md5(name.encode(), usedforsecurity=False).hexdigest()
+
+
+def _encode(image, extension):
+    buffer = io.BytesIO()
+    options = dict(FORMATS[extension])
+    if extension == 'jpeg' and image.mode != 'RGB':
+        image = _flatten(image)
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def _flatten(image):
+    from PIL import Image
+
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _placeholder(image):
+    from PIL import ImageFilter
+
+    height = max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))
+    small = _flatten(image).resize((PLACEHOLDER_WIDTH, height)).filter(ImageFilter.GaussianBlur(1.5))
+    buffer = io.BytesIO()
+    small.save(buffer, format='WEBP', quality=40)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def _replace(storage, name, content):
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(content))
+
+
+def generate(name, storage=None, force=False):
+    """
+    Write the derivatives and manifest for one stored image and return the
+    manifest. Existing derivatives are kept unless ``force`` is set.
+    """
+    from PIL import Image, ImageOps
+
+    storage = storage or default_storage
+    if not force:
+        existing = load_manifest(name, storage=storage, use_cache=False)
+        if existing is not None:
+            return existing
+
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        width, height = image.size
+        rotated = image.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8)
+        if rotated:
+            width, height = height, width
+        # JPEGs can be decoded at 1/2, 1/4 or 1/8 scale; ask for the smallest
+        # scale that is still at least as wide as the widest derivative.
+        image.draft('RGB', (1, max(WIDTHS)) if rotated else (max(WIDTHS), 1))
+        image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    widths = [w for w in WIDTHS if w < width]
+    if width <= max(WIDTHS):
+        widths.append(width)
+
+    variants = {extension: [] for extension in FORMATS}
+    current = image
+    # Widest first, each step resized from the previous one.
+    for target in sorted(widths, reverse=True):
+        target_height = max(1, round(height * target / width))
+        if current.size != (target, target_height):
+            current = current.resize((target, target_height), Image.LANCZOS, reducing_gap=3.0)
+        for extension in FORMATS:
+            stored = _replace(storage, derivative_name(name, target, extension), _encode(current, extension))
+            variants[extension].append([target, stored])
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'source': name,
+        'width': width,
+        'height': height,
+        'variants': {extension: sorted(entries) for extension, entries in variants.items()},
+        'placeholder': _placeholder(current),
+    }
+    _replace(storage, manifest_name(name), json.dumps(manifest).encode())
+    cache.delete(_manifest_cache_key(name))
+    return manifest
+
+
+def load_manifest(name, storage=None, use_cache=True):
+    """The manifest for a stored image, or None if it has not been generated"""
+    storage = storage or default_storage
+    key = _manifest_cache_key(name)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached or None
+    try:
+        with storage.open(manifest_name(name), 'rb') as handle:
+            manifest = json.loads(handle.read())
+    except (FileNotFoundError, ValueError):
+        manifest = None
+    if manifest is not None and manifest.get('version') != MANIFEST_VERSION:
+        manifest = None
+    if use_cache:
+        # Remember misses briefly so pages do not stat the file every request.
+        cache.set(key, manifest or {}, None if manifest else 60)
+    return manifest
+
+
+def _generate_logged(name, storage, callback):
+    try:
+        generate(name, storage=storage)
+    except Exception:
+        logger.exception('Could not generate derivatives for %s', name)
+        return
+    if callback is not None:
+        callback()
+
+
+def schedule(name, storage=None, callback=None, using=None):
+    """Generate derivatives in the background once the current transaction commits"""
+    storage = storage or default_storage
+    transaction.on_commit(lambda: _executor.submit(_generate_logged, name, storage, callback), using=using)
+
+
+def backfill(name, force=False):
+    """Process pool task: (name, number of derivatives written, error or None)"""
+    try:
+        manifest = generate(name, force=force)
+    except Exception as exc:
+        return name, 0, f'{type(exc).__name__}: {exc}'
+    return name, sum(len(entries) for entries in manifest['variants'].values()), None
+
+
+def worker_init():
+    """Process pool initializer for the backfill command"""
+    import django
+
+    django.setup()
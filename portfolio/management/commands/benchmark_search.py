@@ -0,0 +1,93 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from portfolio import search
+from portfolio.models import BlogPost
+from portfolio.synthetic import VOCABULARY, WORDS
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark blog search latency (full-text index vs. icontains) at several '
+        'archive sizes. Synthetic posts are created inside a transaction that is '
+        'rolled back, so the database is left untouched.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[100, 10000, 100000],
+            help='Archive sizes to benchmark (default: 100 10000 100000)',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Searches timed per query and size (default: 20)',
+        )
+        parser.add_argument(
+            '--queries', nargs='+', default=['spark', 'kafka stream', 'warehouse part'],
+            help='Search queries to time',
+        )
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('The configured database does not support the search index.')
+
+        sizes = sorted(options['sizes'])
+        rng = random.Random(42)
+
+        self.stdout.write(f"{'posts':>8} {'query':<18} {'fts p50 ms':>11} {'fts p95 ms':>11} "
+                          f"{'icontains p50 ms':>17} {'hits':>7}")
+        with transaction.atomic():
+            created = 0
+            for size in sizes:
+                self._create_posts(rng, created, size - created)
+                created = size
+                for query in options['queries']:
+                    fts = self._time(lambda: self._fts_page(query), options['repeat'])
+                    scan = self._time(lambda: self._scan_page(query), options['repeat'])
+                    hits = search.SearchResults(query).count()
+                    self.stdout.write(
+                        f'{size:>8} {query:<18} {fts[0]:>11.2f} {fts[1]:>11.2f} '
+                        f'{scan[0]:>17.2f} {hits:>7}'
+                    )
+            transaction.set_rollback(True)
+
+    def _create_posts(self, rng, start, count, batch_size=2000):
+        for offset in range(0, count, batch_size):
+            posts = []
+            for i in range(start + offset, start + min(offset + batch_size, count)):
+                posts.append(BlogPost(
+                    title=' '.join(rng.choices(WORDS, k=6)).title(),
+                    slug=f'benchmark-post-{i}',
+                    excerpt=' '.join(rng.choices(VOCABULARY, k=25)),
+                    content=' '.join(rng.choices(VOCABULARY, k=300)),
+                    published=True,
+                ))
+            # bulk_create skips post_save, so index the batch explicitly.
+            search.index_posts(BlogPost.objects.bulk_create(posts))
+
+    def _fts_page(self, query):
+        results = search.SearchResults(query)
+        results.count()
+        return results[0:6]
+
+    def _scan_page(self, query):
+        posts = BlogPost.objects.filter(published=True).filter(
+            Q(title__icontains=query) | Q(content__icontains=query) | Q(excerpt__icontains=query)
+        )
+        posts.count()
+        return list(posts[:6])
+
+    def _time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        return statistics.median(timings), p95
@@ -0,0 +1,182 @@
+import logging
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from portfolio import sqlite, synthetic
+from portfolio.models import Contact, Project, Skill
+
+ALIAS = 'sqlite_benchmark'
+PROFILES = {'stock': sqlite.STOCK_PRAGMAS, 'tuned': sqlite.TUNED_PRAGMAS}
+
+# Workers wait for each other so they all load the database at once.
+START_DELAY = 1.0
+
+
+def _percentile(ordered, percent):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+def _use_database(path):
+    """Register ``path`` as the ``ALIAS`` database of this process"""
+    databases = {
+        DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS],
+        ALIAS: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(path)},
+    }
+    if ALIAS in connections.settings:
+        # Drop the connection to the previous file.
+        connections[ALIAS].close()
+        del connections[ALIAS]
+    connections.settings[ALIAS] = connections.configure_settings(databases)[ALIAS]
+
+
+def _connect(profile):
+    with connections[ALIAS].cursor() as cursor:
+        sqlite.apply_pragmas(cursor, PROFILES[profile])
+
+
+def _start_worker(path, profile):
+    django.setup()
+    # The profile is applied here, not by portfolio.signals.
+    settings.PORTFOLIO_SQLITE_TUNING = False
+    # Retries are expected under load; don't log each one.
+    logging.getLogger('portfolio.sqlite').setLevel(logging.WARNING)
+    _use_database(path)
+    _connect(profile)
+
+
+def _read(rng, project_ids):
+    """One of the reads the public pages make"""
+    kind = rng.randrange(3)
+    if kind == 0:
+        list(Project.objects.using(ALIAS).prefetch_related('technologies')[:9])
+    elif kind == 1:
+        Project.objects.using(ALIAS).prefetch_related('technologies').get(pk=rng.choice(project_ids))
+    else:
+        list(Skill.objects.using(ALIAS).all())
+
+
+def _write(rng):
+    """Read, then write, in one transaction, as a form post does"""
+    email = f'visitor{rng.randrange(1000)}@example.com'
+    with transaction.atomic(using=ALIAS):
+        Contact.objects.using(ALIAS).filter(email=email).exists()
+        Contact.objects.using(ALIAS).create(
+            name='Benchmark', email=email, subject='Benchmark', message='A benchmark message.',
+        )
+
+
+def _work(profile, start_at, duration, write_ratio, seed, project_ids):
+    rng = random.Random(seed)
+    write = sqlite.retry_on_lock(_write) if profile == 'tuned' else _write
+    reads, writes, errors = [], [], 0
+    time.sleep(max(0.0, start_at - time.time()))
+    end = start_at + duration
+    while time.time() < end:
+        is_write = rng.random() < write_ratio
+        started = time.perf_counter()
+        try:
+            write(rng) if is_write else _read(rng, project_ids)
+        except sqlite.LOCK_ERRORS as exc:
+            if not sqlite.is_lock_error(exc):
+                raise
+            errors += 1
+            continue
+        (writes if is_write else reads).append((time.perf_counter() - started) * 1000)
+    connections[ALIAS].close()
+    return reads, writes, errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare SQLite with stock and tuned settings (see portfolio.sqlite) under a '
+        'mixed read/write load from several processes. Each run uses a fresh copy of '
+        'a synthetic database in a temporary directory; the site database is not touched.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, nargs='+', default=[1, 4, 8],
+            help='Numbers of worker processes to run (default: 1 4 8)',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=5,
+            help='Seconds each run lasts (default: 5)',
+        )
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help='Share of operations that write (default: 0.2)',
+        )
+        parser.add_argument(
+            '--scale', type=int, default=200,
+            help='Size of the synthetic dataset, see populate_sample_data --scale (default: 200)',
+        )
+        parser.add_argument(
+            '--profiles', nargs='+', choices=list(PROFILES), default=list(PROFILES),
+            help='SQLite settings to compare (default: stock tuned)',
+        )
+
+    def handle(self, *args, **options):
+        tuning = getattr(settings, 'PORTFOLIO_SQLITE_TUNING', True)
+        directory = Path(tempfile.mkdtemp(prefix='benchmark_sqlite-'))
+        try:
+            settings.PORTFOLIO_SQLITE_TUNING = False
+            template = directory / 'template.sqlite3'
+            self.stderr.write(f'Building a dataset of scale {options["scale"]}...')
+            _use_database(template)
+            call_command('migrate', database=ALIAS, verbosity=0)
+            synthetic.generate(options['scale'], using=ALIAS)
+            project_ids = list(Project.objects.using(ALIAS).values_list('pk', flat=True))
+            connections[ALIAS].close()
+
+            self.stdout.write(
+                f'{"profile":<8}{"workers":>8}{"reads/s":>10}{"writes/s":>10}{"locked":>8}'
+                f'{"read p50":>10}{"read p95":>10}{"write p50":>11}{"write p95":>11}'
+            )
+            for profile in options['profiles']:
+                for workers in options['workers']:
+                    path = directory / f'{profile}-{workers}.sqlite3'
+                    shutil.copyfile(template, path)
+                    self._report(profile, workers, self._run(path, profile, workers, project_ids, options), options)
+        finally:
+            settings.PORTFOLIO_SQLITE_TUNING = tuning
+            if ALIAS in connections.settings:
+                connections[ALIAS].close()
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _run(self, path, profile, workers, project_ids, options):
+        # The journal mode is stored in the file; set it before anyone shares it.
+        _use_database(path)
+        _connect(profile)
+        connections.close_all()
+
+        with ProcessPoolExecutor(workers, initializer=_start_worker, initargs=(path, profile)) as pool:
+            start_at = time.time() + START_DELAY
+            futures = [
+                pool.submit(_work, profile, start_at, options['duration'], options['write_ratio'], seed, project_ids)
+                for seed in range(workers)
+            ]
+            results = [future.result() for future in futures]
+        return results
+
+    def _report(self, profile, workers, results, options):
+        reads = sorted(latency for result in results for latency in result[0])
+        writes = sorted(latency for result in results for latency in result[1])
+        errors = sum(result[2] for result in results)
+        duration = options['duration']
+        self.stdout.write(
+            f'{profile:<8}{workers:>8}{len(reads) / duration:>10.0f}{len(writes) / duration:>10.0f}{errors:>8}'
+            f'{_percentile(reads, 50):>8.2f}ms{_percentile(reads, 95):>8.2f}ms'
+            f'{_percentile(writes, 50):>9.2f}ms{_percentile(writes, 95):>9.2f}ms'
+        )
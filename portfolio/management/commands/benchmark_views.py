@@ -0,0 +1,183 @@
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from portfolio import caching, synthetic, urls
+from portfolio.models import BlogPost, Project
+
+# Views that are only reachable by staff are requested with a staff session.
+STAFF_URLS = {'timing_panel'}
+
+# Endpoints that only accept form posts are not timed.
+POST_URLS = {'contact_submit'}
+
+# Extra query strings timed for a view, besides the bare URL.
+VARIANTS = {
+    'projects': ['?search=spark', '?page=2'],
+    'blog': ['?search=spark', '?page=2'],
+}
+
+
+def _percentile(ordered, percent):
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Time every URL in portfolio/urls.py against synthetic datasets of several '
+        'sizes and print latency percentiles and query counts as JSON. Each dataset '
+        'is generated inside a transaction that is rolled back, so the database is '
+        'left untouched.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10, 100, 1000],
+            help='Dataset scales to benchmark, see populate_sample_data --scale (default: 10 100 1000)',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Timed requests per URL and size after the first, cold one (default: 20)',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        if synthetic.exists():
+            raise CommandError('Synthetic data already exists in this database; benchmark an empty one')
+
+        report = {
+            'revision': _git_revision(),
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'seed': options['seed'],
+            'results': [],
+        }
+        for size in sorted(options['sizes']):
+            self.stderr.write(f'Benchmarking scale {size}...')
+            report['results'].append(self._benchmark_size(size, options['seed'], options['repeat']))
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+        else:
+            self.stdout.write(output)
+
+    def _benchmark_size(self, size, seed, repeat):
+        with transaction.atomic():
+            start = time.perf_counter()
+            counts = synthetic.generate(size, seed=seed)
+            generate_seconds = time.perf_counter() - start
+
+            staff = get_user_model().objects.create_user(
+                'benchmark-staff', password=None, is_staff=True,
+            )
+            anonymous = Client(raise_request_exception=False)
+            staff_client = Client(raise_request_exception=False)
+            staff_client.force_login(staff)
+
+            cache.clear()
+            results = []
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                for name, path in self._paths():
+                    client = staff_client if name in STAFF_URLS else anonymous
+                    results.append(self._time(client, name, path, repeat))
+            transaction.set_rollback(True)
+
+        # Pages cached while the synthetic rows existed must not outlive them.
+        for model in caching.TRACKED_MODELS:
+            caching.bump(model)
+        return {
+            'scale': size,
+            'rows': counts,
+            'generate_seconds': round(generate_seconds, 3),
+            'urls': results,
+        }
+
+    def _arguments(self):
+        # Detail pages are timed for the object in the middle of the table.
+        samples = {
+            'project_id': Project.objects.order_by('pk').values_list('pk', flat=True),
+            'slug': BlogPost.objects.filter(published=True).order_by('pk').values_list('slug', flat=True),
+        }
+        return {
+            param: values[values.count() // 2]
+            for param, values in samples.items()
+            if values.exists()
+        }
+
+    def _paths(self):
+        arguments = self._arguments()
+        for pattern in urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name or pattern.name in POST_URLS:
+                continue
+            params = pattern.pattern.converters
+            missing = [param for param in params if param not in arguments]
+            if missing:
+                self.stderr.write(f'Skipping {pattern.name}: no sample value for {", ".join(missing)}')
+                continue
+            path = reverse(
+                f'{urls.app_name}:{pattern.name}',
+                kwargs={param: arguments[param] for param in params},
+            )
+            yield pattern.name, path
+            for query in VARIANTS.get(pattern.name, ()):
+                yield pattern.name, path + query
+
+    def _request(self, client, path):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(path)
+            elapsed = (time.perf_counter() - start) * 1000
+        return response, elapsed, len(queries)
+
+    def _time(self, client, name, path, repeat):
+        response, cold_ms, cold_queries = self._request(client, path)
+        timings = []
+        warm_queries = cold_queries
+        for _ in range(repeat):
+            response, elapsed, warm_queries = self._request(client, path)
+            timings.append(elapsed)
+        timings.sort()
+        result = {
+            'name': name,
+            'path': path,
+            'status': response.status_code,
+            'cold_ms': round(cold_ms, 3),
+            'cold_queries': cold_queries,
+            'queries': warm_queries,
+            'bytes': len(response.content),
+        }
+        if timings:
+            result.update({
+                f'p{percent}_ms': round(_percentile(timings, percent), 3)
+                for percent in (50, 90, 99)
+            })
+            result['mean_ms'] = round(sum(timings) / len(timings), 3)
+        return result
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import posixpath
+import re
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from django.template.utils import get_app_template_dirs
+
+from portfolio import assets, site_profile
+from portfolio.models import Skill
+
+# Google Fonts picks the font format from the User-Agent; this one gets WOFF2.
+USER_AGENT = (
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Download Bootstrap, Font Awesome and Inter, subset them to what the '
+        'templates use and write minified bundles for collectstatic'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--refresh', action='store_true',
+            help='Download the libraries again instead of using the download cache',
+        )
+        parser.add_argument(
+            '--offline', action='store_true',
+            help='Only use the download cache; fail if something is missing from it',
+        )
+
+    def handle(self, *args, **options):
+        self.refresh = options['refresh']
+        self.offline = options['offline']
+        self.output = assets.build_dir()
+        self.cache_dir = settings.PORTFOLIO_BUILD_DIR / 'cache'
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        templates = self._read_all(self._template_files())
+        stylesheets = self._read_all(self._static_files('.css'))
+        scripts = self._read_all(self._static_files('.js'))
+
+        self.vendor_bootstrap()
+        self.vendor_font_awesome(templates + scripts + self._stored_icons())
+        self.vendor_inter(templates + stylesheets)
+
+        for name in assets.BUNDLES:
+            self.write_bundle(name)
+
+    # Sources
+
+    def _template_files(self):
+        directories = [Path(d) for engine in settings.TEMPLATES for d in engine.get('DIRS', [])]
+        directories += [Path(d) for d in get_app_template_dirs('templates')]
+        return [path for directory in directories for path in directory.rglob('*.html')]
+
+    def _static_files(self, extension):
+        files = []
+        for finder in finders.get_finders():
+            for path, storage in finder.list(['vendor/*', f'{assets.BUNDLE_DIR}/*', 'admin/*']):
+                if path.endswith(extension):
+                    files.append(Path(storage.path(path)))
+        return files
+
+    def _read_all(self, paths):
+        return [path.read_text(encoding='utf-8') for path in paths]
+
+    def _stored_icons(self):
+        extra = list(getattr(settings, 'PORTFOLIO_EXTRA_ICONS', [])) + site_profile.icons()
+        try:
+            return extra + list(Skill.objects.exclude(icon='').values_list('icon', flat=True))
+        except DatabaseError:
+            self.stderr.write('Could not read skill icons from the database; only scanning files')
+            return extra
+
+    # Downloads
+
+    def fetch_path(self, url):
+        """Path of the downloaded ``url`` in the download cache"""
+        suffix = posixpath.splitext(url.split('?')[0])[1]
+        cached = self.cache_dir / (hashlib.sha256(url.encode()).hexdigest()[:20] + suffix)
+        if cached.exists() and not self.refresh:
+            return cached
+        if self.offline:
+            raise CommandError(f'{url} is not in the download cache ({self.cache_dir})')
+        self.stdout.write(f'  downloading {url}')
+        request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+        with urllib.request.urlopen(request, timeout=30) as response:
+            data = response.read()
+        cached.write_bytes(data)
+        return cached
+
+    def fetch(self, url):
+        return self.fetch_path(url).read_bytes()
+
+    def write(self, path, data):
+        target = self.output / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        target.write_bytes(data)
+        return len(data)
+
+    # Libraries
+
+    def vendor_bootstrap(self):
+        for path, url in assets.BOOTSTRAP_FILES.items():
+            self.write(path, assets.strip_source_maps(self.fetch(url).decode('utf-8')))
+        self.stdout.write(f'Bootstrap {assets.BOOTSTRAP_VERSION}')
+
+    def vendor_font_awesome(self, texts):
+        used = assets.icon_classes(texts)
+        full_css = self.fetch(f'{assets.FONT_AWESOME_URL}/css/all.min.css').decode('utf-8')
+        extension = self._font_flavor()
+        css, codepoints = assets.subset_font_awesome(full_css, used, extension)
+        self.write(assets.FONT_AWESOME_CSS, css)
+        kept = sorted(name for name in used if re.search(r'\.%s(?![\w-])' % re.escape(name), css))
+        self.write(assets.FONT_AWESOME_ICONS, json.dumps(kept))
+
+        directory = posixpath.dirname(assets.FONT_AWESOME_CSS)
+        subsetted = True
+        before = after = 0
+        for font in assets.FONT_AWESOME_FONTS:
+            if f'webfonts/{font}.' not in css:
+                continue
+            source = self.fetch_path(f'{assets.FONT_AWESOME_URL}/webfonts/{font}.woff2')
+            target = self.output / directory / 'webfonts' / f'{font}.{extension}'
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if not assets.subset_font(str(source), str(target), codepoints, flavor=extension):
+                subsetted = False
+                target.write_bytes(source.read_bytes())
+            before += source.stat().st_size
+            after += target.stat().st_size
+
+        icons = len([name for name in kept if f'.{name}:' in css])
+        self.stdout.write(
+            f'Font Awesome {assets.FONT_AWESOME_VERSION}: {icons} icons, '
+            f'CSS {len(full_css) // 1024} KiB -> {len(css) // 1024} KiB, '
+            f'fonts {before // 1024} KiB -> {after // 1024} KiB'
+        )
+        if not subsetted:
+            self.stderr.write('fontTools is not installed; Font Awesome fonts were copied whole')
+
+    def _font_flavor(self):
+        """WOFF2 output needs fontTools and brotli; fontTools alone writes WOFF"""
+        try:
+            import fontTools.subset  # noqa: F401
+        except ImportError:
+            # The downloaded WOFF2 fonts are used as they are.
+            return 'woff2'
+        try:
+            import brotli  # noqa: F401
+        except ImportError:
+            return 'woff'
+        return 'woff2'
+
+    def vendor_inter(self, texts):
+        weights = assets.font_weights(texts)
+        url = assets.INTER_URL.format(weights=';'.join(str(weight) for weight in weights))
+        css = self.fetch(url).decode('utf-8')
+
+        directory = posixpath.dirname(assets.INTER_CSS)
+        faces = []
+        for subset, face in re.findall(r'/\*\s*([\w-]+)\s*\*/\s*(@font-face\s*\{.*?\})', css, re.S):
+            if subset not in assets.INTER_SUBSETS:
+                continue
+            for font_url in re.findall(r'url\((https://[^)]+)\)', face):
+                name = 'files/' + posixpath.basename(font_url)
+                self.write(posixpath.join(directory, name), self.fetch(font_url))
+                face = face.replace(font_url, name)
+            faces.append(face)
+        self.write(assets.INTER_CSS, assets.minify_css('\n'.join(faces)))
+        self.stdout.write(
+            f'Inter: weights {", ".join(map(str, weights))}; {", ".join(assets.INTER_SUBSETS)}'
+        )
+
+    # Bundles
+
+    def _source(self, path):
+        built = self.output / path
+        if built.exists():
+            return built
+        found = finders.find(path)
+        if found is None:
+            raise CommandError(f'Bundle source {path} not found')
+        return Path(found)
+
+    def write_bundle(self, name):
+        target = f'{assets.BUNDLE_DIR}/{name}'
+        parts = []
+        source_size = 0
+        for path in assets.BUNDLES[name]:
+            text = self._source(path).read_text(encoding='utf-8')
+            source_size += len(text.encode('utf-8'))
+            minified = '.min.' in path
+            if name.endswith('.css'):
+                text = assets.rebase_urls(text, path, target)
+                parts.append(text if minified else assets.minify_css(text))
+            else:
+                parts.append(text if minified else assets.minify_js(text))
+        separator = '\n' if name.endswith('.css') else ';\n'
+        size = self.write(target, separator.join(part.strip() for part in parts) + '\n')
+        self.stdout.write(f'  {target}: {source_size // 1024} KiB -> {size // 1024} KiB')
@@ -0,0 +1,59 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from portfolio import caching, images
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate responsive WebP/JPEG variants and placeholders for every uploaded '
+        'image, in parallel across a process pool'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Worker processes (default: number of CPUs)',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regenerate images that already have derivatives',
+        )
+
+    def handle(self, *args, **options):
+        names = set()
+        for model, field in images.image_fields():
+            names.update(
+                model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+                .values_list(field, flat=True)
+            )
+        if not names:
+            self.stdout.write('No uploaded images.')
+            return
+
+        self.stdout.write(f'Processing {len(names)} images with {options["workers"]} workers...')
+        start = time.perf_counter()
+        # Forked workers must not share the parent's database connections.
+        connections.close_all()
+        written = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=images.worker_init) as pool:
+            futures = [pool.submit(images.backfill, name, options['force']) for name in sorted(names)]
+            for future in as_completed(futures):
+                name, count, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(f'  {name}: {error}')
+                else:
+                    written += count
+        for model, _ in images.image_fields():
+            caching.bump(model)
+
+        elapsed = time.perf_counter() - start
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(
+            f'{len(names) - failed} images ready ({written} variants), {failed} failed, in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,40 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from portfolio import caching
+
+
+class Command(BaseCommand):
+    help = (
+        'Report hit, miss and invalidation counts for cached pages and fragments, and '
+        'the hit ratio of the whole cache when its backend counts it'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Reset all counters after reporting them',
+        )
+
+    def handle(self, *args, **options):
+        report = caching.stats.report()
+        self.stdout.write(f"{'entry':<32} {'hits':>8} {'misses':>8} {'hit ratio':>10} {'invalidations':>14}")
+        for name, counts in report.items():
+            lookups = counts['hit'] + counts['miss']
+            ratio = f"{counts['hit'] / lookups:.1%}" if lookups else '-'
+            self.stdout.write(
+                f"{name:<32} {counts['hit']:>8} {counts['miss']:>8} {ratio:>10} {counts['invalidation']:>14}"
+            )
+        backend = getattr(cache, 'stats', None)
+        if backend is not None:
+            counts = backend()
+            ratio = f"{counts['hit_ratio']:.1%}" if counts['hit_ratio'] is not None else '-'
+            self.stdout.write(
+                f"\nWhole cache: {counts['hit']} hits, {counts['miss']} misses, hit ratio {ratio}; "
+                f"{counts['stale']} stale values served during rebuilds, {counts['early']} early rebuilds"
+            )
+        if options['reset']:
+            caching.stats.reset()
+            if backend is not None:
+                cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
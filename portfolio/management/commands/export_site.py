@@ -0,0 +1,93 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from portfolio import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Render the public pages to static HTML, re-rendering only pages whose '
+        'data, templates or code changed since the last export'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=settings.PORTFOLIO_EXPORT_DIR,
+            help=f'Directory to write the pages to (default: {settings.PORTFOLIO_EXPORT_DIR})',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Worker processes (default: number of CPUs)',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=25,
+            help='Pages rendered per task (default: 25)',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Re-render every page',
+        )
+
+    def handle(self, *args, **options):
+        root = Path(options['output'])
+        root.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+
+        fingerprints = export.fingerprints()
+        code = export.code_fingerprint()
+        previous = {} if options['force'] else export.load_manifest(root)
+        pages = list(export.pages())
+        signatures = {page.path: page.signature(fingerprints, code) for page in pages}
+        stale = [
+            page for page in pages
+            if previous.get(page.path) != signatures[page.path] or not page.file(root).exists()
+        ]
+
+        removed = 0
+        for path in set(previous) - set(signatures):
+            target = export.Page(path, path, []).file(root)
+            if target.exists():
+                target.unlink()
+                removed += 1
+            self._remove_empty_parents(target.parent, root)
+
+        self.stdout.write(
+            f'{len(pages)} pages: {len(stale)} to render, '
+            f'{len(pages) - len(stale)} unchanged, {removed} removed'
+        )
+        failed = set()
+        if stale:
+            chunks = [stale[i:i + options['chunk_size']] for i in range(0, len(stale), options['chunk_size'])]
+            # Forked workers must not share the parent's database connections.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=export.worker_init) as pool:
+                futures = [pool.submit(export.render_pages, chunk, root) for chunk in chunks]
+                for future in as_completed(futures):
+                    for path, error in future.result():
+                        if error:
+                            failed.add(path)
+                            self.stderr.write(f'  {path}: {error}')
+
+        # Failed pages keep their previous signature, so the next run retries them.
+        export.save_manifest(root, {
+            path: previous.get(path) if path in failed else signature
+            for path, signature in signatures.items()
+            if path not in failed or path in previous
+        })
+
+        elapsed = time.perf_counter() - start
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(
+            f'Rendered {len(stale) - len(failed)} pages, {len(failed)} failed, in {elapsed:.1f}s'
+        ))
+
+    def _remove_empty_parents(self, directory, root):
+        while directory != root and directory.is_dir() and not any(directory.iterdir()):
+            directory.rmdir()
+            directory = directory.parent
@@ -0,0 +1,92 @@
+import os
+import posixpath
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.utils import timezone
+
+from portfolio import images
+from portfolio.storage import INCOMING_DIR
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete uploaded files, image derivatives and leftover upload spools that '
+        'no model field refers to any more'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=float, default=24,
+            help='Only delete files older than this many hours, so uploads whose '
+                 'row is not saved yet survive (default: 24)',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='List what would be deleted without deleting it',
+        )
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        if not storage.exists(''):
+            self.stdout.write('No media directory.')
+            return
+        referenced = self._referenced_names()
+        cutoff = timezone.now() - timedelta(hours=options['min_age'])
+
+        deleted = kept = 0
+        reclaimed = 0
+        for name in self._walk(storage, ''):
+            in_spool = name.startswith(INCOMING_DIR + '/')
+            if not in_spool and (name in referenced or images.source_name(name, storage=storage) in referenced):
+                kept += 1
+                continue
+            if storage.get_modified_time(name) > cutoff:
+                kept += 1
+                continue
+            size = storage.size(name)
+            if options['dry_run']:
+                self.stdout.write(f'  would delete {name} ({size} bytes)')
+            else:
+                storage.delete(name)
+            deleted += 1
+            reclaimed += size
+
+        if not options['dry_run'] and hasattr(storage, 'location'):
+            self._remove_empty_directories(storage.location)
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {deleted} files ({reclaimed / 1024 / 1024:.1f} MiB), kept {kept}'
+        ))
+
+    def _referenced_names(self):
+        names = set()
+        for model in apps.get_models():
+            for field in model._meta.concrete_fields:
+                if isinstance(field, models.FileField):
+                    names.update(
+                        model._default_manager.exclude(**{field.attname: ''})
+                        .exclude(**{f'{field.attname}__isnull': True})
+                        .values_list(field.attname, flat=True)
+                        .iterator()
+                    )
+        return names
+
+    def _walk(self, storage, directory):
+        directories, files = storage.listdir(directory)
+        for name in files:
+            yield posixpath.join(directory, name) if directory else name
+        for subdirectory in directories:
+            yield from self._walk(storage, posixpath.join(directory, subdirectory) if directory else subdirectory)
+
+    def _remove_empty_directories(self, root):
+        for path, _, _ in os.walk(root, topdown=False):
+            if path != str(root) and not os.listdir(path):
+                try:
+                    os.rmdir(path)
+                except OSError:
+                    pass
@@ -1,6 +1,7 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from datetime import date
+from portfolio import synthetic
 from portfolio.models import (
     PersonalInfo, Skill, Project, Experience, 
     Education, Certification, Contact, BlogPost
@@ -9,7 +10,22 @@ from portfolio.models import (
 class Command(BaseCommand):
     help = 'Populate the database with sample data for Jamuna Yadav portfolio'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=int,
+            help='Generate a deterministic synthetic dataset with this many projects, '
+                 'blog posts and contact messages instead of the hand-written sample',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=42,
+            help='Random seed for --scale (default: 42)',
+        )
+
     def handle(self, *args, **options):
+        if options['scale'] is not None:
+            self.populate_synthetic(options['scale'], options['seed'])
+            return
+
         self.stdout.write('Creating sample data for Jamuna Yadav portfolio...')
         
         # Create Personal Info
@@ -179,12 +195,7 @@ Analytics capabilities:
             )
             
             # Add technologies
-            for tech_name in technologies:
-                try:
-                    tech = Skill.objects.get(name=tech_name)
-                    project.technologies.add(tech)
-                except Skill.DoesNotExist:
-                    pass
+            project.technologies.add(*Skill.objects.filter(name__in=technologies))
             
             if created:
                 self.stdout.write(f'Created project: {project.title}')
@@ -266,12 +277,7 @@ Responsibilities:
             )
             
             # Add technologies
-            for tech_name in technologies:
-                try:
-                    tech = Skill.objects.get(name=tech_name)
-                    experience.technologies_used.add(tech)
-                except Skill.DoesNotExist:
-                    pass
+            experience.technologies_used.add(*Skill.objects.filter(name__in=technologies))
             
             if created:
                 self.stdout.write(f'Created experience: {experience.position} at {experience.company}')
@@ -641,3 +647,15 @@ The key is to start simple and gradually add complexity as your requirements gro
         self.stdout.write('You can now access the admin panel at /admin/')
         self.stdout.write('Default admin credentials: admin / admin (you should change this)')
 
+    def populate_synthetic(self, scale, seed):
+        if scale < 1:
+            raise CommandError('--scale must be a positive number')
+        if synthetic.exists():
+            raise CommandError(
+                'Synthetic data already exists; run "manage.py flush" first to start again'
+            )
+        self.stdout.write(f'Generating synthetic dataset at scale {scale} (seed {seed})...')
+        sizes = synthetic.generate(scale, seed=seed)
+        for name, count in sizes.items():
+            self.stdout.write(f'  {name}: {count}')
+        self.stdout.write(self.style.SUCCESS('Successfully created synthetic data'))
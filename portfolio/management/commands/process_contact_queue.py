@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from portfolio import contact_queue
+
+
+class Command(BaseCommand):
+    help = (
+        'Save queued contact form submissions and send their notification emails. Web '
+        'processes do this themselves unless CONTACT_QUEUE_WORKER=True; run this with '
+        '--loop on the same host (or spool volume) as the web server in that case.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Messages inserted per transaction (default: 100)',
+        )
+        parser.add_argument(
+            '--max-attempts', type=int, default=5,
+            help='Notification attempts before a message is moved to failed/ (default: 5)',
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling the queue instead of exiting once it is drained',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Seconds between polls with --loop (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.process(options)
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def process(self, options):
+        recovered, saved, sent, retried, failed = contact_queue.process(
+            options['batch_size'], options['max_attempts'],
+        )
+        if recovered:
+            self.stdout.write(f'Requeued {recovered} abandoned messages')
+        if saved or sent or retried or failed or not options['loop']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Saved {saved} messages; notifications: {sent} sent, '
+                f'{retried} to retry, {failed} failed'
+            ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio import snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the database into a new immutable snapshot and make public pages read '
+        'it (publish mode, see portfolio/snapshot.py)'
+    )
+
+    def handle(self, *args, **options):
+        if not snapshot.configured():
+            raise CommandError('Publish mode is off (set SNAPSHOT_DIR)')
+        try:
+            path = snapshot.publish()
+        except snapshot.SnapshotError as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(f'Published {path}')
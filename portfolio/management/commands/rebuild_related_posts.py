@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from portfolio import related_posts
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the content-based related-posts index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=related_posts.BLOCK_ROWS,
+            help=f'Posts searched and written at once (default: {related_posts.BLOCK_ROWS})',
+        )
+        parser.add_argument(
+            '--top-n', type=int, default=related_posts.TOP_N,
+            help=f'Related posts kept per post (default: {related_posts.TOP_N})',
+        )
+        parser.add_argument(
+            '--retokenize', action='store_true',
+            help='Re-tokenise every post instead of only posts without stored terms',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding related-posts index...')
+        start = time.perf_counter()
+        done = total = 0
+        for done, total in related_posts.rebuild(
+            batch_size=options['batch_size'],
+            top_n=options['top_n'],
+            retokenize=options['retokenize'],
+        ):
+            self.stdout.write(f'  {done}/{total} posts')
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt related posts for {total} published posts in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from portfolio import similarity
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the related-projects similarity index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of projects recomputed and written per transaction (default: 500)',
+        )
+        parser.add_argument(
+            '--top-k', type=int, default=similarity.TOP_K,
+            help=f'Neighbours kept per project (default: {similarity.TOP_K})',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding related-projects index...')
+        done = total = 0
+        for done, total in similarity.rebuild(batch_size=options['batch_size'], top_k=options['top_k']):
+            self.stdout.write(f'  {done}/{total} projects')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt neighbours for {total} projects'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the blog post full-text search index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of posts written to the index per batch (default: 1000)',
+        )
+        parser.add_argument(
+            '--database', default=None,
+            help='Database alias to rebuild the index on',
+        )
+
+    def handle(self, *args, **options):
+        if not search.is_available(options['database']):
+            raise CommandError('The configured database does not support the search index.')
+
+        self.stdout.write('Rebuilding blog search index...')
+        total = search.rebuild_index(
+            batch_size=options['batch_size'], using=options['database'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} published posts'))
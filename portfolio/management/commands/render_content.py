@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from portfolio import caching, rendering
+from portfolio.models import BlogPost, Project
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the stored HTML, summary, word count and reading time of blog posts '
+        'and projects. By default only rows that have never been rendered are updated.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Re-render every row, e.g. after installing Markdown or Pygments',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Rows rendered and written per batch (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        targets = [
+            (BlogPost, 'content_html', ['pk', 'content', 'excerpt'], rendering.update_blog_post, rendering.BLOG_POST_FIELDS),
+            (Project, 'description_html', ['pk', 'description'], rendering.update_project, rendering.PROJECT_FIELDS),
+        ]
+        for model, html_field, source_fields, update, fields in targets:
+            rows = model.objects.only(*source_fields).order_by('pk')
+            if not options['all']:
+                rows = rows.filter(**{html_field: ''})
+            done = self._render(rows, update, fields, options['batch_size'])
+            if done:
+                caching.bump(model)
+            self.stdout.write(f'Rendered {done} {model._meta.verbose_name_plural}')
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'Done in {elapsed:.1f}s'))
+
+    def _render(self, rows, update, fields, batch_size):
+        # Walk by primary key rather than holding a cursor open while the
+        # same rows are written. bulk_update leaves updated_at alone:
+        # re-rendering is not an edit.
+        done = 0
+        last_pk = None
+        while True:
+            batch = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+            batch = list(batch[:batch_size])
+            if not batch:
+                return done
+            for obj in batch:
+                update(obj)
+            with transaction.atomic():
+                rows.model.objects.bulk_update(batch, fields)
+            done += len(batch)
+            last_pk = batch[-1].pk
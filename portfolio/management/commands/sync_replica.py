@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from portfolio.db_router import REPLICA, replica_configured
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database over the replica, to try replica '
+        'routing locally with two SQLite files'
+    )
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError('No replica database is configured (set REPLICA_DATABASE_URL)')
+        source, target = connections[DEFAULT_DB_ALIAS], connections[REPLICA]
+        if source.vendor != 'sqlite' or target.vendor != 'sqlite':
+            raise CommandError('Only SQLite replicas can be synced; others are kept in sync by the database server')
+        if source.settings_dict['NAME'] == target.settings_dict['NAME']:
+            raise CommandError('The primary and the replica are the same file')
+
+        source.ensure_connection()
+        target.ensure_connection()
+        source.connection.backup(target.connection)
+        self.stdout.write(f'Copied {source.settings_dict["NAME"]} to {target.settings_dict["NAME"]}')
@@ -0,0 +1,164 @@
+"""
+Serving uploaded media in production.
+
+``serve`` answers conditional requests (ETag and Last-Modified) with 304,
+supports single byte ranges (206/416) and marks content-addressed uploads
+(see ``portfolio.storage``) as immutable, so browsers and CDNs keep them for
+a year without revalidating. Everything else, image derivatives and their
+manifests included, is cached for ``PORTFOLIO_MEDIA_MAX_AGE`` and then
+revalidated against an ETag from its modification time and size, since
+``build_image_derivatives --force`` rewrites derivatives under the same
+name.
+
+When ``PORTFOLIO_MEDIA_SENDFILE`` is set, the file transfer itself is handed
+to the fronting web server, which also handles ranges:
+
+* ``'x-sendfile'`` sets ``X-Sendfile`` to the absolute path (Apache
+  mod_xsendfile, lighttpd).
+* ``'x-accel-redirect'`` sets ``X-Accel-Redirect`` to
+  ``PORTFOLIO_MEDIA_ACCEL_PREFIX`` + the file name, which should be an
+  ``internal`` nginx location aliased to ``MEDIA_ROOT``.
+
+Otherwise the file is streamed by Django: whole files through
+``FileResponse`` (which lets the WSGI server use ``sendfile()``), ranges in
+fixed-size chunks.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+from .storage import INCOMING_DIR, is_content_addressed
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+mimetypes.add_type('image/webp', '.webp')
+
+
+def _etag(name, stat):
+    if is_content_addressed(name):
+        # The name already identifies the content.
+        return quote_etag(os.path.basename(name))
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+
+
+def _byte_range(header, size):
+    """
+    ``(start, end)`` for a single-range ``Range`` header, None to send the
+    whole file (absent, malformed or multi-range), or False if unsatisfiable.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    value = request.headers.get('If-Range')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def _chunks(path, start, length):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def _cache_control(name):
+    if is_content_addressed(name):
+        return IMMUTABLE
+    return f"public, max-age={getattr(settings, 'PORTFOLIO_MEDIA_MAX_AGE', 3600)}"
+
+
+@require_safe
+def serve(request, path):
+    """Serve a file from MEDIA_ROOT"""
+    name = path.replace('\\', '/')
+    if not name or name.startswith(INCOMING_DIR + '/'):
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    etag = _etag(name, stat)
+    last_modified = int(stat.st_mtime)
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': _cache_control(name),
+        'Accept-Ranges': 'bytes',
+    }
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    mode = getattr(settings, 'PORTFOLIO_MEDIA_SENDFILE', None)
+    if mode:
+        response = HttpResponse(content_type=content_type, headers=headers)
+        if mode == 'x-accel-redirect':
+            prefix = getattr(settings, 'PORTFOLIO_MEDIA_ACCEL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + name
+        else:
+            response['X-Sendfile'] = full_path
+        return response
+
+    size = stat.st_size
+    byte_range = None
+    if _if_range_matches(request, etag, last_modified):
+        byte_range = _byte_range(request.headers.get('Range'), size)
+    if byte_range is False:
+        response = HttpResponse(status=416, headers=headers)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        return FileResponse(open(full_path, 'rb'), content_type=content_type, headers=headers)
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _chunks(full_path, start, end - start + 1),
+        status=206, content_type=content_type, headers=headers,
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(end - start + 1)
+    return response
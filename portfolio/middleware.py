@@ -0,0 +1,290 @@
+import contextvars
+import json
+import logging
+import math
+import os
+import socket
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger('portfolio.timing')
+
+_current = contextvars.ContextVar('portfolio_request_timing', default=None)
+_templates_instrumented = False
+
+
+class RequestTiming:
+    """Measurements collected while serving one request"""
+
+    slow_query_count = 3
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.view_start = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.slow_queries = []
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += duration
+            self.slow_queries.append((duration, sql))
+            if len(self.slow_queries) > self.slow_query_count:
+                self.slow_queries.sort(key=lambda item: item[0], reverse=True)
+                self.slow_queries.pop()
+
+
+def _instrument_templates():
+    """
+    Wrap the template backend's render() once so render time is attributed
+    to the current request. Nested renders are only counted at the top level.
+    """
+    global _templates_instrumented
+    if _templates_instrumented:
+        return
+    from django.template.backends.django import Template
+
+    original_render = Template.render
+
+    def render(self, context=None, request=None):
+        timing = _current.get()
+        if timing is None:
+            return original_render(self, context, request)
+        timing.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            timing.template_depth -= 1
+            if not timing.template_depth:
+                timing.template_time += time.perf_counter() - start
+
+    Template.render = render
+    _templates_instrumented = True
+
+
+class TimingStore:
+    """
+    Request timings per URL name, shared by every worker through the cache.
+
+    Each worker counts its requests in log-spaced histograms (buckets
+    ``GROWTH`` apart, so percentiles are within 5% of the exact value; query
+    counts are exact) and writes them to the cache under a key of its own,
+    at most every ``flush_interval`` seconds. ``summary()`` adds up the
+    histograms of every worker listed in the cache. ``clear()`` starts a new
+    generation, which workers notice at their next write.
+    """
+
+    flush_interval = 1.0
+    timeout = 7 * 24 * 60 * 60
+    metrics = ('total', 'view', 'db', 'template', 'queries')
+    min_ms = 0.01
+    growth = 1.1
+    key_prefix = 'portfolio:timing'
+
+    def __init__(self):
+        self._requests = Counter()
+        self._histograms = defaultdict(Counter)
+        self._lock = threading.Lock()
+        self._generation = None
+        # Pending write, and the process that scheduled it: a forked worker
+        # inherits the attribute but not the thread.
+        self._timer = None
+        self._timer_pid = None
+
+    @property
+    def worker(self):
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def _bucket(self, metric, value):
+        if metric == 'queries':
+            return int(value)
+        if value <= self.min_ms:
+            return 0
+        return 1 + int(math.log(value / self.min_ms, self.growth))
+
+    def _value(self, metric, bucket):
+        if metric == 'queries' or bucket == 0:
+            return bucket
+        # Geometric middle of the bucket.
+        return self.min_ms * self.growth ** (bucket - 0.5)
+
+    def add(self, url_name, sample):
+        with self._lock:
+            if self._timer_pid != os.getpid():
+                # Counts inherited from the parent process are its own.
+                self._requests.clear()
+                self._histograms.clear()
+                self._timer = None
+            self._requests[url_name] += 1
+            for metric in self.metrics:
+                self._histograms[url_name, metric][self._bucket(metric, sample[metric])] += 1
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush_logged)
+                self._timer.daemon = True
+                self._timer_pid = os.getpid()
+                self._timer.start()
+
+    def _key(self, generation, name):
+        return f'{self.key_prefix}:{generation}:{name}'
+
+    def _current_generation(self):
+        key = f'{self.key_prefix}:generation'
+        cache.add(key, time.time_ns(), timeout=None)
+        return cache.get(key)
+
+    def flush(self):
+        """Write this worker's histograms to the cache"""
+        generation = self._current_generation()
+        with self._lock:
+            self._timer = None
+            if generation != self._generation:
+                # Cleared since the last write: start over.
+                if self._generation is not None:
+                    self._requests.clear()
+                    self._histograms.clear()
+                self._generation = generation
+            data = {
+                'requests': dict(self._requests),
+                'histograms': {key: dict(counts) for key, counts in self._histograms.items()},
+            }
+        cache.set(self._key(generation, f'worker:{self.worker}'), data, self.timeout)
+        workers_key = self._key(generation, 'workers')
+        workers = cache.get(workers_key, set())
+        if self.worker not in workers:
+            # Two workers joining at once may drop one of them; it adds
+            # itself again at its next write.
+            cache.set(workers_key, workers | {self.worker}, self.timeout)
+
+    def _flush_logged(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Could not write request timings')
+
+    def clear(self):
+        key = f'{self.key_prefix}:generation'
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+        with self._lock:
+            self._requests.clear()
+            self._histograms.clear()
+
+    def _percentile(self, metric, histogram, total, percent):
+        index = min(total - 1, int(round(percent / 100 * (total - 1))))
+        seen = 0
+        for bucket in sorted(histogram):
+            seen += histogram[bucket]
+            if seen > index:
+                return self._value(metric, bucket)
+        return 0
+
+    def summary(self):
+        """Request counts and p50/p90/p99 of each metric per URL name, and the number of workers"""
+        self.flush()
+        generation = self._current_generation()
+        workers = cache.get(self._key(generation, 'workers'), set())
+        found = cache.get_many([self._key(generation, f'worker:{worker}') for worker in workers])
+        requests = Counter()
+        histograms = defaultdict(Counter)
+        for data in found.values():
+            requests.update(data['requests'])
+            for key, counts in data['histograms'].items():
+                histograms[key].update(counts)
+        rows = []
+        for name, total in sorted(requests.items()):
+            row = {'url_name': name, 'requests': total}
+            for metric in self.metrics:
+                for percent in (50, 90, 99):
+                    row[f'{metric}_p{percent}'] = self._percentile(metric, histograms[name, metric], total, percent)
+            rows.append(row)
+        return rows, len(found)
+
+
+timing_store = TimingStore()
+
+
+class RequestTimingMiddleware:
+    """
+    Records query count, DB time, the slowest queries, template render time
+    and view time for every request. The numbers are sent as a
+    ``Server-Timing`` header, logged as JSON to the ``portfolio.timing``
+    logger and aggregated per URL name, across workers, for the staff
+    timing panel.
+
+    Only installed when ``PORTFOLIO_REQUEST_TIMING`` is on; see settings.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _instrument_templates()
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timing.record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        end = time.perf_counter()
+        total = (end - timing.start) * 1000
+        view = (end - timing.view_start) * 1000 if timing.view_start else 0.0
+        db = timing.db_time * 1000
+        template = timing.template_time * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.view_name if match else None
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db:.2f};desc="{timing.queries} queries"',
+            f'tpl;dur={template:.2f};desc="Template render"',
+            f'view;dur={view:.2f};desc="View"',
+            f'total;dur={total:.2f};desc="Total"',
+        ])
+
+        if url_name:
+            timing_store.add(url_name, {
+                'total': total, 'view': view, 'db': db,
+                'template': template, 'queries': timing.queries,
+            })
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'url_name': url_name,
+                'status': response.status_code,
+                'pid': os.getpid(),
+                'total_ms': round(total, 2),
+                'view_ms': round(view, 2),
+                'db_ms': round(db, 2),
+                'template_ms': round(template, 2),
+                'queries': timing.queries,
+                'slow_queries': [
+                    {'ms': round(duration * 1000, 2), 'sql': sql[:300]}
+                    for duration, sql in sorted(timing.slow_queries, key=lambda item: item[0], reverse=True)
+                ],
+            }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = _current.get()
+        if timing is not None:
+            timing.view_start = time.perf_counter()
+        return None
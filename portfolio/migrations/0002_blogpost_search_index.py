@@ -0,0 +1,56 @@
+from django.db import migrations
+
+FTS_TABLE = 'portfolio_blogpost_fts'
+PG_TABLE = 'portfolio_blogpost_search'
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5("
+            "title, excerpt, content, tokenize='porter unicode61')" % FTS_TABLE
+        )
+        schema_editor.execute(
+            "INSERT INTO %s (rowid, title, excerpt, content) "
+            "SELECT id, title, excerpt, content FROM portfolio_blogpost "
+            "WHERE published" % FTS_TABLE
+        )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS %s ("
+            "post_id bigint PRIMARY KEY REFERENCES portfolio_blogpost (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)" % PG_TABLE
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS %s_document_gin ON %s USING gin (document)"
+            % (PG_TABLE, PG_TABLE)
+        )
+        schema_editor.execute(
+            "INSERT INTO %s (post_id, document) "
+            "SELECT id, "
+            "setweight(to_tsvector('english', title), 'A') || "
+            "setweight(to_tsvector('english', excerpt), 'B') || "
+            "setweight(to_tsvector('english', content), 'C') "
+            "FROM portfolio_blogpost WHERE published" % PG_TABLE
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS %s' % FTS_TABLE)
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('DROP TABLE IF EXISTS %s' % PG_TABLE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0002_blogpost_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['-featured', 'order', '-created_at'], name='portfolio_project_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['created_at'], name='portfolio_project_created_idx'),
+        ),
+        # The auto-created Project.technologies table has a unique
+        # (project_id, skill_id) index and single-column indexes on each
+        # foreign key. Facet filtering and counting go from skills to
+        # projects; with (skill_id, project_id) they read both columns from
+        # the index alone, without visiting the table rows.
+        migrations.RunSQL(
+            'CREATE INDEX portfolio_project_technologies_skill_project_idx '
+            'ON portfolio_project_technologies (skill_id, project_id)',
+            'DROP INDEX portfolio_project_technologies_skill_project_idx',
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0003_project_facet_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text='Jaccard similarity of the two technology sets')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('neighbour', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbour_of', to='portfolio.project')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='portfolio.project')),
+            ],
+            options={
+                'verbose_name_plural': 'Project similarities',
+                'ordering': ['project', 'rank'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='projectsimilarity',
+            constraint=models.UniqueConstraint(fields=('project', 'rank'), name='portfolio_projectsimilarity_rank_uniq'),
+        ),
+    ]
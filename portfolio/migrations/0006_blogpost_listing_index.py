@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0005_related_posts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['published', '-created_at'], name='portfolio_blogpost_listing_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0007_rendered_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateTimeField(help_text='Start of the hour')),
+                ('view_name', models.CharField(max_length=200)),
+                ('reason', models.CharField(choices=[('client', 'Per-client limit'), ('global', 'Global limit')], max_length=10)),
+                ('rejected', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-period', 'view_name', 'reason'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ratelimitstat',
+            constraint=models.UniqueConstraint(fields=('period', 'view_name', 'reason'), name='portfolio_ratelimitstat_uniq'),
+        ),
+    ]
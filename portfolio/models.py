@@ -1,6 +1,8 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from . import rendering
+
 class PersonalInfo(models.Model):
     name = models.CharField(max_length=100)
     title = models.CharField(max_length=200)
@@ -56,14 +58,46 @@ class Project(models.Model):
     live_url = models.URLField(blank=True)
     featured = models.BooleanField(default=False)
     order = models.IntegerField(default=0)
+    description_html = models.TextField(blank=True, editable=False, help_text="Rendered from description on save")
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=1, editable=False, help_text="Minutes")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-featured', 'order', '-created_at']
+        indexes = [
+            models.Index(fields=['-featured', 'order', '-created_at'], name='portfolio_project_listing_idx'),
+            models.Index(fields=['created_at'], name='portfolio_project_created_idx'),
+        ]
     
     def __str__(self):
         return self.title
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'description' in update_fields:
+            rendering.update_project(self)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *rendering.PROJECT_FIELDS}
+        super().save(*args, **kwargs)
+
+class ProjectSimilarity(models.Model):
+    """Precomputed top-K most similar projects by shared technologies"""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='neighbours')
+    neighbour = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='neighbour_of')
+    score = models.FloatField(help_text="Jaccard similarity of the two technology sets")
+    rank = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        ordering = ['project', 'rank']
+        verbose_name_plural = "Project similarities"
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'rank'], name='portfolio_projectsimilarity_rank_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.project_id} -> {self.neighbour_id} ({self.score:.2f})"
 
 class Experience(models.Model):
     company = models.CharField(max_length=200)
@@ -137,11 +171,74 @@ class BlogPost(models.Model):
     excerpt = models.CharField(max_length=300, blank=True)
     image = models.ImageField(upload_to='blog/', blank=True, null=True)
     published = models.BooleanField(default=False)
+    content_html = models.TextField(blank=True, editable=False, help_text="Rendered from content on save")
+    summary = models.TextField(blank=True, editable=False, help_text="Excerpt, or the opening words of the content")
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=1, editable=False, help_text="Minutes")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['published', '-created_at'], name='portfolio_blogpost_listing_idx'),
+        ]
     
     def __str__(self):
         return self.title
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'content', 'excerpt'} & set(update_fields):
+            rendering.update_blog_post(self)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *rendering.BLOG_POST_FIELDS}
+        super().save(*args, **kwargs)
+
+class BlogPostTerms(models.Model):
+    """Weighted term counts of a blog post, used to build related-post vectors"""
+    post = models.OneToOneField(BlogPost, on_delete=models.CASCADE, primary_key=True, related_name='terms')
+    terms = models.JSONField(default=dict)
+    
+    class Meta:
+        verbose_name_plural = "Blog post terms"
+    
+    def __str__(self):
+        return f"Terms for {self.post_id}"
+
+class RelatedPost(models.Model):
+    """Precomputed top-N most similar published posts by TF-IDF cosine similarity"""
+    post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='related_to_entries')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        ordering = ['post', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'rank'], name='portfolio_relatedpost_rank_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.post_id} -> {self.related_id} ({self.score:.2f})"
+
+class RateLimitStat(models.Model):
+    """Requests turned away by the rate limiter, per hour, view and limit"""
+    REASONS = [
+        ('client', 'Per-client limit'),
+        ('global', 'Global limit'),
+    ]
+    
+    period = models.DateTimeField(help_text="Start of the hour")
+    view_name = models.CharField(max_length=200)
+    reason = models.CharField(max_length=10, choices=REASONS)
+    rejected = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-period', 'view_name', 'reason']
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'view_name', 'reason'], name='portfolio_ratelimitstat_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.view_name} {self.reason} {self.period:%Y-%m-%d %H:00}: {self.rejected}"
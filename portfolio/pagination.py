@@ -0,0 +1,172 @@
+"""
+Keyset (cursor) pagination for the project and blog listings.
+
+``Paginator`` counts every matching row and then skips ``OFFSET`` rows, so
+deep pages get slower the further in they are. A cursor page instead
+remembers the sort key of its first and last rows and fetches the next page
+with ``WHERE key > last`` on the listing's ordering, which costs the same on
+page 1000 as on page 1 and needs no count at all.
+
+Cursors are signed, opaque tokens passed as ``?cursor=``. Old ``?page=N``
+links are still served by ``Paginator``; see ``paginate()``.
+"""
+from functools import cached_property
+from types import SimpleNamespace
+
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+PROJECT_ORDERING = ('-featured', 'order', '-created_at', '-pk')
+BLOG_ORDERING = ('-created_at', '-pk')
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage:
+    """One page of a CursorPaginator, usable like a Django ``Page`` in templates"""
+
+    cursor_based = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @cached_property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.cursor_for(self.object_list[-1])
+
+    @cached_property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.cursor_for(self.object_list[0], backwards=True)
+
+
+class CursorPaginator:
+    """
+    Paginate a queryset by the values of ``ordering``, which must be non-null
+    fields and end with a unique one (usually ``pk``) so that every row has a
+    distinct position. ``count`` is only computed if something asks for it.
+
+    The queryset may also be a ``values()`` queryset that selects the
+    ordering fields (``id`` for ``pk``).
+    """
+
+    def __init__(self, queryset, per_page, ordering, salt='portfolio.pagination'):
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = per_page
+        self.ordering = ordering
+        self.salt = f'{salt}:{queryset.model._meta.label_lower}:{",".join(ordering)}'
+        self.fields = []
+        for name in ordering:
+            attname = name.lstrip('-')
+            field = queryset.model._meta.pk if attname == 'pk' else queryset.model._meta.get_field(attname)
+            self.fields.append((attname, field, name.startswith('-')))
+
+    @cached_property
+    def count(self):
+        return self.queryset.count()
+
+    def cursor_for(self, obj, backwards=False):
+        """Opaque token for the page after (or before) ``obj``"""
+        if isinstance(obj, dict):
+            key = [
+                field.value_to_string(SimpleNamespace(**{field.attname: obj[field.attname]}))
+                for _, field, _ in self.fields
+            ]
+        else:
+            key = [field.value_to_string(obj) for _, field, _ in self.fields]
+        return signing.dumps({'k': key, 'b': int(backwards)}, salt=self.salt, compress=True)
+
+    def _decode(self, token):
+        try:
+            data = signing.loads(token, salt=self.salt)
+            values = [
+                field.to_python(value)
+                for (_, field, _), value in zip(self.fields, data['k'], strict=True)
+            ]
+            return values, bool(data['b'])
+        except (signing.BadSignature, ValidationError, KeyError, TypeError, ValueError) as exc:
+            raise InvalidCursor(str(exc)) from exc
+
+    def _beyond(self, values, backwards):
+        """Rows strictly after ``values`` in the ordering (before, if ``backwards``)"""
+        keyset = Q()
+        for i, (attname, _, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition = Q(**{f'{attname}__{lookup}': values[i]})
+            for (prior, _, _), value in zip(self.fields[:i], values):
+                condition &= Q(**{prior: value})
+            keyset |= condition
+        # A plain range on the leading column lets the database seek in the
+        # listing index instead of testing every row against the OR.
+        attname, _, descending = self.fields[0]
+        lookup = 'lte' if descending != backwards else 'gte'
+        return Q(**{f'{attname}__{lookup}': values[0]}) & keyset
+
+    def page(self, cursor=None):
+        """The page a cursor points to; raises InvalidCursor for a bad token"""
+        if not cursor:
+            rows = list(self.queryset[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], self, len(rows) > self.per_page, False)
+
+        values, backwards = self._decode(cursor)
+        if not backwards:
+            rows = list(self.queryset.filter(self._beyond(values, False))[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], self, len(rows) > self.per_page, True)
+
+        reverse = [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+        rows = list(
+            self.queryset.filter(self._beyond(values, True)).order_by(*reverse)[:self.per_page + 1]
+        )
+        has_previous = len(rows) > self.per_page
+        return CursorPage(rows[:self.per_page][::-1], self, True, has_previous)
+
+    def get_page(self, cursor=None):
+        """Like ``page()``, but falls back to the first page for a bad token"""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+
+def paginate(request, queryset, per_page, ordering, count=None):
+    """
+    Page through a listing: keyset pages by default, or a numbered
+    ``Paginator`` page when the request still uses ``?page=N``.
+
+    ``count``, if the caller already knows it, saves the numbered paginator
+    its ``COUNT(*)`` query.
+    """
+    if request.GET.get('page'):
+        paginator = Paginator(queryset.order_by(*ordering), per_page)
+        if count is not None:
+            paginator.count = count
+        return paginator.get_page(request.GET.get('page'))
+    return CursorPaginator(queryset, per_page, ordering).get_page(request.GET.get('cursor'))
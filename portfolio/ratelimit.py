@@ -0,0 +1,264 @@
+"""
+Rate limiting for form posts.
+
+``RateLimitMiddleware`` checks every unsafe (POST, PUT, PATCH, DELETE)
+request to the views listed in ``PORTFOLIO_RATE_LIMIT['views']`` against two
+sliding windows: one per client IP and one shared by all clients. Rejected
+requests get a plain 429 from ``process_view``, before CSRF checks, form
+validation, sessions or the ORM are touched.
+
+The windows are sliding-window counters: the count of the current fixed
+window plus the previous one weighted by how much of it still overlaps, so
+each client costs three numbers. Clients are kept in an LRU of at most
+``max_clients`` entries per worker, which bounds memory whatever the number
+of addresses a bot uses.
+
+With ``shared`` on, allowed requests are also counted in the default cache
+(``cache.incr`` on per-window keys), so all gunicorn workers enforce one
+limit. The local counters still run first, so a client that is over the
+limit in this worker is rejected without a cache round trip.
+
+Rejected requests to ``JSON_VIEWS``, and requests that ask for JSON, get
+the 429 as ``{"error": ..., "retry_after": seconds}``, so the contact page
+script can show it.
+
+Rejections are counted per hour, view and limit in memory and written to
+``RateLimitStat`` (shown in the admin) from a background thread
+``FLUSH_INTERVAL`` seconds after the first one not yet written, whether or
+not more follow, and when the process exits.
+"""
+import atexit
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.http import HttpResponse, JsonResponse
+
+from .sqlite import retry_on_lock
+
+logger = logging.getLogger('portfolio.ratelimit')
+
+DEFAULTS = {
+    # (requests, window in seconds)
+    'per_client': (5, 60),
+    'global': (100, 60),
+    'views': ['portfolio:contact', 'portfolio:contact_submit'],
+    'shared': False,
+    'max_clients': 10000,
+    # Number of reverse proxies in front of the site that append to
+    # X-Forwarded-For; 0 uses REMOTE_ADDR.
+    'proxies': 0,
+}
+UNSAFE_METHODS = frozenset({'POST', 'PUT', 'PATCH', 'DELETE'})
+FLUSH_INTERVAL = 60
+# Views whose callers read JSON (the contact page script).
+JSON_VIEWS = frozenset({'portfolio:contact_submit'})
+CACHE_PREFIX = 'portfolio:ratelimit'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'PORTFOLIO_RATE_LIMIT', {})}
+
+
+class SlidingWindow:
+    """Sliding-window counters for many keys, least recently used first out"""
+
+    def __init__(self, limit, window, max_keys=None):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        # key -> [window index, count in that window, count in the one before]
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _estimate(self, counter, now):
+        index = int(now // self.window)
+        if counter[0] != index:
+            previous = counter[1] if counter[0] == index - 1 else 0
+            counter[:] = [index, 0, previous]
+        overlap = 1 - (now % self.window) / self.window
+        return counter[1] + counter[2] * overlap
+
+    def retry_after(self, now):
+        """Seconds until the current window ends"""
+        return max(1, math.ceil(self.window - now % self.window))
+
+    def hit(self, key, now=None):
+        """Count a request for ``key`` if it is within the limit; returns whether it was"""
+        now = time.time() if now is None else now
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = self._counters[key] = [int(now // self.window), 0, 0]
+                if self.max_keys is not None and len(self._counters) > self.max_keys:
+                    self._counters.popitem(last=False)
+            else:
+                self._counters.move_to_end(key)
+            if self._estimate(counter, now) + 1 > self.limit:
+                return False
+            counter[1] += 1
+            return True
+
+    def __len__(self):
+        return len(self._counters)
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+
+
+def shared_hit(scope, key, limit, window, now=None):
+    """Sliding-window check and count in the cache, shared by every worker"""
+    now = time.time() if now is None else now
+    index = int(now // window)
+    current = f'{CACHE_PREFIX}:{scope}:{key}:{index}'
+    previous = f'{CACHE_PREFIX}:{scope}:{key}:{index - 1}'
+    counts = cache.get_many([current, previous])
+    overlap = 1 - (now % window) / window
+    if counts.get(current, 0) + counts.get(previous, 0) * overlap + 1 > limit:
+        return False
+    if cache.add(current, 1, timeout=window * 2):
+        return True
+    try:
+        cache.incr(current)
+    except ValueError:
+        # Expired between add() and incr().
+        cache.set(current, 1, timeout=window * 2)
+    return True
+
+
+class RejectionStats:
+    """Rejection counts of this worker, written to RateLimitStat periodically"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        # Pending flush, and the process that scheduled it: a forked worker
+        # inherits the attribute but not the thread.
+        self._timer = None
+        self._timer_pid = None
+
+    def add(self, view_name, reason):
+        period = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        with self._lock:
+            self._counts[period, view_name, reason] += 1
+            if self._timer is None or self._timer_pid != os.getpid():
+                self._timer = threading.Timer(FLUSH_INTERVAL, self._flush_logged)
+                self._timer.daemon = True
+                self._timer_pid = os.getpid()
+                self._timer.start()
+
+    def take(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._timer = None
+        return counts
+
+    def flush(self, using=None):
+        """Add the pending counts to RateLimitStat; returns how many rows changed"""
+        counts = self.take()
+        if counts:
+            self._write(counts, using)
+        return len(counts)
+
+    @staticmethod
+    @retry_on_lock
+    def _write(counts, using):
+        from .models import RateLimitStat
+
+        # One transaction, so a retry after a lock error counts nothing twice.
+        with transaction.atomic(using=using):
+            for (period, view_name, reason), rejected in counts.items():
+                rows = RateLimitStat.objects.using(using).filter(
+                    period=period, view_name=view_name, reason=reason,
+                )
+                if rows.update(rejected=F('rejected') + rejected):
+                    continue
+                try:
+                    with transaction.atomic(using=using):
+                        RateLimitStat.objects.using(using).create(
+                            period=period, view_name=view_name, reason=reason, rejected=rejected,
+                        )
+                except IntegrityError:
+                    # Another worker created the row first.
+                    rows.update(rejected=F('rejected') + rejected)
+
+    def _flush_logged(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Could not write rate limit statistics')
+        finally:
+            connections.close_all()
+
+
+rejection_stats = RejectionStats()
+atexit.register(rejection_stats._flush_logged)
+
+
+def client_ip(request, proxies=0):
+    if proxies:
+        forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if part.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+class RateLimitMiddleware:
+    """Answer form posts beyond the per-client or global limit with a 429"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = get_config()
+        self.views = frozenset(config['views'])
+        self.shared = config['shared']
+        self.proxies = config['proxies']
+        self.per_client = SlidingWindow(*config['per_client'], max_keys=config['max_clients'])
+        self.overall = SlidingWindow(*config['global'])
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in UNSAFE_METHODS:
+            return None
+        view_name = request.resolver_match.view_name
+        if view_name not in self.views:
+            return None
+
+        now = time.time()
+        ip = client_ip(request, self.proxies)
+        if not self._allow('client', self.per_client, ip, now):
+            return self._reject(request, view_name, 'client', self.per_client, now)
+        if not self._allow('global', self.overall, '', now):
+            return self._reject(request, view_name, 'global', self.overall, now)
+        return None
+
+    def _allow(self, scope, window, key, now):
+        if not window.hit(key, now):
+            return False
+        return not self.shared or shared_hit(scope, key, window.limit, window.window, now)
+
+    def _reject(self, request, view_name, reason, window, now):
+        rejection_stats.add(view_name, reason)
+        retry_after = window.retry_after(now)
+        if view_name in JSON_VIEWS or 'application/json' in request.headers.get('Accept', ''):
+            return JsonResponse(
+                {'error': 'Too many requests, please try again later.', 'retry_after': retry_after},
+                status=429,
+                headers={'Retry-After': str(retry_after)},
+            )
+        return HttpResponse(
+            b'Too many requests, please try again later.\n',
+            status=429,
+            content_type='text/plain; charset=utf-8',
+            headers={'Retry-After': str(retry_after)},
+        )
@@ -0,0 +1,426 @@
+"""
+Content-based related posts.
+
+Each post is tokenised once when it is saved and its weighted term counts
+are stored in ``BlogPostTerms`` (title words count three times, excerpt
+words twice). Related posts are the ``TOP_N`` published posts with the
+highest cosine similarity between sublinear TF-IDF vectors, stored in
+``RelatedPost`` so ``blog_detail`` reads them with one indexed query.
+
+Vectors keep only their highest-weighted terms. Neighbours are searched
+through an inverted index instead of scoring every pair of posts: each
+term's postings keep its ``POSTINGS`` highest-weighted posts, the posts a
+row reaches through its terms' postings are ranked by that partial dot
+product, and the best ``CANDIDATES`` of them are scored exactly. While no
+term is used by more than ``POSTINGS`` posts the search is exact; beyond
+that a neighbour is missed only if it ranks low in every term it shares.
+
+A save refreshes the index once its transaction commits, and only if the
+post's text or publish state changed: the post's own row and the rows
+listing it are searched again, and the post is merged into the stored lists
+it now scores high enough to enter. The corpus stays in memory between
+refreshes and only the saved posts' rows are reread, unless another process
+changed it in the meantime (counted in the cache).
+"""
+import re
+import threading
+import time
+from collections import Counter
+from itertools import chain
+
+import numpy as np
+from scipy import sparse
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from . import caching
+from .models import BlogPost, BlogPostTerms, RelatedPost
+
+TOP_N = 6
+MAX_TERMS = 100          # distinct terms stored per post
+VECTOR_TERMS = 32        # highest-weighted terms kept in each TF-IDF vector
+POSTINGS = 150           # highest-weighted posts kept per term for the search
+CANDIDATES = 40          # posts per row scored exactly
+BLOCK_ROWS = 1000        # rows searched at once
+MAX_DF = 0.2             # ignore terms used by more than a fifth of the posts
+TITLE_WEIGHT = 3
+EXCERPT_WEIGHT = 2
+
+# Post fields the stored terms and the corpus are built from.
+SOURCE_FIELDS = ('title', 'excerpt', 'content', 'published')
+
+_TOKEN_RE = re.compile(r'[a-z][a-z0-9+#]+')
+
+STOP_WORDS = frozenset("""
+a about above after again against all also am an and any are as at be because
+been before being below between both but by can could did do does doing down
+during each few for from further had has have having he her here hers herself
+him himself his how i if in into is it its itself just let like me more most
+my myself no nor not now of off on once only or other our ours ourselves out
+over own same she should so some such than that the their theirs them
+themselves then there these they this those through to too under until up
+use used using very was we were what when where which while who whom why
+will with would you your yours yourself yourselves
+""".split())
+
+_local = threading.local()
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOP_WORDS]
+
+
+def post_terms(post):
+    """Weighted term counts for a post, trimmed to MAX_TERMS"""
+    counts = Counter(tokenize(post.content))
+    for token in tokenize(post.excerpt):
+        counts[token] += EXCERPT_WEIGHT
+    for token in tokenize(post.title):
+        counts[token] += TITLE_WEIGHT
+    return dict(counts.most_common(MAX_TERMS))
+
+
+def source(post):
+    """The values of a post its terms and corpus row are built from"""
+    return tuple(getattr(post, field) for field in SOURCE_FIELDS)
+
+
+def store_terms(posts, using=DEFAULT_DB_ALIAS):
+    """Tokenise posts and save their term counts"""
+    rows = [BlogPostTerms(post_id=post.pk, terms=post_terms(post)) for post in posts]
+    BlogPostTerms.objects.using(using).bulk_create(
+        rows, update_conflicts=True, unique_fields=['post'], update_fields=['terms'],
+    )
+
+
+def _keep_top_terms(matrix, k):
+    """Drop all but the ``k`` largest entries of every row of a CSR matrix"""
+    row_lengths = np.diff(matrix.indptr)
+    if not len(row_lengths) or row_lengths.max() <= k:
+        return matrix
+    rows = np.repeat(np.arange(matrix.shape[0]), row_lengths)
+    # One float sort key instead of a (row, -value) lexsort: each row owns
+    # the interval [2 * row, 2 * row + 1] and larger values sort first.
+    scaled = matrix.data / (matrix.data.max() * 1.0001 or 1)
+    order = np.argsort(2.0 * rows + (1.0 - scaled))
+    position = np.empty_like(order)
+    position[order] = np.arange(len(order)) - matrix.indptr[rows[order]]
+    matrix.data[position >= k] = 0
+    matrix.eliminate_zeros()
+    return matrix
+
+
+def _top_per_row(matrix, k):
+    """
+    ``(rows, columns, values)`` of the ``k`` largest positive entries of
+    every row of a CSR matrix. The rows are short, so they are padded into a
+    dense array and ``np.argpartition`` picks each row's top entries in
+    linear time.
+    """
+    lengths = np.diff(matrix.indptr)
+    height = matrix.shape[0]
+    width = max(int(lengths.max(initial=0)), 1)
+    starts = matrix.indptr[:-1]
+    padded = np.zeros(height * width, dtype=matrix.data.dtype)
+    padded[np.arange(matrix.nnz) + np.repeat(np.arange(height) * width - starts, lengths)] = matrix.data
+    padded = padded.reshape(height, width)
+    if width > k:
+        offsets = np.argpartition(padded, width - k, axis=1)[:, width - k:]
+    else:
+        offsets = np.broadcast_to(np.arange(width), (height, width))
+    found = offsets < lengths[:, None]
+    rows = np.broadcast_to(np.arange(height)[:, None], offsets.shape)[found]
+    positions = (starts[:, None] + offsets)[found]
+    positive = matrix.data[positions] > 0
+    return rows[positive], matrix.indices[positions[positive]], matrix.data[positions[positive]]
+
+
+class Corpus:
+    """L2-normalised TF-IDF matrix over all published posts"""
+
+    def __init__(self, post_ids, terms_list):
+        self.vocabulary = {}
+        self.post_ids = np.asarray(post_ids, dtype=np.int64)
+        self.counts = self._count_matrix(terms_list)
+        # Value of the cache counter this corpus is current for, if any.
+        self.generation = None
+        self._weigh()
+
+    def _count_matrix(self, terms_list):
+        vocabulary = self.vocabulary
+        # Sorted, so columns don't depend on set order.
+        for term in sorted(set().union(*terms_list) - vocabulary.keys()):
+            vocabulary[term] = len(vocabulary)
+        indptr = np.zeros(len(terms_list) + 1, dtype=np.int64)
+        np.cumsum([len(terms) for terms in terms_list], out=indptr[1:])
+        indices = np.fromiter(map(vocabulary.__getitem__, chain.from_iterable(terms_list)), dtype=np.int32)
+        data = np.fromiter(chain.from_iterable(terms.values() for terms in terms_list), dtype=np.float32)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(terms_list), max(len(vocabulary), 1)))
+
+    def _weigh(self):
+        self.row_of = {int(post_id): row for row, post_id in enumerate(self.post_ids)}
+        matrix = self.counts.copy()
+        matrix.sum_duplicates()
+        n = matrix.shape[0]
+        if n:
+            df = np.bincount(matrix.indices, minlength=matrix.shape[1])
+            idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+            if n > 10:
+                idf[df > MAX_DF * n] = 0
+            matrix.data = (1 + np.log(matrix.data)) * idf[matrix.indices]
+            matrix.eliminate_zeros()
+            matrix = _keep_top_terms(matrix, VECTOR_TERMS)
+            norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+            norms[norms == 0] = 1
+            matrix = sparse.diags(1 / norms).astype(np.float32) @ matrix
+        self.matrix = matrix.tocsr()
+        self.matrix_t = self.matrix.T.tocsr()
+        # The inverted index searched for candidates, term x post.
+        self.postings = _keep_top_terms(self.matrix_t.copy(), POSTINGS)
+
+    @staticmethod
+    def _rows(using, post_ids=None):
+        rows = BlogPostTerms.objects.using(using).filter(post__published=True)
+        if post_ids is not None:
+            rows = rows.filter(post_id__in=list(post_ids))
+        return rows.order_by('post_id').values_list('post_id', 'terms').iterator(chunk_size=2000)
+
+    @classmethod
+    def load(cls, using=DEFAULT_DB_ALIAS):
+        post_ids = []
+        terms_list = []
+        for post_id, terms in cls._rows(using):
+            post_ids.append(post_id)
+            terms_list.append(terms)
+        return cls(post_ids, terms_list)
+
+    def reload(self, post_ids, using=DEFAULT_DB_ALIAS):
+        """Reread the rows of the given posts, dropping those no longer published"""
+        post_ids = list(post_ids)
+        fresh_ids = []
+        fresh_terms = []
+        for post_id, terms in self._rows(using, post_ids):
+            fresh_ids.append(post_id)
+            fresh_terms.append(terms)
+        kept = np.flatnonzero(~np.isin(self.post_ids, post_ids))
+        fresh = self._count_matrix(fresh_terms)
+        kept_counts = self.counts[kept]
+        kept_counts.resize(kept_counts.shape[0], fresh.shape[1])
+        all_ids = np.concatenate([self.post_ids[kept], np.asarray(fresh_ids, dtype=np.int64)])
+        order = np.argsort(all_ids, kind='stable')
+        self.post_ids = all_ids[order]
+        self.counts = sparse.vstack([kept_counts, fresh], format='csr')[order]
+        self._weigh()
+
+    def scores(self, rows):
+        """Sparse similarity scores of the given rows against every post"""
+        rows = np.asarray(rows, dtype=np.int64)
+        scores = self.matrix[rows] @ self.matrix_t
+        # Never relate a post to itself.
+        scores.data[scores.indices == np.repeat(rows, np.diff(scores.indptr))] = 0
+        scores.eliminate_zeros()
+        return scores
+
+    def top_neighbours(self, rows, top_n=TOP_N, include=()):
+        """
+        ``{post_id: [(related_id, score), ...]}`` for the given matrix rows.
+
+        The rows in ``include`` are scored exactly against every given row,
+        whether the search finds them or not.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        include = np.asarray(include, dtype=np.int64)
+        n = len(self.post_ids)
+        results = {}
+        for start in range(0, len(rows), BLOCK_ROWS):
+            batch = rows[start:start + BLOCK_ROWS]
+            partial = (self.matrix[batch] @ self.postings).tocsr()
+            # One more than CANDIDATES: the row itself is usually among them.
+            block_rows, columns, _ = _top_per_row(partial, CANDIDATES + 1)
+            if len(include):
+                block_rows = np.concatenate([block_rows, np.repeat(np.arange(len(batch)), len(include))])
+                columns = np.concatenate([columns, np.tile(include, len(batch))])
+                pairs = np.unique(block_rows * n + columns)
+                block_rows, columns = pairs // n, pairs % n
+            exact = np.asarray(
+                self.matrix[batch[block_rows]].multiply(self.matrix[columns]).sum(axis=1)
+            ).ravel().astype(np.float32)
+            # Never relate a post to itself.
+            exact[batch[block_rows] == columns] = 0
+            block_rows, columns, values = _top_per_row(
+                sparse.csr_matrix((exact, (block_rows, columns)), shape=(len(batch), n)), top_n,
+            )
+            for row in batch:
+                results[int(self.post_ids[row])] = []
+            post_ids = self.post_ids[batch[block_rows]]
+            related_ids = self.post_ids[columns]
+            for i in np.lexsort((related_ids, -values, block_rows)):
+                results[int(post_ids[i])].append((int(related_ids[i]), float(values[i])))
+        return results
+
+
+_corpora = {}
+_corpus_lock = threading.Lock()
+
+
+def _generation_key(using):
+    return f'{caching.KEY_PREFIX}:related_posts:generation:{using}'
+
+
+def _current_generation(using):
+    key = _generation_key(using)
+    # Seeded from the clock, as in caching.versions(): a counter restarted by
+    # a cache clear must not match a corpus kept from before it.
+    cache.add(key, time.time_ns(), timeout=None)
+    return cache.get(key)
+
+
+def _keep(corpus, seen, using):
+    """Count a change to the corpus, and keep it if nobody else changed it since ``seen``"""
+    try:
+        generation = cache.incr(_generation_key(using))
+    except ValueError:
+        generation = None
+    corpus.generation = generation if seen is not None and generation == seen + 1 else None
+    _corpora[using] = corpus
+
+
+def _write(neighbours, using):
+    RelatedPost.objects.using(using).filter(post_id__in=list(neighbours)).delete()
+    _insert(neighbours, using)
+
+
+def _insert(neighbours, using):
+    """Insert ranked lists with one ``executemany``, without building model instances"""
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(name) for name in ('post_id', 'related_id', 'score', 'rank'))
+    rows = [
+        (post_id, related_id, score, rank)
+        for post_id, ranked in neighbours.items()
+        for rank, (related_id, score) in enumerate(ranked, start=1)
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO %s (%s) VALUES (%%s, %%s, %%s, %%s)' % (quote(RelatedPost._meta.db_table), columns),
+            rows,
+        )
+
+
+def refresh(post_ids, top_n=TOP_N, using=DEFAULT_DB_ALIAS):
+    """
+    Update the index after the given posts were saved, published,
+    unpublished or deleted.
+
+    The changed posts and the posts currently listing one of them are
+    searched again. Every other post is left alone unless a changed post now
+    scores above its weakest neighbour, in which case the changed post is
+    merged into its stored list.
+    """
+    post_ids = set(post_ids)
+    if not post_ids:
+        return
+    with _corpus_lock:
+        seen = _current_generation(using)
+        corpus = _corpora.get(using)
+        if corpus is None or seen is None or corpus.generation != seen:
+            corpus = Corpus.load(using=using)
+        else:
+            corpus.reload(post_ids, using=using)
+        _keep(corpus, seen, using)
+
+        searched = post_ids | set(
+            RelatedPost.objects.using(using)
+            .filter(related_id__in=post_ids)
+            .values_list('post_id', flat=True)
+        )
+        changed_rows = sorted(corpus.row_of[post_id] for post_id in post_ids if post_id in corpus.row_of)
+        rows = sorted(corpus.row_of[post_id] for post_id in searched if post_id in corpus.row_of)
+        neighbours = corpus.top_neighbours(rows, top_n=top_n, include=changed_rows)
+        for post_id in searched:
+            # Unpublished or deleted posts keep no neighbours.
+            neighbours.setdefault(post_id, [])
+
+        if changed_rows:
+            threshold = np.zeros(len(corpus.post_ids), dtype=np.float32)
+            for post_id, score in RelatedPost.objects.using(using).filter(rank=top_n).values_list('post_id', 'score'):
+                if post_id in corpus.row_of:
+                    threshold[corpus.row_of[post_id]] = score
+            threshold[rows] = np.inf
+            # Similarity is symmetric, so a changed post's row holds its score
+            # in every other post's list.
+            scores = corpus.scores(changed_rows).tocoo()
+            entering = scores.data > threshold[scores.col]
+            merged = {}
+            for changed_row, row, score in zip(
+                scores.row[entering].tolist(), scores.col[entering].tolist(), scores.data[entering].tolist(),
+            ):
+                related_id = int(corpus.post_ids[changed_rows[changed_row]])
+                merged.setdefault(int(corpus.post_ids[row]), []).append((related_id, score))
+            stored = (
+                RelatedPost.objects.using(using)
+                .filter(post_id__in=list(merged))
+                .values_list('post_id', 'related_id', 'score')
+            )
+            for post_id, related_id, score in stored:
+                merged[post_id].append((related_id, score))
+            for post_id, ranked in merged.items():
+                neighbours[post_id] = sorted(ranked, key=lambda item: (-item[1], item[0]))[:top_n]
+
+        with transaction.atomic(using=using):
+            _write(neighbours, using)
+    caching.bump_on_commit(RelatedPost, using=using)
+
+
+def schedule_refresh(post_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Refresh the given posts once the current transaction commits.
+
+    An admin save may save a post more than once in one transaction;
+    collecting the ids refreshes them together, once.
+    """
+    post_ids = set(post_ids)
+    if not post_ids:
+        return
+    if not connections[using].in_atomic_block:
+        refresh(post_ids, using=using)
+        return
+    pending = _local.__dict__.setdefault('pending', {})
+    pending.setdefault(using, set()).update(post_ids)
+    transaction.on_commit(lambda: refresh(pending.pop(using, ()), using=using), using=using)
+
+
+def rebuild(batch_size=BLOCK_ROWS, top_n=TOP_N, retokenize=False, using=DEFAULT_DB_ALIAS):
+    """
+    Recompute every post's neighbours; yields progress as (done, total).
+
+    Posts without stored terms are tokenised first; ``retokenize`` redoes all
+    of them, e.g. after changing the tokeniser.
+    """
+    posts = BlogPost.objects.using(using).only('id', 'title', 'excerpt', 'content').order_by('pk')
+    if not retokenize:
+        posts = posts.filter(terms__isnull=True)
+    batch = []
+    for post in posts.iterator(chunk_size=2000):
+        batch.append(post)
+        if len(batch) >= 2000:
+            store_terms(batch, using=using)
+            batch = []
+    store_terms(batch, using=using)
+
+    with _corpus_lock:
+        seen = _current_generation(using)
+        corpus = Corpus.load(using=using)
+        _keep(corpus, seen, using)
+    total = len(corpus.post_ids)
+    with transaction.atomic(using=using):
+        # Plain SQL: a queryset delete would fetch every row to send
+        # post_delete, and the version is bumped below anyway.
+        with connections[using].cursor() as cursor:
+            cursor.execute('DELETE FROM %s' % connections[using].ops.quote_name(RelatedPost._meta.db_table))
+        for start in range(0, total, batch_size):
+            rows = list(range(start, min(start + batch_size, total)))
+            _insert(corpus.top_neighbours(rows, top_n=top_n), using)
+            caching.bump_on_commit(RelatedPost, using=using)
+            yield start + len(rows), total
@@ -0,0 +1,115 @@
+"""
+Render-once HTML for blog posts and project descriptions.
+
+``BlogPost.save()`` and ``Project.save()`` call in here to store the
+rendered body, a plain-text summary, the word count and the reading time in
+their own columns, so pages never run ``linebreaks`` or ``truncatewords``
+over a full article and listings can leave the body columns out entirely.
+
+Markdown (``pip install markdown``) and syntax highlighting of fenced code
+blocks (``pip install Pygments``) are both optional. Without Markdown, text
+is rendered the way the ``linebreaks`` filter did, and fenced code blocks
+still become ``<pre>`` blocks, highlighted when Pygments is installed.
+"""
+import math
+import re
+
+from django.template.defaultfilters import linebreaks_filter
+from django.utils.html import escape, strip_tags
+from django.utils.text import Truncator
+
+try:
+    import markdown
+except ImportError:  # pragma: no cover - optional dependency
+    markdown = None
+
+try:
+    from pygments import highlight
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import get_lexer_by_name, guess_lexer
+    from pygments.util import ClassNotFound
+except ImportError:  # pragma: no cover - optional dependency
+    highlight = None
+
+WORDS_PER_MINUTE = 200
+SUMMARY_WORDS = 30
+
+_FENCE_RE = re.compile(r'^```[ \t]*([\w+#-]*)[ \t]*\n(.*?)^```[ \t]*$', re.MULTILINE | re.DOTALL)
+
+
+def highlight_code(code, language=''):
+    """HTML for one code block, highlighted with inline styles if Pygments is installed"""
+    if highlight is None:
+        css_class = f' class="language-{escape(language)}"' if language else ''
+        return f'<pre><code{css_class}>{escape(code)}</code></pre>'
+    try:
+        lexer = get_lexer_by_name(language) if language else guess_lexer(code)
+    except ClassNotFound:
+        lexer = get_lexer_by_name('text')
+    # Inline styles keep the stored HTML self-contained: no stylesheet to ship.
+    return highlight(code, lexer, HtmlFormatter(noclasses=True, style='default'))
+
+
+def _render_plain(text):
+    parts = []
+    position = 0
+    for match in _FENCE_RE.finditer(text):
+        before = text[position:match.start()].strip()
+        if before:
+            parts.append(linebreaks_filter(before, autoescape=True))
+        parts.append(highlight_code(match.group(2), match.group(1)))
+        position = match.end()
+    rest = text[position:].strip()
+    if rest:
+        parts.append(linebreaks_filter(rest, autoescape=True))
+    return '\n'.join(parts)
+
+
+def _render_markdown(text):
+    extensions = ['extra', 'sane_lists']
+    config = {}
+    if highlight is not None:
+        extensions.append('codehilite')
+        config['codehilite'] = {'noclasses': True, 'pygments_style': 'default', 'guess_lang': False}
+    return markdown.markdown(text, extensions=extensions, extension_configs=config)
+
+
+def render(text):
+    """Body text as HTML"""
+    text = text.replace('\r\n', '\n')
+    if markdown is not None:
+        return _render_markdown(text)
+    return _render_plain(text)
+
+
+def word_count(text):
+    return len(strip_tags(text).split())
+
+
+def reading_time(words):
+    """Whole minutes to read ``words`` words, at least one"""
+    return max(1, math.ceil(words / WORDS_PER_MINUTE))
+
+
+def summary(html, words=SUMMARY_WORDS):
+    """Plain-text opening of rendered HTML, cut at ``words`` words"""
+    return Truncator(' '.join(strip_tags(html).split())).words(words)
+
+
+def update_blog_post(post):
+    """Fill a post's stored HTML, summary, word count and reading time"""
+    post.content_html = render(post.content)
+    post.summary = post.excerpt or summary(post.content_html)
+    post.word_count = word_count(post.content)
+    post.reading_time = reading_time(post.word_count)
+
+
+def update_project(project):
+    """Fill a project's stored HTML, word count and reading time"""
+    project.description_html = render(project.description)
+    project.word_count = word_count(project.description)
+    project.reading_time = reading_time(project.word_count)
+
+
+BLOG_POST_FIELDS = ['content_html', 'summary', 'word_count', 'reading_time']
+PROJECT_FIELDS = ['description_html', 'word_count', 'reading_time']
@@ -0,0 +1,240 @@
+"""
+Full-text search index for blog posts.
+
+Published posts are mirrored into a search table that is kept in sync by the
+signal handlers in ``portfolio.signals``:
+
+* SQLite: an FTS5 virtual table ranked with ``bm25()``.
+* PostgreSQL: a weighted ``tsvector`` column with a GIN index, ranked with
+  ``ts_rank_cd()``.
+
+Other database vendors fall back to the old ``icontains`` filtering.
+"""
+import re
+
+from django.db import connections, router
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import BlogPost
+
+FTS_TABLE = 'portfolio_blogpost_fts'
+PG_TABLE = 'portfolio_blogpost_search'
+
+# Sentinels used to mark highlighted terms in snippets; they are swapped for
+# <mark> tags after the snippet text has been HTML-escaped.
+_HL_START = '\x02'
+_HL_STOP = '\x03'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Column weights: a hit in the title outranks one in the excerpt, which
+# outranks one in the body.
+_SQLITE_RANK = "bm25({table}, 10.0, 5.0, 1.0)".format(table=FTS_TABLE)
+_PG_HEADLINE_OPTIONS = (
+    'StartSel=' + _HL_START + ', StopSel=' + _HL_STOP +
+    ', MaxWords=30, MinWords=12, MaxFragments=2, FragmentDelimiter=" … "'
+)
+
+
+def _connection(using=None, write=False):
+    if using is None:
+        using = router.db_for_write(BlogPost) if write else router.db_for_read(BlogPost)
+    return connections[using]
+
+
+def is_available(using=None):
+    """Whether the current database has a search index we know how to use."""
+    return _connection(using).vendor in ('sqlite', 'postgresql')
+
+
+def _fts5_query(query):
+    """Turn free text into a safe FTS5 MATCH expression.
+
+    Every word is quoted so FTS5 operators typed by visitors are treated as
+    plain text, and the last word is a prefix match so partial words still
+    find results.
+    """
+    tokens = _TOKEN_RE.findall(query.lower())
+    if not tokens:
+        return ''
+    terms = ['"%s"' % token for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def highlight(snippet):
+    """Escape a raw snippet and wrap matched terms in <mark> tags."""
+    if not snippet:
+        return ''
+    html = escape(snippet).replace(_HL_START, '<mark>').replace(_HL_STOP, '</mark>')
+    return mark_safe(html)
+
+
+def index_post(post, using=None):
+    """Add, refresh or drop a single post in the search index."""
+    if not post.published:
+        remove_post(post.pk, using=using)
+        return
+    index_posts([post], using=using)
+
+
+def index_posts(posts, using=None):
+    """Write several published posts to the search index."""
+    connection = _connection(using, write=True)
+    rows = [(post.pk, post.title, post.excerpt, post.content) for post in posts]
+    if not rows or connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.executemany(
+                'DELETE FROM %s WHERE rowid = %%s' % FTS_TABLE,
+                [(row[0],) for row in rows],
+            )
+            cursor.executemany(
+                'INSERT INTO %s (rowid, title, excerpt, content) '
+                'VALUES (%%s, %%s, %%s, %%s)' % FTS_TABLE,
+                rows,
+            )
+        else:
+            cursor.executemany(
+                "INSERT INTO %s (post_id, document) VALUES (%%s, "
+                "setweight(to_tsvector('english', %%s), 'A') || "
+                "setweight(to_tsvector('english', %%s), 'B') || "
+                "setweight(to_tsvector('english', %%s), 'C')) "
+                "ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document" % PG_TABLE,
+                rows,
+            )
+
+
+def remove_post(post_id, using=None):
+    """Drop a post from the search index."""
+    connection = _connection(using, write=True)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('DELETE FROM %s WHERE rowid = %%s' % FTS_TABLE, [post_id])
+        elif connection.vendor == 'postgresql':
+            cursor.execute('DELETE FROM %s WHERE post_id = %%s' % PG_TABLE, [post_id])
+
+
+def rebuild_index(batch_size=1000, using=None):
+    """Re-index every published post from scratch. Returns the number indexed."""
+    connection = _connection(using, write=True)
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return 0
+    table = FTS_TABLE if connection.vendor == 'sqlite' else PG_TABLE
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM %s' % table)
+
+    total = 0
+    batch = []
+    posts = (
+        BlogPost.objects.using(connection.alias)
+        .filter(published=True)
+        .only('id', 'title', 'excerpt', 'content', 'published')
+        .order_by('id')
+    )
+    for post in posts.iterator(chunk_size=batch_size):
+        batch.append(post)
+        if len(batch) >= batch_size:
+            index_posts(batch, using=connection.alias)
+            total += len(batch)
+            batch = []
+    if batch:
+        index_posts(batch, using=connection.alias)
+        total += len(batch)
+    return total
+
+
+class SearchResults:
+    """
+    Ranked search results that behave enough like a queryset for
+    ``django.core.paginator.Paginator``: ``count()`` runs a single count
+    against the index and slicing fetches just one page of ranked ids.
+
+    Posts returned by slicing carry ``search_rank`` and ``search_snippet``
+    (already escaped, with matches wrapped in <mark>).
+    """
+
+    def __init__(self, query, using=None):
+        self.query = query
+        self.connection = _connection(using)
+        self._count = None
+
+    def _match(self):
+        if self.connection.vendor == 'sqlite':
+            return _fts5_query(self.query)
+        return self.query.strip()
+
+    def count(self):
+        if self._count is None:
+            match = self._match()
+            if not match:
+                self._count = 0
+            else:
+                with self.connection.cursor() as cursor:
+                    if self.connection.vendor == 'sqlite':
+                        cursor.execute(
+                            'SELECT count(*) FROM %s WHERE %s MATCH %%s' % (FTS_TABLE, FTS_TABLE),
+                            [match],
+                        )
+                    else:
+                        cursor.execute(
+                            "SELECT count(*) FROM %s "
+                            "WHERE document @@ websearch_to_tsquery('english', %%s)" % PG_TABLE,
+                            [match],
+                        )
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def _ranked(self, offset, limit):
+        match = self._match()
+        if not match or limit <= 0:
+            return []
+        with self.connection.cursor() as cursor:
+            if self.connection.vendor == 'sqlite':
+                cursor.execute(
+                    'SELECT rowid, %s AS rank, snippet(%s, 2, char(2), char(3), \'…\', 24) '
+                    'FROM %s WHERE %s MATCH %%s ORDER BY rank LIMIT %%s OFFSET %%s'
+                    % (_SQLITE_RANK, FTS_TABLE, FTS_TABLE, FTS_TABLE),
+                    [match, limit, offset],
+                )
+            else:
+                cursor.execute(
+                    "SELECT s.post_id, ts_rank_cd(s.document, q) AS rank, "
+                    "ts_headline('english', p.content, q, %%s) "
+                    "FROM %s s JOIN portfolio_blogpost p ON p.id = s.post_id, "
+                    "websearch_to_tsquery('english', %%s) q "
+                    "WHERE s.document @@ q ORDER BY rank DESC, p.created_at DESC "
+                    "LIMIT %%s OFFSET %%s" % PG_TABLE,
+                    [_PG_HEADLINE_OPTIONS, match, limit, offset],
+                )
+            return cursor.fetchall()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            results = self[key:key + 1]
+            if not results:
+                raise IndexError(key)
+            return results[0]
+        start = key.start or 0
+        stop = self.count() if key.stop is None else key.stop
+        ranked = self._ranked(start, stop - start)
+        posts = (
+            BlogPost.objects.using(self.connection.alias)
+            .filter(published=True)
+            .defer('content', 'content_html')
+            .in_bulk([row[0] for row in ranked])
+        )
+        results = []
+        for post_id, rank, snippet in ranked:
+            post = posts.get(post_id)
+            if post is None:
+                continue
+            post.search_rank = rank
+            post.search_snippet = highlight(snippet)
+            results.append(post)
+        return results
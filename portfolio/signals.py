@@ -0,0 +1,179 @@
+from django.conf import settings
+from django.contrib.admin.models import LogEntry
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import caching, contact_queue, images, related_posts, search, similarity, snapshot, sqlite
+from .models import BlogPost, Experience, Project, RelatedPost, Skill
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    """Apply the SQLite PRAGMAs for concurrent workers to new connections"""
+    sqlite.configure(connection)
+
+
+@receiver(request_started)
+def drain_contact_queue(sender, **kwargs):
+    """Start draining the contact queue in web processes, for messages left by a previous one"""
+    if not getattr(settings, 'PORTFOLIO_CONTACT_WORKER', False):
+        contact_queue.drainer.start()
+
+
+@receiver(post_save, sender=LogEntry)
+def publish_admin_change(sender, instance, created, using=None, raw=False, **kwargs):
+    """Publish a new snapshot after an admin save, in publish mode"""
+    if created and not raw:
+        snapshot.publish_on_commit(using)
+
+
+@receiver(post_save, sender=BlogPost)
+def index_blog_post(sender, instance, using=None, raw=False, **kwargs):
+    """Keep the blog search index in sync when a post is saved; rebuild it after loaddata"""
+    if raw or not search.is_available(using):
+        return
+    search.index_post(instance, using=using)
+
+
+@receiver(post_delete, sender=BlogPost)
+def unindex_blog_post(sender, instance, using=None, **kwargs):
+    """Drop deleted posts from the blog search index"""
+    if not search.is_available(using):
+        return
+    search.remove_post(instance.pk, using=using)
+
+
+@receiver(pre_save, sender=BlogPost)
+def blog_post_pre_save(sender, instance, using=None, raw=False, **kwargs):
+    """Remember the text and publish state a post is saved over"""
+    if raw or instance.pk is None:
+        return
+    instance._related_source = (
+        BlogPost.objects.using(using).filter(pk=instance.pk)
+        .values_list(*related_posts.SOURCE_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=BlogPost)
+def update_related_posts(sender, instance, using=None, raw=False, **kwargs):
+    """Re-tokenise a post whose text or publish state changed and refresh the posts it affects"""
+    previous = instance.__dict__.pop('_related_source', None)
+    if raw or previous == related_posts.source(instance):
+        return
+    related_posts.store_terms([instance], using=using)
+    related_posts.schedule_refresh([instance.pk], using=using)
+
+
+@receiver(pre_delete, sender=BlogPost)
+def blog_post_pre_delete(sender, instance, using=None, **kwargs):
+    """Remember which posts list a post about to be deleted"""
+    instance._related_affected = list(
+        RelatedPost.objects.using(using).filter(related=instance).values_list('post_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=BlogPost)
+def refresh_related_posts_after_delete(sender, instance, using=None, **kwargs):
+    """Drop a deleted post from the index and refill the lists that had it"""
+    related_posts.schedule_refresh([instance.pk, *instance.__dict__.pop('_related_affected', ())], using=using)
+
+
+@receiver(m2m_changed, sender=Project.technologies.through)
+def project_technologies_changed(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """Refresh related projects affected by a change to Project.technologies"""
+    if action == 'pre_clear':
+        # The rows are about to go, so remember what they pointed at.
+        if reverse:
+            instance._similarity_affected = similarity.affected_projects(
+                similarity.projects_sharing([instance.pk], using=using), using=using,
+            )
+        else:
+            instance._similarity_affected = similarity.affected_projects([instance.pk], using=using)
+        return
+    if action == 'post_clear':
+        similarity.schedule_refresh(instance.__dict__.pop('_similarity_affected', ()), using=using)
+        return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    if reverse:
+        # instance is a Skill and pk_set holds the projects gaining or losing it
+        affected = similarity.affected_projects(pk_set, [instance.pk], using=using)
+    else:
+        affected = similarity.affected_projects([instance.pk], pk_set, using=using)
+    similarity.schedule_refresh(affected, using=using)
+
+
+@receiver(m2m_changed, sender=Project.technologies.through)
+def touch_projects(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """Move updated_at of projects whose technologies changed, for their page validators"""
+    if action == 'pre_clear' and reverse:
+        instance._technologies_cleared = list(instance.projects.using(using).values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        project_ids = instance.__dict__.pop('_technologies_cleared', ()) if reverse else [instance.pk]
+    elif action in ('post_add', 'post_remove') and pk_set:
+        project_ids = pk_set if reverse else [instance.pk]
+    else:
+        return
+    Project.objects.using(using).filter(pk__in=list(project_ids)).update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=Project)
+def project_pre_delete(sender, instance, using=None, **kwargs):
+    """Remember which projects listed a project about to be deleted"""
+    instance._similarity_affected = similarity.affected_projects([instance.pk], using=using)
+
+
+@receiver(pre_delete, sender=Skill)
+def skill_pre_delete(sender, instance, using=None, **kwargs):
+    """Remember which projects used a skill about to be deleted"""
+    instance._similarity_affected = similarity.affected_projects(
+        similarity.projects_sharing([instance.pk], using=using), using=using,
+    )
+
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Skill)
+def refresh_after_delete(sender, instance, using=None, **kwargs):
+    """Refresh related projects once a project or skill is gone"""
+    affected = set(instance.__dict__.pop('_similarity_affected', ()))
+    if sender is Project:
+        affected.discard(instance.pk)
+    similarity.schedule_refresh(affected, using=using)
+
+
+IMAGE_FIELDS = dict(images.image_fields())
+
+
+def generate_image_derivatives(sender, instance, using=None, raw=False, **kwargs):
+    """Make responsive variants of a saved image in the background"""
+    image = getattr(instance, IMAGE_FIELDS[sender])
+    if raw or not image:
+        return
+    # Pages cached meanwhile show the original, so invalidate them when done.
+    images.schedule(image.name, storage=image.storage, callback=lambda: caching.bump(sender), using=using)
+
+
+for image_model in IMAGE_FIELDS:
+    post_save.connect(generate_image_derivatives, sender=image_model)
+
+
+def invalidate_cached_content(sender, using=None, **kwargs):
+    """Invalidate cached pages and fragments rendered from the changed model"""
+    caching.bump_on_commit(sender, using=using)
+
+
+def invalidate_cached_content_m2m(sender, instance, action, reverse, model, using=None, **kwargs):
+    """Invalidate the owning model when a many-to-many relation changes"""
+    if action.startswith('post_'):
+        caching.bump_on_commit(model if reverse else type(instance), using=using)
+
+
+for tracked_model in caching.TRACKED_MODELS:
+    post_save.connect(invalidate_cached_content, sender=tracked_model)
+    post_delete.connect(invalidate_cached_content, sender=tracked_model)
+m2m_changed.connect(invalidate_cached_content_m2m, sender=Project.technologies.through)
+m2m_changed.connect(invalidate_cached_content_m2m, sender=Experience.technologies_used.through)
@@ -0,0 +1,170 @@
+"""
+Related-project index.
+
+Every project keeps its ``TOP_K`` most similar projects in
+``ProjectSimilarity``, scored by the Jaccard similarity of their technology
+sets. ``project_detail`` then reads related projects with a single lookup on
+the ``(project, rank)`` index.
+
+The index is refreshed incrementally from the ``m2m_changed`` and delete
+signals in ``portfolio.signals``. When a project's technologies change, its
+own score against every project sharing one of those technologies (old or
+new) changes too, so all of those rows are recomputed.
+"""
+import threading
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from . import caching
+from .models import Project, ProjectSimilarity
+
+TOP_K = 6
+
+ProjectTechnology = Project.technologies.through
+
+_local = threading.local()
+
+
+def _technology_sets(rows):
+    sets = defaultdict(set)
+    for project_id, skill_id in rows:
+        sets[project_id].add(skill_id)
+    return sets
+
+
+def projects_sharing(skill_ids, using=DEFAULT_DB_ALIAS):
+    """Ids of projects that use any of the given skills"""
+    if not skill_ids:
+        return set()
+    return set(
+        ProjectTechnology.objects.using(using)
+        .filter(skill_id__in=skill_ids)
+        .values_list('project_id', flat=True)
+        .distinct()
+    )
+
+
+def affected_projects(project_ids, extra_skill_ids=(), using=DEFAULT_DB_ALIAS):
+    """
+    Projects whose neighbour lists may change when the technologies of
+    ``project_ids`` change: the projects themselves plus every project that
+    shares one of their current technologies or one of ``extra_skill_ids``.
+    """
+    project_ids = set(project_ids)
+    skill_ids = set(extra_skill_ids)
+    if project_ids:
+        skill_ids.update(
+            ProjectTechnology.objects.using(using)
+            .filter(project_id__in=project_ids)
+            .values_list('skill_id', flat=True)
+        )
+    return project_ids | projects_sharing(skill_ids, using=using)
+
+
+def compute_neighbours(targets, technology_sets, postings, top_k=TOP_K):
+    """
+    Rank neighbours for each project in ``targets``.
+
+    ``technology_sets`` maps project id to its set of skill ids and must cover
+    the targets and every candidate; ``postings`` maps a skill id to the
+    project ids using it. Returns ``{project_id: [(neighbour_id, score), ...]}``.
+    """
+    results = {}
+    for project_id in targets:
+        techs = technology_sets.get(project_id)
+        if not techs:
+            results[project_id] = []
+            continue
+        shared = defaultdict(int)
+        for skill_id in techs:
+            for other_id in postings.get(skill_id, ()):
+                if other_id != project_id:
+                    shared[other_id] += 1
+        size = len(techs)
+        scored = [
+            (count / (size + len(technology_sets[other_id]) - count), count, other_id)
+            for other_id, count in shared.items()
+        ]
+        # Highest score first; more shared technologies, then lower id, break ties.
+        scored.sort(key=lambda item: (-item[0], -item[1], item[2]))
+        results[project_id] = [(other_id, score) for score, _, other_id in scored[:top_k]]
+    return results
+
+
+def _write(neighbours, using):
+    ProjectSimilarity.objects.using(using).filter(project_id__in=list(neighbours)).delete()
+    ProjectSimilarity.objects.using(using).bulk_create([
+        ProjectSimilarity(project_id=project_id, neighbour_id=neighbour_id, score=score, rank=rank)
+        for project_id, ranked in neighbours.items()
+        for rank, (neighbour_id, score) in enumerate(ranked, start=1)
+    ])
+
+
+def refresh(project_ids, top_k=TOP_K, using=DEFAULT_DB_ALIAS):
+    """Recompute the neighbour lists of the given projects"""
+    project_ids = set(
+        Project.objects.using(using).filter(pk__in=list(project_ids)).values_list('pk', flat=True)
+    )
+    if not project_ids:
+        return
+    through = ProjectTechnology.objects.using(using)
+    target_sets = _technology_sets(
+        through.filter(project_id__in=project_ids).values_list('project_id', 'skill_id')
+    )
+    skill_ids = set().union(*target_sets.values()) if target_sets else set()
+
+    postings = defaultdict(list)
+    candidate_ids = set()
+    for project_id, skill_id in through.filter(skill_id__in=skill_ids).values_list('project_id', 'skill_id'):
+        postings[skill_id].append(project_id)
+        candidate_ids.add(project_id)
+
+    technology_sets = _technology_sets(
+        through.filter(project_id__in=candidate_ids - project_ids).values_list('project_id', 'skill_id')
+    )
+    technology_sets.update(target_sets)
+
+    neighbours = compute_neighbours(project_ids, technology_sets, postings, top_k=top_k)
+    with transaction.atomic(using=using):
+        _write(neighbours, using)
+    caching.bump_on_commit(ProjectSimilarity, using=using)
+
+
+def schedule_refresh(project_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Refresh the given projects once the current transaction commits.
+
+    Saving a project in the admin fires several ``m2m_changed`` signals in one
+    transaction; collecting the ids and refreshing once on commit avoids
+    recomputing the same rows for each of them.
+    """
+    project_ids = set(project_ids)
+    if not project_ids:
+        return
+    if not connections[using].in_atomic_block:
+        refresh(project_ids, using=using)
+        return
+    pending = _local.__dict__.setdefault('pending', {})
+    pending.setdefault(using, set()).update(project_ids)
+    transaction.on_commit(lambda: refresh(pending.pop(using, ()), using=using), using=using)
+
+
+def rebuild(batch_size=500, top_k=TOP_K, using=DEFAULT_DB_ALIAS):
+    """Recompute the whole index, writing one batch of projects at a time"""
+    technology_sets = _technology_sets(
+        ProjectTechnology.objects.using(using).values_list('project_id', 'skill_id').iterator()
+    )
+    postings = defaultdict(list)
+    for project_id, techs in technology_sets.items():
+        for skill_id in techs:
+            postings[skill_id].append(project_id)
+
+    project_ids = list(Project.objects.using(using).order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(project_ids), batch_size):
+        batch = project_ids[start:start + batch_size]
+        neighbours = compute_neighbours(batch, technology_sets, postings, top_k=top_k)
+        with transaction.atomic(using=using):
+            _write(neighbours, using)
+        caching.bump_on_commit(ProjectSimilarity, using=using)
+        yield start + len(batch), len(project_ids)
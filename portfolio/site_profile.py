@@ -0,0 +1,84 @@
+"""
+The site owner's profile (the ``PersonalInfo`` row) kept in process memory.
+
+Every page shows it, in the layout's footer, so ``context_processor`` adds
+it to every template context as ``site_profile`` and ``personal_info``.
+``get()`` loads the row and derives its social links once, then serves
+them from memory for as long as the ``PersonalInfo`` version in
+``portfolio.caching`` is unchanged. Saving or deleting the row bumps that
+version once the change commits (see ``portfolio.signals``), so every
+worker reloads it on its next request. The version check is one cache
+lookup; no query is made until the row changes.
+
+The row is read from the primary database. A replica or snapshot that has
+not caught up yet could otherwise be kept for good under the new version.
+"""
+import threading
+
+from django.db import DEFAULT_DB_ALIAS
+
+from . import caching
+from .models import PersonalInfo
+
+# (field, name, Font Awesome icon) of the links shown for the profile.
+SOCIAL_FIELDS = [
+    ('linkedin', 'LinkedIn', 'fab fa-linkedin'),
+    ('github', 'GitHub', 'fab fa-github'),
+    ('website', 'Website', 'fas fa-globe'),
+]
+EMAIL_ICON = 'fas fa-envelope'
+
+
+def icons():
+    """Icon classes social links can use, for ``manage.py build_assets``"""
+    return [icon for _, _, icon in SOCIAL_FIELDS] + [EMAIL_ICON]
+
+
+class SiteProfile:
+    def __init__(self, info):
+        self.info = info
+        self.social_links = self._social_links(info) if info else []
+
+    @staticmethod
+    def _social_links(info):
+        links = [
+            {'name': name, 'url': getattr(info, field), 'icon': icon, 'external': True}
+            for field, name, icon in SOCIAL_FIELDS if getattr(info, field)
+        ]
+        if info.email:
+            links.append({'name': 'Email', 'url': f'mailto:{info.email}', 'icon': EMAIL_ICON, 'external': False})
+        return links
+
+    def __bool__(self):
+        return self.info is not None
+
+
+# (PersonalInfo version, SiteProfile) of this process.
+_current = (None, None)
+_lock = threading.Lock()
+
+
+def _version():
+    return next(iter(caching.versions([PersonalInfo]).values()))
+
+
+def get():
+    """The site profile, reloaded when ``PersonalInfo`` has changed"""
+    global _current
+    version = _version()
+    loaded_version, profile = _current
+    if profile is not None and loaded_version == version:
+        return profile
+    with _lock:
+        loaded_version, profile = _current
+        if profile is None or loaded_version != version:
+            info = PersonalInfo.objects.using(DEFAULT_DB_ALIAS).order_by('pk').first()
+            profile = SiteProfile(info)
+            _current = (version, profile)
+    return profile
+
+
+def context_processor(request):
+    """Add the site profile to every template context"""
+    profile = get()
+    return {'site_profile': profile, 'personal_info': profile.info}
@@ -0,0 +1,147 @@
+"""
+Publish mode: public pages read an immutable snapshot of the database.
+
+With ``SNAPSHOT_DIR`` set, ``publish()`` copies the primary SQLite database
+into a new file there with SQLite's backup API, then points the
+``current.sqlite3`` symlink at it with an atomic rename. Views decorated
+with ``db_router.replica_reads`` read the file the link points to through
+the ``snapshot`` database, opened ``mode=ro&immutable=1``: SQLite takes no
+locks on it and never checks it for changes, and every worker maps the same
+pages into memory (see ``portfolio.sqlite``). Reads never wait for writers.
+
+A snapshot file is never written once published. Each request checks where
+the link points, with one ``readlink``, and reopens its connection on the
+new file after a publish; the previous ``KEEP`` files are left for
+connections still reading them.
+
+Snapshots are published by ``manage.py publish_snapshot`` and after every
+admin save once its transaction commits, after the related-posts refresh
+the save schedules (see ``portfolio.related_posts``). Other writes (contact
+messages, management commands) reach public pages at the next publish. Publishing
+bumps every model version in ``portfolio.caching``, so pages cached from
+the previous snapshot are rendered again.
+"""
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from . import caching
+
+logger = logging.getLogger('portfolio.snapshot')
+
+SNAPSHOT = 'snapshot'
+LINK_NAME = 'current.sqlite3'
+PREFIX = 'snapshot-'
+
+# Published files kept besides the current one.
+KEEP = 2
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def configured():
+    return SNAPSHOT in settings.DATABASES
+
+
+def directory():
+    return Path(settings.PORTFOLIO_SNAPSHOT_DIR)
+
+
+def uri(path):
+    """SQLite URI opening ``path`` read-only and immutable"""
+    return f'file:{quote(str(path))}?mode=ro&immutable=1'
+
+
+def current():
+    """Path of the current snapshot file, or None before the first publish"""
+    link = directory() / LINK_NAME
+    try:
+        return link.parent / os.readlink(link)
+    except OSError:
+        return None
+
+
+def connect():
+    """
+    Point this thread's snapshot connection at the current snapshot; returns
+    False when there is none to read.
+    """
+    if not configured():
+        return False
+    path = current()
+    if path is None:
+        return False
+    connection = connections[SNAPSHOT]
+    if getattr(connection, 'snapshot_path', None) != path:
+        connection.close()
+        connection.settings_dict = {**connection.settings_dict, 'NAME': uri(path)}
+        connection.snapshot_path = path
+    return True
+
+
+def publish(using=DEFAULT_DB_ALIAS):
+    """Copy the ``using`` database into a new snapshot and make it current"""
+    source = connections[using]
+    if source.vendor != 'sqlite':
+        raise SnapshotError('Snapshots are copies of a SQLite database')
+    folder = directory()
+    folder.mkdir(parents=True, exist_ok=True)
+
+    path = folder / f'{PREFIX}{time.time_ns()}-{os.getpid()}.sqlite3'
+    partial = path.with_name(path.name + '.partial')
+    source.ensure_connection()
+    target = sqlite3.connect(partial)
+    try:
+        source.connection.backup(target)
+        # A WAL database can't be opened immutable; the copy needs no journal.
+        target.execute('PRAGMA journal_mode = delete')
+        target.execute('ANALYZE')
+    finally:
+        target.close()
+    with open(partial, 'rb') as file:
+        os.fsync(file.fileno())
+    os.replace(partial, path)
+
+    link = folder / LINK_NAME
+    new_link = folder / f'{LINK_NAME}.{os.getpid()}'
+    new_link.unlink(missing_ok=True)
+    os.symlink(path.name, new_link)
+    os.replace(new_link, link)
+
+    _prune(folder, path)
+    for model in caching.TRACKED_MODELS:
+        caching.bump(model)
+    logger.info('Published %s', path)
+    return path
+
+
+def _prune(folder, path):
+    # Names start with the publish time.
+    older = sorted(file for file in folder.glob(f'{PREFIX}*.sqlite3') if file != path)
+    for file in older[:-KEEP] if KEEP else older:
+        file.unlink(missing_ok=True)
+
+
+def publish_on_commit(using=DEFAULT_DB_ALIAS):
+    """Publish once the current transaction commits, once however many saves it holds"""
+    if not configured():
+        return
+    pending = connections[using].run_on_commit
+    if any(getattr(func, 'publishes_snapshot', False) for _, func, _ in pending):
+        return
+
+    def run():
+        try:
+            publish(using)
+        except Exception:
+            logger.exception('Could not publish a snapshot')
+    run.publishes_snapshot = True
+    transaction.on_commit(run, using=using)
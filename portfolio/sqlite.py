@@ -0,0 +1,137 @@
+"""
+SQLite tuning for several gunicorn workers sharing one database file.
+
+``configure()`` runs on every new SQLite connection (``connection_created``,
+see ``portfolio.signals``) and applies ``TUNED_PRAGMAS``:
+
+* ``journal_mode=wal``: readers and the writer no longer block each other;
+  readers see the last commit while a write is in progress.
+* ``synchronous=normal``: with WAL, commits append to the log without an
+  fsync each; the database stays consistent after a crash, only the last
+  commits before a power loss may be lost.
+* ``busy_timeout``: a connection waits this long for a lock instead of
+  failing at once.
+* ``mmap_size`` and ``cache_size``: pages are read from a memory map and
+  kept in a larger per-connection cache (negative sizes are KiB).
+* ``temp_store=memory``: sorts and temporary indexes stay off disk.
+
+A busy timeout cannot help a transaction that read before writing while
+another connection committed meanwhile: SQLite reports the database as
+locked at once, since waiting could deadlock. ``retry_on_lock`` reruns
+such writes, whole, with backoff.
+
+The journal mode is stored in the database file itself, and WAL leaves
+``-wal`` and ``-shm`` files next to it. It is left alone under ``DEBUG`` and
+for the sample database committed with the repository (``db.sqlite3`` in
+``BASE_DIR``), so running the site locally doesn't rewrite a tracked file.
+
+Read-only connections (``mode=ro`` URIs, like the snapshots of
+``portfolio.snapshot``) cannot change the journal mode and never wait for
+locks; they get ``READ_ONLY_PRAGMAS`` only.
+
+``PORTFOLIO_SQLITE_TUNING = False`` leaves connections as Python opens them
+(``STOCK_PRAGMAS``). ``manage.py benchmark_sqlite`` compares both under a
+mixed read/write load from several processes.
+"""
+import functools
+import logging
+import os
+import random
+import sqlite3
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connections
+
+logger = logging.getLogger('portfolio.sqlite')
+
+TUNED_PRAGMAS = {
+    # Must come first: it cannot change inside a transaction.
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -32000,
+    'temp_store': 'memory',
+}
+
+# What Python's sqlite3 module and SQLite use when nothing is set.
+STOCK_PRAGMAS = {
+    'journal_mode': 'delete',
+    'synchronous': 'full',
+    'busy_timeout': 5000,
+    'mmap_size': 0,
+    'cache_size': -2000,
+    'temp_store': 'default',
+}
+
+READ_ONLY_PRAGMAS = {
+    name: TUNED_PRAGMAS[name] for name in ('mmap_size', 'cache_size', 'temp_store')
+}
+
+LOCK_ERRORS = (OperationalError, sqlite3.OperationalError)
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        try:
+            cursor.execute(f'PRAGMA {name} = {value}')
+        except LOCK_ERRORS as exc:
+            # Switching the journal mode needs a moment without other
+            # connections; the next connection tries again.
+            if name != 'journal_mode' or not is_lock_error(exc):
+                raise
+            logger.warning('Could not set journal_mode=%s: %s', value, exc)
+
+
+def keeps_journal_mode(connection):
+    """Whether to leave the journal mode of a connection's file as it is"""
+    if settings.DEBUG:
+        return True
+    name = str(connection.settings_dict['NAME'])
+    return os.path.realpath(name) == os.path.realpath(settings.BASE_DIR / 'db.sqlite3')
+
+
+def configure(connection):
+    """Apply the tuned PRAGMAs to a new SQLite connection"""
+    if connection.vendor != 'sqlite' or not getattr(settings, 'PORTFOLIO_SQLITE_TUNING', True):
+        return
+    if 'mode=ro' in str(connection.settings_dict['NAME']):
+        pragmas = READ_ONLY_PRAGMAS
+    elif keeps_journal_mode(connection):
+        pragmas = {name: value for name, value in TUNED_PRAGMAS.items() if name != 'journal_mode'}
+    else:
+        pragmas = TUNED_PRAGMAS
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas)
+
+
+def is_lock_error(exc):
+    message = str(exc).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def _in_transaction():
+    return any(connection.in_atomic_block for connection in connections.all(initialized_only=True))
+
+
+def retry_on_lock(func=None, *, attempts=5, delay=0.05):
+    """
+    Rerun ``func`` when the database is locked, up to ``attempts`` times with
+    exponential, jittered backoff. ``func`` must be safe to run again, which
+    a function doing all its writes in one ``atomic`` block is. Calls made
+    inside an outer transaction are not retried, as it is already broken.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(attempts):
+                try:
+                    return func(*args, **kwargs)
+                except LOCK_ERRORS as exc:
+                    if attempt == attempts - 1 or not is_lock_error(exc) or _in_transaction():
+                        raise
+                    logger.info('%s: %s; retrying', func.__qualname__, exc)
+                    time.sleep(delay * 2 ** attempt * random.uniform(0.5, 1.5))
+        return wrapper
+    return decorator if func is None else decorator(func)
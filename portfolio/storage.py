@@ -0,0 +1,259 @@
+"""
+Content-addressed media storage.
+
+Uploads are stored under a name derived from the SHA-256 of their final
+bytes, e.g. ``projects/3f/3fa2...c9.jpg``, so uploading the same image twice
+stores it once and every URL names immutable content.
+
+Uploads are streamed to a temporary file in chunks while they are hashed;
+Django's temporary upload files are hashed in place and moved, never
+copied. Images are then cleaned up as they are decoded:
+
+* JPEG and PNG metadata (EXIF, XMP, IPTC, text chunks) is dropped by copying
+  the file segment by segment, without re-encoding.
+* Images larger than ``PORTFOLIO_MEDIA_MAX_DIMENSION`` on their long edge, or
+  JPEGs that rely on an EXIF rotation, are decoded (JPEGs at a reduced scale
+  where possible), rotated upright, shrunk and re-encoded without metadata.
+
+Image derivatives (see ``portfolio.images``) keep the name they are given,
+after their content-addressed original. They are not content-addressed
+themselves: ``build_image_derivatives --force`` rewrites them in place.
+``manage.py gc_media`` removes files that nothing refers to any more.
+"""
+import hashlib
+import os
+import re
+import struct
+import tempfile
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from . import images
+
+CHUNK_SIZE = 64 * 1024
+DIGEST_LENGTH = 32
+INCOMING_DIR = '.incoming'
+
+CONTENT_ADDRESSED_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{%d}(\.[\w]+)?$' % DIGEST_LENGTH)
+
+# JPEG segments dropped when stripping metadata: APP1 (EXIF, XMP),
+# APP13 (IPTC) and comments. JFIF, ICC profiles and Adobe markers stay.
+JPEG_DROP_MARKERS = {0xE1, 0xED, 0xFE}
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_DROP_CHUNKS = {b'eXIf', b'tEXt', b'zTXt', b'iTXt', b'tIME'}
+EXIF_ORIENTATION = 0x0112
+
+
+def is_content_addressed(name, storage=None):
+    """Whether a stored file name embeds the hash of its content"""
+    # Derivatives and manifests embed their original's hash, not their own.
+    return bool(CONTENT_ADDRESSED_RE.search(name)) and not images.is_derivative(name, storage=storage)
+
+
+class _HashingWriter:
+    """File wrapper that hashes everything written through it"""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.hash = hashlib.sha256()
+
+    def write(self, data):
+        self.hash.update(data)
+        return self.handle.write(data)
+
+    def tell(self):
+        return self.handle.tell()
+
+    def flush(self):
+        self.handle.flush()
+
+
+def _copy(source, writer, length=None):
+    remaining = length
+    while remaining is None or remaining > 0:
+        chunk = source.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        writer.write(chunk)
+        if remaining is not None:
+            remaining -= len(chunk)
+
+
+def _strip_jpeg(source, writer):
+    if source.read(2) != b'\xff\xd8':
+        raise ValueError('Not a JPEG file')
+    writer.write(b'\xff\xd8')
+    while True:
+        if source.read(1) != b'\xff':
+            raise ValueError('Corrupt JPEG segment')
+        code = source.read(1)
+        while code == b'\xff':
+            # Markers may be preceded by any number of fill bytes.
+            code = source.read(1)
+        if not code:
+            raise ValueError('Truncated JPEG file')
+        marker = b'\xff' + code
+        code = code[0]
+        if code == 0xDA:
+            # Start of scan: the rest is entropy-coded data.
+            writer.write(marker)
+            _copy(source, writer)
+            return
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            writer.write(marker)
+            continue
+        header = source.read(2)
+        if len(header) < 2:
+            raise ValueError('Truncated JPEG segment')
+        length = struct.unpack('>H', header)[0] - 2
+        if code in JPEG_DROP_MARKERS:
+            source.seek(length, os.SEEK_CUR)
+        else:
+            writer.write(marker + header)
+            _copy(source, writer, length)
+
+
+def _strip_png(source, writer):
+    if source.read(8) != PNG_SIGNATURE:
+        raise ValueError('Not a PNG file')
+    writer.write(PNG_SIGNATURE)
+    while True:
+        header = source.read(8)
+        if len(header) < 8:
+            return
+        length, kind = struct.unpack('>I4s', header)
+        if kind in PNG_DROP_CHUNKS:
+            source.seek(length + 4, os.SEEK_CUR)
+            continue
+        writer.write(header)
+        _copy(source, writer, length + 4)
+        if kind == b'IEND':
+            return
+
+
+@deconstructible(path='portfolio.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names uploads after a hash of their content"""
+
+    def __init__(self, *args, max_dimension=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._max_dimension = max_dimension
+
+    @property
+    def max_dimension(self):
+        if self._max_dimension is not None:
+            return self._max_dimension
+        return getattr(settings, 'PORTFOLIO_MEDIA_MAX_DIMENSION', 4096)
+
+    def get_available_name(self, name, max_length=None):
+        if images.is_derivative(name, storage=self):
+            return super().get_available_name(name, max_length)
+        # The final name comes from the content in _save(); identical
+        # content is meant to land on the same name.
+        return name
+
+    def _save(self, name, content):
+        if images.is_derivative(name, storage=self):
+            return super()._save(name, content)
+
+        incoming = self.path(INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        spooled = []
+        try:
+            path, digest = self._spool(content, incoming, spooled)
+            extension = os.path.splitext(name)[1].lower()
+            processed = self._process_image(path, incoming, spooled)
+            if processed is not None:
+                path, digest, extension = processed
+
+            directory = os.path.dirname(name)
+            final_name = '/'.join(
+                part for part in (directory, digest[:2], digest[:DIGEST_LENGTH] + extension) if part
+            )
+            final_path = self.path(final_name)
+            if not os.path.exists(final_path):
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                if path in spooled:
+                    os.replace(path, final_path)
+                    spooled.remove(path)
+                else:
+                    file_move_safe(path, final_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(final_path, self.file_permissions_mode)
+            return final_name
+        finally:
+            for path in spooled:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _temporary(self, directory, spooled):
+        handle = tempfile.NamedTemporaryFile(dir=directory, delete=False)
+        spooled.append(handle.name)
+        return handle
+
+    def _spool(self, content, directory, spooled):
+        """Hash an upload while writing it to a temporary file; (path, hex digest)"""
+        if hasattr(content, 'temporary_file_path'):
+            # Already on disk: hash it in place, it is moved rather than copied.
+            digest = hashlib.sha256()
+            with open(content.temporary_file_path(), 'rb') as handle:
+                for chunk in iter(lambda: handle.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            return content.temporary_file_path(), digest.hexdigest()
+
+        with self._temporary(directory, spooled) as handle:
+            writer = _HashingWriter(handle)
+            if hasattr(content, 'seek'):
+                content.seek(0)
+            for chunk in content.chunks(CHUNK_SIZE):
+                writer.write(chunk)
+        return handle.name, writer.hash.hexdigest()
+
+    def _process_image(self, path, directory, spooled):
+        """Strip metadata and bound the size of an image; None if not an image"""
+        from PIL import Image, ImageOps, UnidentifiedImageError
+
+        try:
+            image = Image.open(path)
+        except (UnidentifiedImageError, OSError):
+            return None
+        with image:
+            image_format = image.format
+            width, height = image.size
+            orientation = image.getexif().get(EXIF_ORIENTATION, 1) if image_format == 'JPEG' else 1
+            oversized = max(width, height) > self.max_dimension
+            animated = getattr(image, 'is_animated', False)
+
+            if not oversized and orientation == 1:
+                strip = {'JPEG': _strip_jpeg, 'PNG': _strip_png}.get(image_format)
+                if strip is None:
+                    return None
+                with open(path, 'rb') as source, self._temporary(directory, spooled) as handle:
+                    writer = _HashingWriter(handle)
+                    strip(source, writer)
+                return handle.name, writer.hash.hexdigest(), '.jpg' if image_format == 'JPEG' else '.png'
+
+            if animated or image_format not in ('JPEG', 'PNG', 'WEBP', 'GIF'):
+                return None
+            if oversized:
+                scale = self.max_dimension / max(width, height)
+                # Decode JPEGs at 1/2, 1/4 or 1/8 scale when that is still big enough.
+                image.draft(image.mode, (int(width * scale), int(height * scale)))
+            upright = ImageOps.exif_transpose(image)
+            upright.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+
+            options = {'format': image_format}
+            if image_format == 'JPEG':
+                options.update(quality=90, optimize=True, progressive=True)
+                if image.info.get('icc_profile'):
+                    options['icc_profile'] = image.info['icc_profile']
+            elif image_format == 'PNG':
+                options['optimize'] = True
+            with self._temporary(directory, spooled) as handle:
+                writer = _HashingWriter(handle)
+                upright.save(writer, **options)
+            extension = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif'}[image_format]
+            return handle.name, writer.hash.hexdigest(), extension
@@ -0,0 +1,227 @@
+"""
+Deterministic synthetic portfolio data for load and benchmark testing.
+
+``generate(scale)`` creates ``scale`` projects, blog posts and contact
+messages, plus skills, experiences, education and certifications in
+proportion, using bulk inserts inside one transaction. The same ``seed``
+always produces the same content and timestamps.
+
+Bulk inserts skip model signals, so the search, related-projects and
+related-posts indexes are rebuilt explicitly and every cached page is
+invalidated once at the end.
+"""
+import random
+from datetime import date, datetime, timedelta, timezone
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from . import caching, related_posts, rendering, search, similarity
+from .models import (
+    PersonalInfo, Skill, Project, Experience,
+    Education, Certification, Contact, BlogPost
+)
+
+SLUG_PREFIX = 'synthetic-'
+
+WORDS = (
+    'data pipeline airflow spark kafka stream batch warehouse lake schema '
+    'query index partition cluster python sql cloud aws azure docker '
+    'kubernetes latency throughput monitoring alerting quality model '
+    'feature engineering analytics dashboard etl orchestration storage '
+    'compute snowflake redis postgres cache replication shard event '
+    'consumer producer topic offset window aggregate join transform load'
+).split()
+
+# Filler vocabulary so that topical words only appear in a fraction of posts,
+# the way real search terms do.
+FILLER = ['%s%s%s' % (a, b, c) for a in 'bcdfghklmnprst' for b in 'aeiou' for c in 'bcdfghklmnprstvz']
+VOCABULARY = WORDS + FILLER
+
+ICONS = ['fab fa-python', 'fas fa-database', 'fab fa-aws', 'fab fa-docker', 'fas fa-cogs', 'fas fa-users']
+
+# Everything is dated relative to this point so reruns are identical.
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def dataset_size(scale):
+    """Number of rows of each model that ``generate(scale)`` creates"""
+    return {
+        'skills': 20 + scale // 10,
+        'projects': scale,
+        'blog_posts': scale,
+        'experiences': max(3, scale // 20),
+        'education': max(2, scale // 200),
+        'certifications': max(3, scale // 100),
+        'contacts': scale,
+    }
+
+
+class Generator:
+    def __init__(self, scale, seed=42, batch_size=1000, using=DEFAULT_DB_ALIAS):
+        self.scale = scale
+        self.sizes = dataset_size(scale)
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.using = using
+
+    def words(self, count, vocabulary=WORDS):
+        return ' '.join(self.rng.choices(vocabulary, k=count))
+
+    def paragraph(self, count):
+        return self.words(count, VOCABULARY).capitalize() + '.'
+
+    def moment(self, max_days=4 * 365):
+        return EPOCH - timedelta(days=self.rng.randrange(max_days), seconds=self.rng.randrange(86400))
+
+    def day(self, max_days=10 * 365):
+        return date(2025, 1, 1) - timedelta(days=self.rng.randrange(max_days))
+
+    def bulk_create(self, model, objects, prepare=None):
+        # bulk_create skips save(), so derived columns are filled here.
+        if prepare is not None:
+            for obj in objects:
+                prepare(obj)
+        return model.objects.using(self.using).bulk_create(objects, batch_size=self.batch_size)
+
+    def restamp(self, model, objects, field='created_at'):
+        # auto_now_add overrides explicit values on insert, so deterministic
+        # timestamps are written in a second pass.
+        for obj in objects:
+            setattr(obj, field, self.moment())
+        model.objects.using(self.using).bulk_update(objects, [field], batch_size=self.batch_size)
+
+    def pick_skills(self, skills, low, high):
+        # Skewed towards the first skills so a few technologies are common
+        # and most are rare, as on a real portfolio.
+        count = self.rng.randint(low, high)
+        chosen = set()
+        while len(chosen) < min(count, len(skills)):
+            chosen.add(skills[min(int(self.rng.paretovariate(1.2)) - 1, len(skills) - 1)].pk)
+        return sorted(chosen)
+
+    def run(self):
+        if not PersonalInfo.objects.using(self.using).exists():
+            self.bulk_create(PersonalInfo, [PersonalInfo(
+                name='Synthetic Owner', title='Data Engineer', email='owner@example.com',
+                about_me=self.paragraph(120), summary=self.paragraph(40),
+            )])
+
+        categories = [key for key, _ in Skill.SKILL_CATEGORIES]
+        skills = self.bulk_create(Skill, [
+            Skill(
+                name=f'{self.words(1).title()} {i}',
+                category=self.rng.choice(categories),
+                proficiency=self.rng.randint(40, 100),
+                icon=self.rng.choice(ICONS),
+                order=i,
+            )
+            for i in range(self.sizes['skills'])
+        ])
+
+        projects = self.bulk_create(Project, [
+            Project(
+                title=f'{self.words(3).title()} {i}',
+                description=self.paragraph(150),
+                short_description=self.paragraph(25)[:300],
+                github_url=f'https://github.com/example/synthetic-{i}',
+                featured=self.rng.random() < 0.1,
+                order=self.rng.randrange(10),
+            )
+            for i in range(self.sizes['projects'])
+        ], prepare=rendering.update_project)
+        self.restamp(Project, projects)
+        self.bulk_create(Project.technologies.through, [
+            Project.technologies.through(project_id=project.pk, skill_id=skill_id)
+            for project in projects
+            for skill_id in self.pick_skills(skills, 3, 8)
+        ])
+
+        experiences = []
+        for i in range(self.sizes['experiences']):
+            start = self.day()
+            current = i == 0
+            experiences.append(Experience(
+                company=f'{self.words(2).title()} Inc {i}',
+                position=self.rng.choice(['Data Engineer', 'Senior Data Engineer', 'Analytics Engineer']),
+                location='Remote',
+                start_date=start,
+                end_date=None if current else start + timedelta(days=self.rng.randint(180, 1500)),
+                current=current,
+                description=self.paragraph(60),
+                achievements='\n'.join(f'- {self.paragraph(12)}' for _ in range(4)),
+                order=i,
+            ))
+        experiences = self.bulk_create(Experience, experiences)
+        self.bulk_create(Experience.technologies_used.through, [
+            Experience.technologies_used.through(experience_id=experience.pk, skill_id=skill_id)
+            for experience in experiences
+            for skill_id in self.pick_skills(skills, 3, 6)
+        ])
+
+        self.bulk_create(Education, [
+            Education(
+                institution=f'{self.words(1).title()} University {i}',
+                degree=self.rng.choice(['Bachelor of Science', 'Master of Science']),
+                field_of_study='Computer Science',
+                start_date=self.day(),
+                description=self.paragraph(30),
+                order=i,
+            )
+            for i in range(self.sizes['education'])
+        ])
+        self.bulk_create(Certification, [
+            Certification(
+                name=f'{self.words(2).title()} Certified {i}',
+                issuing_organization=self.rng.choice(['AWS', 'Google Cloud', 'Databricks', 'Microsoft']),
+                issue_date=self.day(),
+                credential_id=f'SYN-{i:06d}',
+                order=i,
+            )
+            for i in range(self.sizes['certifications'])
+        ])
+
+        posts = self.bulk_create(BlogPost, [
+            BlogPost(
+                title=self.words(6).title(),
+                slug=f'{SLUG_PREFIX}{i}',
+                excerpt=self.paragraph(25)[:300],
+                content='\n\n'.join(self.paragraph(100) for _ in range(3)),
+                published=self.rng.random() < 0.9,
+            )
+            for i in range(self.sizes['blog_posts'])
+        ], prepare=rendering.update_blog_post)
+        self.restamp(BlogPost, posts)
+        if search.is_available(self.using):
+            search.index_posts([post for post in posts if post.published], using=self.using)
+
+        contacts = self.bulk_create(Contact, [
+            Contact(
+                name=f'Visitor {i}',
+                email=f'visitor{i}@example.com',
+                subject=self.words(5).capitalize(),
+                message=self.paragraph(60),
+                read=self.rng.random() < 0.5,
+            )
+            for i in range(self.sizes['contacts'])
+        ])
+        self.restamp(Contact, contacts)
+
+        for _ in similarity.rebuild(using=self.using):
+            pass
+        for _ in related_posts.rebuild(using=self.using):
+            pass
+        return self.sizes
+
+
+def exists(using=DEFAULT_DB_ALIAS):
+    """Whether synthetic data has already been generated in this database"""
+    return BlogPost.objects.using(using).filter(slug__startswith=SLUG_PREFIX).exists()
+
+
+def generate(scale, seed=42, batch_size=1000, using=DEFAULT_DB_ALIAS):
+    """Create a synthetic dataset; returns the number of rows per model"""
+    with transaction.atomic(using=using):
+        sizes = Generator(scale, seed=seed, batch_size=batch_size, using=using).run()
+    for model in caching.TRACKED_MODELS:
+        caching.bump(model)
+    return sizes
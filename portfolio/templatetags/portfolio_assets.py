@@ -0,0 +1,51 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from portfolio import assets, caching
+from portfolio.models import Skill
+
+register = template.Library()
+
+# (Skill version, whether stored icons are missing from the Font Awesome
+# subset) of this process.
+_fallback = (None, False)
+
+
+@register.simple_tag
+def asset_bundle(name):
+    """
+    ``<link>`` or ``<script>`` tags for a bundle in ``portfolio.assets.BUNDLES``.
+
+    Usage::
+
+        {% asset_bundle 'site.css' %}
+
+    Links the built bundle when ``manage.py build_assets`` has run, else each
+    of its sources.
+    """
+    urls = [(url,) for url in assets.bundle_urls(name)]
+    if name.endswith('.css'):
+        return format_html_join('\n', '<link rel="stylesheet" href="{}">', urls)
+    return format_html_join('\n', '<script src="{}"></script>', urls)
+
+
+@register.simple_tag
+def font_awesome_fallback():
+    """
+    ``<link>`` to the complete Font Awesome CSS when a skill icon saved since
+    the last ``manage.py build_assets`` is missing from the subset, so it
+    does not render as an empty box. Goes after the ``site.css`` bundle, whose
+    font faces it replaces.
+
+    Usage::
+
+        {% font_awesome_fallback %}
+    """
+    global _fallback
+    version = next(iter(caching.versions([Skill]).values()))
+    if _fallback[0] != version:
+        icons = Skill.objects.exclude(icon='').values_list('icon', flat=True)
+        _fallback = (version, bool(assets.missing_icons(icons)))
+    if not _fallback[1]:
+        return ''
+    return format_html('<link rel="stylesheet" href="{}">', assets.CDN_FALLBACKS[assets.FONT_AWESOME_CSS])
@@ -0,0 +1,44 @@
+from django import template
+
+from portfolio import caching
+
+register = template.Library()
+
+
+class CacheFragmentNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        vary_on = [value.resolve(context) for value in self.vary_on]
+        return caching.get_or_render(self.name, lambda: self.nodelist.render(context), *vary_on)
+
+
+@register.tag('cachefragment')
+def do_cachefragment(parser, token):
+    """
+    Cache a template fragment until a model it depends on changes.
+
+    Usage::
+
+        {% cachefragment 'skills_grid' [vary_on ...] %}
+            ...
+        {% endcachefragment %}
+
+    The fragment name must be registered in ``portfolio.caching.DEPENDENCIES``
+    as ``fragment:<name>``.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a fragment name.")
+    name = bits[1]
+    if not (name[0] == name[-1] and name[0] in ('"', "'")):
+        raise template.TemplateSyntaxError(f"'{bits[0]}' fragment name must be a quoted string.")
+    name = f'fragment:{name[1:-1]}'
+    if name not in caching.DEPENDENCIES:
+        raise template.TemplateSyntaxError(f"No cache dependencies registered for {name!r}.")
+    nodelist = parser.parse(('endcachefragment',))
+    parser.delete_first_token()
+    return CacheFragmentNode(nodelist, name, [parser.compile_filter(bit) for bit in bits[2:]])
@@ -0,0 +1,52 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from portfolio import images
+
+register = template.Library()
+
+
+def _srcset(storage, entries):
+    return ', '.join(f'{storage.url(name)} {width}w' for width, name in entries)
+
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes='100vw', css_class='', loading='lazy', style=''):
+    """
+    ``<picture>`` with WebP and JPEG ``srcset``s for an uploaded image.
+
+    Usage::
+
+        {% responsive_image project.image alt=project.title sizes="(min-width: 992px) 33vw, 100vw" css_class="card-img-top" %}
+
+    Until the derivatives exist (see ``portfolio.images``) the original is
+    used. Pass ``loading="eager"`` for images that are visible on load.
+    """
+    if not image:
+        return ''
+    storage = image.storage
+    manifest = images.load_manifest(image.name, storage=storage)
+    if manifest is None:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" style="{}" loading="{}" decoding="async">',
+            image.url, alt, css_class, style, loading,
+        )
+
+    variants = manifest['variants']
+    fallback = variants['jpeg'][-1]
+    placeholder = f"background:url('{manifest['placeholder']}') center/cover no-repeat;"
+    sources = format_html_join(
+        '', '<source type="image/{}" srcset="{}" sizes="{}">',
+        [
+            (extension, _srcset(storage, entries), sizes)
+            for extension, entries in variants.items()
+            if extension != 'jpeg'
+        ],
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" '
+        'class="{}" style="{}" loading="{}" decoding="async"></picture>',
+        sources,
+        storage.url(fallback[1]), _srcset(storage, variants['jpeg']), sizes,
+        manifest['width'], manifest['height'], alt, css_class, placeholder + style, loading,
+    )
@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+
+from .. import related_posts, similarity
+from ..models import BlogPost, Project, Skill
+from .utils import PAGE_SETTINGS, make_project
+
+
+@override_settings(**PAGE_SETTINGS)
+class ApiTests(TransactionTestCase):
+    # Real commits: the related-project and related-post indexes are refreshed
+    # on commit, and so are the cached responses that embed them.
+
+    def setUp(self):
+        cache.clear()
+        self.python = Skill.objects.create(name='Python', category='programming', proficiency=90, order=1)
+        self.django = Skill.objects.create(name='Django', category='framework', proficiency=80)
+        self.projects = [make_project(f'Project {i}', order=i) for i in range(5)]
+        self.projects[0].technologies.add(self.python, self.django)
+        self.projects[1].technologies.add(self.python)
+
+    def _get(self, url, status=200):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response.json()
+
+    def test_pagination(self):
+        page = self._get('/api/projects/?limit=2&fields=id,title')
+        self.assertEqual(page['data'], [{'id': p.pk, 'title': p.title} for p in self.projects[:2]])
+        self.assertIsNone(page['previous'])
+        titles = [row['title'] for row in page['data']]
+        while page['next']:
+            page = self._get(page['next'])
+            titles += [row['title'] for row in page['data']]
+        self.assertEqual(titles, [p.title for p in self.projects])
+        self.assertEqual([row['title'] for row in self._get(page['previous'])['data']], titles[2:4])
+
+    def test_embeds(self):
+        data = self._get(f'/api/projects/{self.projects[0].pk}/?fields=id&embed=technologies,related')['data']
+        # Skills follow their own ordering: by category, then order.
+        self.assertEqual([skill['name'] for skill in data['technologies']], ['Django', 'Python'])
+        self.assertEqual([project['id'] for project in data['related']], [self.projects[1].pk])
+        self.assertNotIn('description', data['related'][0])
+
+        rows = self._get('/api/projects/?fields=id&embed=technologies&limit=5')['data']
+        self.assertEqual([len(row['technologies']) for row in rows], [2, 1, 0, 0, 0])
+
+    def test_embedded_neighbours_are_refreshed(self):
+        url = f'/api/projects/{self.projects[2].pk}/?fields=id&embed=related'
+        self.assertEqual(self._get(url)['data']['related'], [])
+        # Only the index changes: no signal bumps Project or Skill.
+        Project.technologies.through.objects.bulk_create([
+            Project.technologies.through(project=self.projects[2], skill=self.django),
+        ])
+        similarity.refresh([self.projects[2].pk])
+        related = self._get(url)['data']['related']
+        self.assertEqual([project['id'] for project in related], [self.projects[0].pk])
+
+    def test_related_posts_embed_is_refreshed(self):
+        BlogPost.objects.create(title='Kafka', slug='kafka', content='kafka broker partition', published=True)
+        other = BlogPost.objects.create(title='Gardening', slug='gardening', content='roses', published=True)
+        url = '/api/posts/kafka/?fields=slug&embed=related'
+        self.assertEqual(self._get(url)['data']['related'], [])
+        BlogPost.objects.filter(pk=other.pk).update(content='kafka broker offsets')
+        other.refresh_from_db()
+        related_posts.store_terms([other])
+        related_posts.refresh([other.pk])
+        self.assertEqual([post['slug'] for post in self._get(url)['data']['related']], ['gardening'])
+
+    def test_errors_are_json(self):
+        BlogPost.objects.create(title='Draft', slug='draft', content='Body')
+        for url in ('/api/nothing/', '/api/projects/999/', '/api/projects/abc/', '/api/posts/draft/'):
+            with self.subTest(url=url):
+                self.assertEqual(self._get(url, status=404), {'error': self._error(url)})
+        for url in ('/api/projects/?limit=0', '/api/projects/?cursor=bad', '/api/projects/?fields=secret'):
+            with self.subTest(url=url):
+                self.assertIn('error', self._get(url, status=400))
+
+    def _error(self, url):
+        return "Unknown resource 'nothing'" if url == '/api/nothing/' else 'Not found'
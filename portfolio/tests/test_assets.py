@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .. import assets
+
+FONT_AWESOME = '''/*!
+ * Font Awesome Free 6.4.0
+ */
+.fa{font-family:var(--fa-style-family,"Font Awesome 6 Free")}
+.fa-github:before{content:"\\f09b"}
+.fa-globe:before{content:"\\f0ac"}
+.fa-spin{animation-name:fa-spin}
+.fa-beat{animation-name:fa-beat}
+@keyframes fa-spin{0%{transform:rotate(0)}}
+@keyframes fa-beat{0%{transform:scale(1)}}
+@media (prefers-reduced-motion:reduce){.fa-spin,.fa-beat{animation:none}}
+@font-face{font-family:"Font Awesome 6 Brands";src:url(../webfonts/fa-brands-400.woff2) format("woff2"),url(../webfonts/fa-brands-400.ttf) format("truetype")}
+'''
+
+
+@mock.patch.object(assets, 'rcssmin', None)
+@mock.patch.object(assets, 'rjsmin', None)
+class MinifyTests(SimpleTestCase):
+    def test_css(self):
+        css = '/*! licence */\n/* note */\na > b  {\n  color: red;\n  content: "a  /* b */";\n}\n'
+        self.assertEqual(assets.minify_css(css), '/*! licence */\na>b{color:red;content:"a  /* b */"}\n')
+        # A space before a colon may be a descendant combinator.
+        self.assertEqual(assets.minify_css('p :hover { }'), 'p :hover{}\n')
+
+    def test_js_keeps_strings_regexes_and_line_breaks(self):
+        js = (
+            '// comment\n'
+            'var a = "x // y";   /* block */\n'
+            'var re = /[/]+\\/x/g;\n'
+            '\n'
+            '    return a\n'
+        )
+        self.assertEqual(assets.minify_js(js), 'var a = "x // y";\nvar re = /[/]+\\/x/g;\nreturn a\n')
+
+    def test_html(self):
+        html = (
+            '<div>\n  <!-- note -->\n  <p>a   b</p>\n</div>\n'
+            '<pre>  keep\n   this</pre><style> p { color: red ; } </style>'
+        )
+        self.assertEqual(
+            assets.minify_html(html),
+            '<div>\n<p>a b</p>\n</div>\n<pre>  keep\n   this</pre><style>p{color:red}</style>\n',
+        )
+
+    def test_json_scripts_are_left_alone(self):
+        html = '<script type="application/ld+json">{ "a" : "//b" }</script>'
+        self.assertEqual(assets.minify_html(html), html + '\n')
+
+
+class BundleTests(SimpleTestCase):
+    def test_rebase_urls(self):
+        css = 'a{background:url(../img/x.png)} b{background:url("data:image/png;base64,AA")}'
+        self.assertEqual(
+            assets.rebase_urls(css, 'vendor/lib/css/lib.css', 'bundles/site.css'),
+            'a{background:url("../vendor/lib/img/x.png")} b{background:url("data:image/png;base64,AA")}',
+        )
+
+    def test_sources_are_linked_before_a_build(self):
+        with mock.patch.object(assets, 'is_available', lambda path: path == 'css/style.css'):
+            urls = assets.bundle_urls('site.css')
+        self.assertEqual(urls[0], assets.BOOTSTRAP_FILES['vendor/bootstrap/bootstrap.min.css'])
+        self.assertEqual(urls[-1], '/static/css/style.css')
+        with mock.patch.object(assets, 'is_available', lambda path: True):
+            self.assertEqual(assets.bundle_urls('site.css'), ['/static/bundles/site.css'])
+
+    def test_font_awesome_subset(self):
+        css, codepoints = assets.subset_font_awesome(FONT_AWESOME, {'fa-github', 'fa-spin'})
+        self.assertTrue(css.startswith('/*!\n * Font Awesome Free 6.4.0\n */\n'))
+        self.assertIn('.fa-github:before', css)
+        self.assertNotIn('fa-globe', css)
+        self.assertNotIn('fa-beat', css)
+        self.assertIn('@keyframes fa-spin', css)
+        self.assertIn('@media (prefers-reduced-motion:reduce){.fa-spin{animation:none}}', css)
+        self.assertIn('src:url(webfonts/fa-brands-400.woff2) format("woff2")', css)
+        self.assertEqual(codepoints, {0xf09b})
+
+    def test_used_icons_and_weights(self):
+        texts = ['<i class="fab fa-github fa-2x"></i>', 'h1 { font-weight: 600 } .x{font-weight:bold}', 'fw-light']
+        self.assertEqual(assets.icon_classes(texts), {'fa-github', 'fa-2x'})
+        self.assertEqual(assets.font_weights(texts), [300, 400, 500, 600, 700])
+
+    def test_missing_icons(self):
+        with mock.patch.object(assets, 'font_awesome_subset', lambda: frozenset({'fa-github'})):
+            self.assertEqual(assets.missing_icons(['fa-github fa-gitlab']), {'fa-gitlab'})
+        with mock.patch.object(assets, 'font_awesome_subset', lambda: None):
+            self.assertEqual(assets.missing_icons(['fa-gitlab']), set())
@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..cache_backends import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = SQLiteCache(str(Path(self.directory) / 'cache.sqlite3'), {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_add_only_over_missing_or_expired_entries(self):
+        self.assertTrue(self.cache.add('key', 'first'))
+        self.assertFalse(self.cache.add('key', 'second'))
+        self.assertEqual(self.cache.get('key'), 'first')
+        self.cache.set('key', 'expired', timeout=0)
+        self.assertTrue(self.cache.add('key', 'third'))
+        self.assertEqual(self.cache.get('key'), 'third')
+
+    def test_incr(self):
+        self.cache.set('counter', 5)
+        self.assertEqual(self.cache.incr('counter'), 6)
+        self.assertEqual(self.cache.incr('counter', 10), 16)
+        self.assertEqual(self.cache.get('counter'), 16)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set('expired', 1, timeout=0)
+        with self.assertRaises(ValueError):
+            self.cache.incr('expired')
+        self.cache.set('text', 'five')
+        with self.assertRaises(ValueError):
+            self.cache.incr('text')
+
+    def test_incr_from_threads_is_atomic(self):
+        self.cache.set('counter', 0)
+
+        def work():
+            for _ in range(50):
+                self.cache.incr('counter')
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_get_or_set(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 'value'
+        self.assertEqual(self.cache.get_or_set('key', compute), 'value')
+        self.assertEqual(self.cache.get_or_set('key', compute), 'value')
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.get_or_set('plain', 'default'), 'default')
+        # None is returned but not stored.
+        self.assertIsNone(self.cache.get_or_set('none', lambda: None))
+        self.assertFalse(self.cache.has_key('none'))
+
+    def test_get_or_set_computes_once_for_concurrent_misses(self):
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        def work():
+            results.append(self.cache.get_or_set('key', compute))
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 4)
+
+    def test_get_or_set_uses_a_value_written_before_it_took_the_lock(self):
+        insert = self.cache._insert
+
+        def finish_first(key, *args):
+            # Another worker stores the value and releases its lock after
+            # this one found the entry missing.
+            if key.endswith(':lock'):
+                self.cache.set('key', 'theirs')
+            return insert(key, *args)
+        with mock.patch.object(self.cache, '_insert', finish_first):
+            self.assertEqual(self.cache.get_or_set('key', lambda: 'ours'), 'theirs')
+        self.assertIsNone(self.cache._read(self.cache.make_key('key') + ':lock'))
+
+    def test_get_or_set_serves_stale_value_while_another_worker_recomputes(self):
+        self.cache.set('key', 'old', timeout=0)
+        started = threading.Event()
+        release = threading.Event()
+
+        def compute():
+            started.set()
+            release.wait(5)
+            return 'new'
+        thread = threading.Thread(target=self.cache.get_or_set, args=('key', compute))
+        thread.start()
+        started.wait(5)
+        self.assertEqual(self.cache.get_or_set('key', lambda: 'unexpected'), 'old')
+        release.set()
+        thread.join()
+        self.assertEqual(self.cache.get('key'), 'new')
@@ -0,0 +1,87 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import caching
+from ..models import Experience, Skill
+from .utils import PAGE_SETTINGS
+
+
+class Rollback(Exception):
+    pass
+
+
+@override_settings(**PAGE_SETTINGS)
+class PageCacheTests(TransactionTestCase):
+    # Real commits and rollbacks: TestCase keeps every test in one transaction.
+
+    def setUp(self):
+        cache.clear()
+        self.skill = Skill.objects.create(name='Python', category='programming', proficiency=90)
+
+    def _x_cache(self, name='portfolio:skills'):
+        return self.client.get(reverse(name))['X-Cache']
+
+    def test_second_request_is_a_hit(self):
+        self.assertEqual(self._x_cache(), 'MISS')
+        self.assertEqual(self._x_cache(), 'HIT')
+
+    def test_committed_save_invalidates(self):
+        self._x_cache()
+        with transaction.atomic():
+            self.skill.proficiency = 95
+            self.skill.save()
+        response = self.client.get(reverse('portfolio:skills'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, '95')
+
+    def test_rolled_back_save_keeps_the_entry(self):
+        self._x_cache()
+        try:
+            with transaction.atomic():
+                self.skill.proficiency = 95
+                self.skill.save()
+                raise Rollback
+        except Rollback:
+            pass
+        self.assertEqual(self._x_cache(), 'HIT')
+
+    def test_version_is_bumped_on_commit_only(self):
+        before = caching.versions([Skill])
+        with transaction.atomic():
+            self.skill.save()
+            self.skill.save()
+            # Not yet: a request now would cache the old rows.
+            self.assertEqual(caching.versions([Skill]), before)
+        after = caching.versions([Skill])
+        # Several saves in one transaction bump once.
+        self.assertEqual([after[key] - before[key] for key in before], [1])
+
+    def test_save_invalidates_only_dependent_pages(self):
+        self._x_cache('portfolio:skills')
+        self._x_cache('portfolio:about')
+        Experience.objects.create(
+            company='Acme', position='Engineer', location='Remote', start_date='2020-01-01',
+            description='Work',
+        )
+        self.assertEqual(self._x_cache('portfolio:skills'), 'HIT')
+        self.assertEqual(self._x_cache('portfolio:about'), 'MISS')
+
+    def test_fragment_is_rendered_once_per_version(self):
+        renders = []
+
+        def render():
+            renders.append(True)
+            return 'grid'
+        self.assertEqual(caching.get_or_render('fragment:skills_grid', render), 'grid')
+        caching.get_or_render('fragment:skills_grid', render)
+        self.assertEqual(len(renders), 1)
+        caching.bump(Skill)
+        caching.get_or_render('fragment:skills_grid', render)
+        self.assertEqual(len(renders), 2)
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        self.client.force_login(User.objects.create_user('staff'))
+        self.assertNotIn('X-Cache', self.client.get(reverse('portfolio:skills')))
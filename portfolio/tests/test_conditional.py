@@ -0,0 +1,105 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import conditional
+from ..models import BlogPost, Skill
+from .utils import PAGE_SETTINGS, make_project
+
+
+@override_settings(**PAGE_SETTINGS)
+class ConditionalGetTests(TransactionTestCase):
+    # Real commits: validators advance when a change commits.
+
+    def setUp(self):
+        cache.clear()
+        self.skill = Skill.objects.create(name='Python', category='programming', proficiency=90)
+
+    def _validators(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        return response['ETag'], response['Last-Modified']
+
+    def test_matching_validators_get_304(self):
+        url = reverse('portfolio:skills')
+        etag, last_modified = self._validators(url)
+        self.assertTrue(etag.startswith('W/"'))
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(url, headers={'If-Modified-Since': last_modified}).status_code, 304)
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': 'W/"other"'}).status_code, 200)
+
+    def test_save_changes_the_etag(self):
+        url = reverse('portfolio:skills')
+        etag, _ = self._validators(url)
+        self.skill.proficiency = 95
+        self.skill.save()
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+        # Unrelated tables leave the page valid.
+        BlogPost.objects.create(title='Post', slug='post', content='Body', published=True)
+        etag, _ = self._validators(url)
+        BlogPost.objects.create(title='Other', slug='other', content='Body', published=True)
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_project_page_revalidates_when_its_neighbours_change(self):
+        project = make_project('First')
+        project.technologies.add(self.skill)
+        url = reverse('portfolio:project_detail', args=[project.pk])
+        etag, _ = self._validators(url)
+        # A new project sharing the skill joins the neighbour list.
+        make_project('Second').technologies.add(self.skill)
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Second')
+
+    def test_blog_post_page_revalidates_when_related_posts_change(self):
+        post = BlogPost.objects.create(title='Kafka', slug='kafka', content='kafka broker partition', published=True)
+        url = reverse('portfolio:blog_detail', args=[post.slug])
+        etag, _ = self._validators(url)
+        BlogPost.objects.create(title='Brokers', slug='brokers', content='kafka broker offsets', published=True)
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Brokers')
+
+    def test_missing_objects_are_404(self):
+        self.assertEqual(self.client.get(reverse('portfolio:blog_detail', args=['missing'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('portfolio:project_detail', args=[999])).status_code, 404)
+
+
+class ReleaseTests(SimpleTestCase):
+    def setUp(self):
+        conditional._release.cache_clear()
+        self.addCleanup(conditional._release.cache_clear)
+        patcher = mock.patch.object(conditional, '_debug_stamp', (float('-inf'), None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(DEBUG=True)
+    def test_debug_hashes_again_only_after_a_change(self):
+        stamps = iter([('a',), ('a',), ('b',)])
+        with mock.patch('portfolio.export.code_stamp', lambda: next(stamps)), \
+                mock.patch('portfolio.export.code_fingerprint', side_effect=['one', 'two']) as fingerprint, \
+                mock.patch.object(conditional, 'DEBUG_CHECK_INTERVAL', 0):
+            self.assertEqual([conditional.release() for _ in range(3)], ['one', 'one', 'two'])
+        self.assertEqual(fingerprint.call_count, 2)
+
+    @override_settings(DEBUG=True)
+    def test_debug_checks_at_most_once_an_interval(self):
+        with mock.patch('portfolio.export.code_stamp', return_value=('a',)) as stamp, \
+                mock.patch('portfolio.export.code_fingerprint', return_value='one'):
+            for _ in range(5):
+                conditional.release()
+        self.assertEqual(stamp.call_count, 1)
+
+    @override_settings(DEBUG=False)
+    def test_production_hashes_once(self):
+        with mock.patch('portfolio.export.code_stamp') as stamp, \
+                mock.patch('portfolio.export.code_fingerprint', return_value='one') as fingerprint:
+            conditional.release()
+            conditional.release()
+        stamp.assert_not_called()
+        self.assertEqual(fingerprint.call_count, 1)
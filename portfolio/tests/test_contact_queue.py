@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from .. import contact_queue
+from ..models import Contact
+
+
+def submission(i):
+    return {'name': f'Sender {i}', 'email': f'sender{i}@example.com', 'subject': f'Subject {i}', 'message': 'Hello'}
+
+
+class ContactQueueTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        settings = override_settings(
+            PORTFOLIO_CONTACT_QUEUE_DIR=self.directory,
+            PORTFOLIO_CONTACT_WORKER=True,
+            PORTFOLIO_CONTACT_NOTIFY=['owner@example.com'],
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _notify(self, count):
+        """Queue ``count`` saved messages waiting for their notification"""
+        for i in range(count):
+            contact_queue._write('notify', {
+                'id': f'{i:020d}.json', 'submitted_at': '2024-01-01T00:00:00+00:00',
+                'data': submission(i), 'contact_id': i, 'attempts': 0, 'retry_at': 0,
+            })
+
+    def test_process_saves_and_notifies(self):
+        contact_queue.enqueue(submission(1))
+        contact_queue.enqueue(submission(2))
+        self.assertEqual(contact_queue.pending()['new'], 2)
+        self.assertEqual(contact_queue.process(), (0, 2, 2, 0, 0))
+        self.assertEqual(sorted(Contact.objects.values_list('subject', flat=True)), ['Subject 1', 'Subject 2'])
+        self.assertEqual([email.to for email in mail.outbox], [['owner@example.com']] * 2)
+        self.assertEqual(set(contact_queue.pending().values()), {0})
+
+    def test_two_drainers_send_each_notification_once(self):
+        self._notify(40)
+        start = threading.Barrier(2)
+        results = []
+
+        def drain():
+            start.wait()
+            results.append(contact_queue.deliver_notifications())
+        threads = [threading.Thread(target=drain) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        subjects = [email.subject for email in mail.outbox]
+        self.assertEqual(len(subjects), 40)
+        self.assertEqual(len(set(subjects)), 40)
+        self.assertEqual(sum(sent for sent, _, _ in results), 40)
+        self.assertEqual(set(contact_queue.pending().values()), {0})
+
+    def test_notification_taken_by_another_drainer_is_skipped(self):
+        self._notify(3)
+        read = contact_queue._read
+        other = []
+
+        def read_then_race(path):
+            message = read(path)
+            if not other:
+                # Another drainer claims everything after this one read its first file.
+                with mock.patch.object(contact_queue, '_read', read):
+                    other.append(contact_queue.deliver_notifications())
+            return message
+        with mock.patch.object(contact_queue, '_read', read_then_race):
+            self.assertEqual(contact_queue.deliver_notifications(), (0, 0, 0))
+        self.assertEqual(other, [(3, 0, 0)])
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failed_sends_are_retried_then_given_up(self):
+        self._notify(1)
+        path = contact_queue._stage('notify') / f'{0:020d}.json'
+        with mock.patch('django.core.mail.EmailMessage.send', side_effect=OSError('down')):
+            self.assertEqual(contact_queue.deliver_notifications(max_attempts=2), (0, 1, 0))
+            self.assertEqual(contact_queue.pending()['sending'], 0)
+            message = contact_queue._read(path)
+            self.assertEqual(message['attempts'], 1)
+            # Not due yet.
+            self.assertEqual(contact_queue.deliver_notifications(max_attempts=2), (0, 0, 0))
+            contact_queue._write('notify', {**message, 'retry_at': 0})
+            with self.assertLogs('portfolio.contact_queue', 'ERROR'):
+                self.assertEqual(contact_queue.deliver_notifications(max_attempts=2), (0, 0, 1))
+        self.assertEqual(contact_queue.pending(), {'new': 0, 'work': 0, 'notify': 0, 'sending': 0, 'failed': 1})
+
+    def test_abandoned_claims_are_recovered(self):
+        contact_queue.enqueue(submission(1))
+        contact_queue.claim(10)
+        self._notify(1)
+        os.rename(
+            contact_queue._stage('notify') / f'{0:020d}.json', contact_queue._stage('sending') / f'{0:020d}.json',
+        )
+        self.assertEqual(contact_queue.recover(stale_after=60), 0)
+        self.assertEqual(contact_queue.recover(stale_after=-1), 2)
+        self.assertEqual(contact_queue.pending(), {'new': 1, 'work': 0, 'notify': 1, 'sending': 0, 'failed': 0})
@@ -0,0 +1,56 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .. import db_router
+from ..models import BlogPost, Contact, Project
+from .utils import LOCMEM_CACHE
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        for patcher in (
+            mock.patch.object(db_router, 'replica_configured', return_value=True),
+            mock.patch.object(db_router.snapshot, 'configured', return_value=False),
+            mock.patch.object(db_router.snapshot, 'connect', return_value=False),
+            mock.patch.object(db_router, '_marked_at', 0.0),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.router = db_router.ReplicaRouter()
+        self.request = RequestFactory().get('/')
+
+    def _reads(self, write=None):
+        """Where a decorated view reads from, before and after writing ``write``"""
+        @db_router.replica_reads
+        def view(request):
+            reads = [self.router.db_for_read(Project)]
+            if write is not None:
+                self.assertEqual(self.router.db_for_write(write), 'default')
+                reads.append(self.router.db_for_read(Project))
+            return reads
+        return view(self.request)
+
+    def test_reads_follow_a_write_to_the_primary(self):
+        self.assertEqual(self._reads(BlogPost), ['replica', None])
+        # Later requests read the primary until the replica has caught up.
+        self.assertEqual(self._reads(), [None])
+        cache.delete(db_router.RECENT_WRITE_KEY)
+        self.assertEqual(self._reads(), ['replica'])
+
+    def test_many_to_many_writes_mark_the_site(self):
+        self._reads(Project.technologies.through)
+        self.assertTrue(db_router.recently_written())
+
+    def test_other_writes_only_move_their_own_request(self):
+        self.assertEqual(self._reads(Contact), ['replica', None])
+        self.assertFalse(db_router.recently_written())
+        self.assertEqual(self._reads(), ['replica'])
+
+    def test_unsafe_methods_and_undecorated_code_use_the_primary(self):
+        self.request = RequestFactory().post('/')
+        self.assertEqual(self._reads(), [None])
+        self.assertIsNone(self.router.db_for_read(Project))
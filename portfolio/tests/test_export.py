@@ -0,0 +1,124 @@
+import shutil
+import tempfile
+from concurrent.futures import Future
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .. import caching, export
+from ..models import BlogPost
+from .utils import PAGE_SETTINGS, make_project
+
+
+class InlineExecutor:
+    """Runs export tasks in this process, where the test database is"""
+
+    def __init__(self, max_workers=None, initializer=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+@override_settings(**PAGE_SETTINGS, ALLOWED_HOSTS=['example.com'])
+class ExportTests(TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.projects = [make_project(f'Project {i}') for i in range(10)]
+        self.post = BlogPost.objects.create(title='Post', slug='post', content='Body', published=True)
+        BlogPost.objects.create(title='Draft', slug='draft', content='Body')
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _export(self):
+        out = StringIO()
+        with mock.patch('portfolio.management.commands.export_site.ProcessPoolExecutor', InlineExecutor):
+            call_command('export_site', output=str(self.root), stdout=out, stderr=StringIO())
+        return out.getvalue().splitlines()[0]
+
+    def test_pages(self):
+        paths = {page.path for page in export.pages()}
+        self.assertIn(f'/project/{self.projects[0].pk}/', paths)
+        self.assertIn('/blog/post/', paths)
+        self.assertNotIn('/blog/draft/', paths)
+        # Ten projects at nine a page.
+        self.assertIn('/projects/page/2/', paths)
+        self.assertNotIn('/projects/page/3/', paths)
+        self.assertNotIn('/contact/', paths)
+
+    def test_only_changed_pages_are_rendered_again(self):
+        total = len(list(export.pages()))
+        self.assertEqual(self._export(), f'{total} pages: {total} to render, 0 unchanged, 0 removed')
+        html = (self.root / 'projects' / 'index.html').read_text()
+        self.assertIn('href="/projects/page/2/"', html)
+        self.assertEqual(self._export(), f'{total} pages: 0 to render, {total} unchanged, 0 removed')
+
+        BlogPost.objects.filter(pk=self.post.pk).update(title='Renamed')
+        # Pages are rendered through the page cache; update() sends no signal.
+        caching.bump(BlogPost)
+        changed = {page.path for page in export.pages()} - set(self._unchanged_after_edit())
+        self.assertIn('/blog/post/', changed)
+        self.assertNotIn(f'/project/{self.projects[0].pk}/', changed)
+        self.assertIn('Renamed', (self.root / 'blog' / 'post' / 'index.html').read_text())
+
+        self.post.delete()
+        self.assertEqual(self._export().split(', ')[-1], '1 removed')
+        self.assertFalse((self.root / 'blog' / 'post').exists())
+
+    def _unchanged_after_edit(self):
+        before = export.load_manifest(self.root)
+        self._export()
+        after = export.load_manifest(self.root)
+        return [path for path, signature in after.items() if before.get(path) == signature]
+
+
+class StaticPagesTests(SimpleTestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        (self.root / 'about').mkdir()
+        (self.root / 'about' / 'index.html').write_text('<p>exported</p>')
+        self.seen = []
+
+        def application(environ, start_response):
+            self.seen.append((environ['PATH_INFO'], environ.get('QUERY_STRING', '')))
+            start_response('200 OK', [('Content-Type', 'text/html')])
+            return [b'django']
+        self.pages = export.StaticPages(application, self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _get(self, path, query=''):
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+            'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'wsgi.url_scheme': 'http',
+        }
+        return b''.join(self.pages(environ, lambda status, headers: None))
+
+    def test_exported_pages_are_served(self):
+        self.assertEqual(self._get('/about/'), b'<p>exported</p>')
+        self.assertEqual(self.seen, [])
+
+    def test_everything_else_falls_through(self):
+        self.assertEqual(self._get('/about/', 'ref=x'), b'django')
+        self.assertEqual(self._get('/skills/'), b'django')
+        self._get('/blog/page/3/')
+        self.assertEqual(self.seen, [('/about/', 'ref=x'), ('/skills/', ''), ('/blog/', 'page=3')])
+
+    def test_page_links_are_rewritten(self):
+        html = '<a href="?page=1">1</a><a href="?page=2">2</a>'
+        self.assertEqual(
+            export.rewrite_page_links(html, '/blog/'), '<a href="/blog/">1</a><a href="/blog/page/2/">2</a>',
+        )
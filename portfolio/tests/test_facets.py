@@ -0,0 +1,82 @@
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..facets import ProjectFacets
+from ..models import Project, Skill
+from .utils import PAGE_SETTINGS, make_project
+
+
+def _counts(facet_options):
+    return {option['value']: option['count'] for option in facet_options}
+
+
+@override_settings(**PAGE_SETTINGS)
+class ProjectFacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.python = Skill.objects.create(name='Python', category='programming', proficiency=90)
+        cls.go = Skill.objects.create(name='Go', category='programming', proficiency=70)
+        cls.aws = Skill.objects.create(name='AWS', category='cloud', proficiency=60)
+        projects = [
+            ('Crawler', True, 2023, [cls.python]),
+            ('Proxy', False, 2023, [cls.go]),
+            ('Pipeline', False, 2024, [cls.python, cls.aws]),
+            ('Deployer', True, 2024, [cls.go, cls.aws]),
+        ]
+        for title, featured, year, technologies in projects:
+            project = make_project(title, featured=featured, created_at=datetime(year, 6, 1, tzinfo=timezone.utc))
+            project.technologies.set(technologies)
+
+    def _facets(self, query):
+        facets = ProjectFacets(QueryDict(query))
+        return facets, facets.counts(Project.objects.all())
+
+    def test_counts_without_selections(self):
+        _, counts = self._facets('')
+        self.assertEqual(counts['total'], 4)
+        self.assertEqual(_counts(counts['technologies']), {self.python.pk: 2, self.go.pk: 2, self.aws.pk: 2})
+        self.assertEqual(_counts(counts['years']), {2024: 2, 2023: 2})
+        self.assertEqual(_counts(counts['featured']), {'1': 2, '0': 2})
+        self.assertEqual(_counts(counts['categories']), {'programming': 4, 'cloud': 2})
+
+    def test_facet_counts_ignore_their_own_selection(self):
+        facets, counts = self._facets(f'tech={self.python.pk}&year=2024')
+        self.assertEqual(counts['total'], 1)
+        # Technologies are counted over 2024 projects only, every option still
+        # selectable; years over Python projects only.
+        self.assertEqual(_counts(counts['technologies']), {self.python.pk: 1, self.go.pk: 1, self.aws.pk: 2})
+        self.assertEqual(_counts(counts['years']), {2024: 1, 2023: 1})
+        self.assertEqual(_counts(counts['featured']), {'1': 0, '0': 1})
+        self.assertEqual([p.title for p in facets.filter(Project.objects.all())], ['Pipeline'])
+
+    def test_values_within_a_facet_are_ored(self):
+        facets, counts = self._facets(f'tech={self.python.pk}&tech={self.go.pk}&featured=1')
+        self.assertEqual(counts['total'], 2)
+        self.assertEqual(_counts(counts['featured']), {'1': 2, '0': 2})
+        self.assertEqual(
+            {p.title for p in facets.filter(Project.objects.all())}, {'Crawler', 'Deployer'},
+        )
+
+    def test_selected_option_without_matches_is_still_listed(self):
+        ruby = Skill.objects.create(name='Ruby', category='programming', proficiency=10)
+        _, counts = self._facets(f'tech={ruby.pk}')
+        self.assertEqual(counts['total'], 0)
+        option = next(o for o in counts['technologies'] if o['value'] == ruby.pk)
+        self.assertEqual(option['count'], 0)
+        self.assertTrue(option['selected'])
+
+    def test_toggle_resets_pagination(self):
+        facets = ProjectFacets(QueryDict(f'tech={self.python.pk}&cursor=abc&page=2'))
+        self.assertEqual(facets.toggle('tech', self.python.pk), '')
+        self.assertEqual(facets.toggle('year', 2024), f'tech={self.python.pk}&year=2024')
+
+    def test_projects_page(self):
+        cache.clear()
+        response = self.client.get(reverse('portfolio:projects'), {'category': 'cloud'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({p.title for p in response.context['projects']}, {'Pipeline', 'Deployer'})
+        self.assertEqual(response.context['facet_counts']['total'], 2)
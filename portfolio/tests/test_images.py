@@ -0,0 +1,64 @@
+import io
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from .. import images
+from ..storage import ContentAddressedStorage
+from .utils import LOCMEM_CACHE
+
+
+def jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 40, 40)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class DerivativeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_generate_writes_variants_and_manifest(self):
+        name = self.storage.save('projects/photo.jpg', ContentFile(jpeg(800, 400)))
+        manifest = images.generate(name, storage=self.storage)
+        self.assertEqual(manifest['source'], name)
+        self.assertEqual([width for width, _ in manifest['variants']['webp']], [320, 640, 800])
+        for entries in manifest['variants'].values():
+            for width, stored in entries:
+                self.assertEqual(stored, images.derivative_name(name, width, stored.rsplit('.', 1)[1]))
+                self.assertTrue(self.storage.exists(stored))
+        self.assertTrue(manifest['placeholder'].startswith('data:image/webp;base64,'))
+        self.assertEqual(images.load_manifest(name, storage=self.storage), manifest)
+
+    def test_derivatives_of_a_known_source(self):
+        name = self.storage.save('projects/photo.jpg', ContentFile(jpeg(400, 200)))
+        images.generate(name, storage=self.storage)
+        derivative = images.derivative_name(name, 320, 'webp')
+        self.assertTrue(images.is_derivative(derivative, storage=self.storage))
+        self.assertTrue(images.is_derivative(images.manifest_name(name), storage=self.storage))
+        self.assertEqual(images.source_name(derivative, storage=self.storage), name)
+        self.assertFalse(images.is_derivative(name, storage=self.storage))
+        # Named like one, but not in the manifest.
+        self.assertFalse(images.is_derivative(images.derivative_name(name, 1280, 'webp'), storage=self.storage))
+
+    def test_uploads_named_like_derivatives_are_uploads(self):
+        for upload in ('data.json', 'projects/photo.640w.webp', 'projects/missing.jpg.640w.webp'):
+            with self.subTest(upload=upload):
+                self.assertFalse(images.is_derivative(upload, storage=self.storage))
+                self.assertEqual(images.source_name(upload, storage=self.storage), upload)
+
+    def test_uploads_named_like_derivatives_are_content_addressed(self):
+        stored = self.storage.save('projects/photo.640w.webp', ContentFile(b'RIFF....WEBP'))
+        self.assertRegex(stored, r'^projects/[0-9a-f]{2}/[0-9a-f]{32}\.webp$')
+        stored = self.storage.save('data.json', ContentFile(b'{}'))
+        self.assertRegex(stored, r'^[0-9a-f]{2}/[0-9a-f]{32}\.json$')
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from ..storage import INCOMING_DIR
+from .utils import PAGE_SETTINGS
+
+BODY = bytes(range(256)) * 4
+
+
+class MediaServeTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.digest = hashlib.sha256(BODY).hexdigest()
+        self.addressed = f'projects/{self.digest[:2]}/{self.digest[:32]}.bin'
+        for name in (self.addressed, 'docs/plain.txt', f'{INCOMING_DIR}/upload.tmp'):
+            os.makedirs(os.path.join(self.directory, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(self.directory, name), 'wb') as handle:
+                handle.write(BODY)
+        settings = override_settings(**PAGE_SETTINGS, MEDIA_ROOT=self.directory, PORTFOLIO_MEDIA_SENDFILE=None)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_whole_file(self):
+        response = self.client.get(f'/media/{self.addressed}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), BODY)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['ETag'], f'"{self.digest[:32]}.bin"')
+
+    def test_other_files_are_revalidated(self):
+        response = self.client.get('/media/docs/plain.txt')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        response.close()
+
+    def test_single_range(self):
+        response = self.client.get(f'/media/{self.addressed}', headers={'Range': 'bytes=10-19'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(BODY)}')
+        self.assertEqual(b''.join(response.streaming_content), BODY[10:20])
+        response = self.client.get(f'/media/{self.addressed}', headers={'Range': 'bytes=-4'})
+        self.assertEqual(b''.join(response.streaming_content), BODY[-4:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(f'/media/{self.addressed}', headers={'Range': f'bytes={len(BODY)}-'})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(BODY)}')
+
+    def test_stale_if_range_sends_the_whole_file(self):
+        response = self.client.get(
+            f'/media/{self.addressed}', headers={'Range': 'bytes=0-9', 'If-Range': '"other"'},
+        )
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_if_none_match(self):
+        etag = self.client.get('/media/docs/plain.txt')['ETag']
+        response = self.client.get('/media/docs/plain.txt', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_sendfile_headers(self):
+        with override_settings(PORTFOLIO_MEDIA_SENDFILE='x-sendfile'):
+            response = self.client.get(f'/media/{self.addressed}')
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.directory, self.addressed))
+        self.assertEqual(response.content, b'')
+        with override_settings(PORTFOLIO_MEDIA_SENDFILE='x-accel-redirect', PORTFOLIO_MEDIA_ACCEL_PREFIX='/internal/'):
+            response = self.client.get(f'/media/{self.addressed}')
+        self.assertEqual(response['X-Accel-Redirect'], f'/internal/{self.addressed}')
+
+    def test_spool_and_missing_files_are_not_served(self):
+        for path in (f'{INCOMING_DIR}/upload.tmp', 'docs/missing.txt', 'docs', '../etc/passwd'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(f'/media/{path}').status_code, 404)
+        self.assertEqual(self.client.post('/media/docs/plain.txt').status_code, 405)
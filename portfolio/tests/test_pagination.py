@@ -0,0 +1,82 @@
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import BlogPost, Project
+from ..pagination import BLOG_ORDERING, PROJECT_ORDERING, CursorPaginator, InvalidCursor
+from .utils import PAGE_SETTINGS, make_project
+
+
+@override_settings(**PAGE_SETTINGS)
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Ties on every ordering column but pk, to exercise the keyset's
+        # tie-breaking.
+        same_time = datetime(2024, 5, 1, tzinfo=timezone.utc)
+        for i in range(11):
+            make_project(f'Project {i}', featured=i % 4 == 0, order=i % 3, created_at=same_time)
+        for i in range(6):
+            make_project(f'Dated {i}', order=1, created_at=datetime(2023, 1, 1 + i, tzinfo=timezone.utc))
+
+    def _walk_forward(self, paginator, key=lambda obj: obj.pk):
+        pages = []
+        page = paginator.page()
+        pages.append([key(obj) for obj in page])
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            pages.append([key(obj) for obj in page])
+        return pages, page
+
+    def test_forward_pages_cover_the_ordering_once(self):
+        paginator = CursorPaginator(Project.objects.all(), 4, PROJECT_ORDERING)
+        pages, _ = self._walk_forward(paginator)
+        expected = list(Project.objects.order_by(*PROJECT_ORDERING).values_list('pk', flat=True))
+        self.assertEqual([pk for page in pages for pk in page], expected)
+        self.assertTrue(all(len(page) == 4 for page in pages[:-1]))
+
+    def test_previous_cursors_return_the_same_pages(self):
+        paginator = CursorPaginator(Project.objects.all(), 4, PROJECT_ORDERING)
+        pages, page = self._walk_forward(paginator)
+        backwards = [[obj.pk for obj in page]]
+        while page.has_previous():
+            page = paginator.page(page.previous_cursor)
+            backwards.append([obj.pk for obj in page])
+        self.assertEqual(backwards[::-1], pages)
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_values_queryset(self):
+        for i in range(5):
+            post = BlogPost.objects.create(title=f'Post {i}', slug=f'post-{i}', content='Text', published=True)
+            BlogPost.objects.filter(pk=post.pk).update(created_at=datetime(2024, 1, 1 + i % 2, tzinfo=timezone.utc))
+        queryset = BlogPost.objects.values('id', 'created_at', 'title')
+        paginator = CursorPaginator(queryset, 2, BLOG_ORDERING)
+        pages, _ = self._walk_forward(paginator, key=lambda row: row['id'])
+        ids = [row['id'] for row in queryset.order_by(*BLOG_ORDERING)]
+        self.assertEqual([pk for page in pages for pk in page], ids)
+
+    def test_invalid_cursor(self):
+        paginator = CursorPaginator(Project.objects.all(), 4, PROJECT_ORDERING)
+        with self.assertRaises(InvalidCursor):
+            paginator.page('not-a-cursor')
+        # A cursor signed for another ordering is rejected too.
+        other = CursorPaginator(Project.objects.all(), 4, ('-created_at', '-pk'))
+        with self.assertRaises(InvalidCursor):
+            paginator.page(other.page().next_cursor)
+        self.assertEqual(
+            [obj.pk for obj in paginator.get_page('not-a-cursor')],
+            [obj.pk for obj in paginator.page()],
+        )
+
+    def test_projects_listing_follows_cursor(self):
+        cache.clear()
+        response = self.client.get(reverse('portfolio:projects'))
+        page = response.context['projects']
+        self.assertTrue(page.has_next())
+        second = self.client.get(reverse('portfolio:projects'), {'cursor': page.next_cursor})
+        self.assertEqual(second.status_code, 200)
+        first_ids = {obj.pk for obj in page}
+        self.assertFalse(first_ids & {obj.pk for obj in second.context['projects']})
@@ -0,0 +1,90 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import BlogPost, Certification, Education, Experience, PersonalInfo, Project, Skill
+from .utils import PAGE_SETTINGS, make_project
+
+# View -> queries it makes on a cold cache, whatever the number of rows.
+# These include loading the site profile and seeding Last-Modified times.
+QUERIES = {
+    'portfolio:home': 7,
+    'portfolio:about': 8,
+    'portfolio:skills': 3,
+    'portfolio:projects': 7,
+    'portfolio:project_detail': 8,
+    'portfolio:blog': 4,
+    'portfolio:blog_detail': 6,
+    'portfolio:contact': 2,
+}
+# Detail pages validate their rows with one query, even on a cache hit.
+CACHED_QUERIES = {'portfolio:project_detail': 1, 'portfolio:blog_detail': 1}
+
+
+@override_settings(**PAGE_SETTINGS)
+class QueryCountTests(TestCase):
+    def _populate(self, size):
+        with self.captureOnCommitCallbacks(execute=True):
+            PersonalInfo.objects.get_or_create(
+                name='Ada', defaults={'title': 'Engineer', 'email': 'ada@example.com', 'about_me': 'About',
+                                      'summary': 'Summary', 'github': 'https://github.com/ada'},
+            )
+            start = Skill.objects.count()
+            skills = [
+                Skill.objects.create(name=f'Skill {i}', category='programming', proficiency=50)
+                for i in range(start, start + size)
+            ]
+            for i in range(size):
+                project = make_project(f'Project {start + i}', featured=i % 2 == 0)
+                project.technologies.set(skills[:i + 1])
+                experience = Experience.objects.create(
+                    company=f'Company {start + i}', position='Engineer', start_date=date(2020, 1, 1),
+                    description='Work',
+                )
+                experience.technologies_used.set(skills[:i + 1])
+                Education.objects.create(
+                    institution=f'School {start + i}', degree='BSc', field_of_study='CS',
+                    start_date=date(2010, 1, 1),
+                )
+                Certification.objects.create(
+                    name=f'Cert {start + i}', issuing_organization='Org', issue_date=date(2021, 1, 1),
+                )
+                BlogPost.objects.create(
+                    title=f'Post {start + i}', slug=f'post-{start + i}', content='shared words here',
+                    published=True,
+                )
+
+    def _args(self, name):
+        if name == 'portfolio:project_detail':
+            return [Project.objects.order_by('pk').first().pk]
+        if name == 'portfolio:blog_detail':
+            return [BlogPost.objects.order_by('pk').first().slug]
+        return []
+
+    def _assert_counts(self):
+        for name, expected in QUERIES.items():
+            with self.subTest(view=name):
+                # A cold page cache, so the view itself runs.
+                cache.clear()
+                with self.assertNumQueries(expected):
+                    response = self.client.get(reverse(name, args=self._args(name)))
+                self.assertEqual(response.status_code, 200)
+
+    def test_query_counts_do_not_grow_with_data(self):
+        self._populate(2)
+        self._assert_counts()
+        self._populate(10)
+        self._assert_counts()
+
+    def test_cached_pages_skip_the_view_queries(self):
+        self._populate(3)
+        for name in QUERIES:
+            if name == 'portfolio:contact':
+                continue
+            with self.subTest(view=name):
+                url = reverse(name, args=self._args(name))
+                self.client.get(url)
+                with self.assertNumQueries(CACHED_QUERIES.get(name, 0)):
+                    self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
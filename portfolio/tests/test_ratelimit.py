@@ -0,0 +1,78 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import ratelimit
+from .utils import PAGE_SETTINGS
+
+
+@override_settings(
+    **PAGE_SETTINGS,
+    PORTFOLIO_RATE_LIMIT={
+        'per_client': (2, 60),
+        'global': (100, 60),
+        'views': ['portfolio:contact', 'portfolio:contact_submit'],
+        'shared': False,
+    },
+)
+class RateLimitTests(TestCase):
+    def tearDown(self):
+        # Drop the rejections counted here instead of writing them later.
+        ratelimit.rejection_stats.take()
+
+    def test_sliding_window(self):
+        window = ratelimit.SlidingWindow(2, 60)
+        self.assertTrue(window.hit('a', now=0))
+        self.assertTrue(window.hit('a', now=1))
+        self.assertFalse(window.hit('a', now=2))
+        self.assertTrue(window.hit('b', now=2))
+        # Halfway through the next window, half of the previous one counts.
+        self.assertTrue(window.hit('a', now=90))
+        self.assertFalse(window.hit('a', now=91))
+        self.assertEqual(window.retry_after(91), 29)
+
+    def test_sliding_window_evicts_least_recently_used(self):
+        window = ratelimit.SlidingWindow(1, 60, max_keys=2)
+        window.hit('a', now=0)
+        window.hit('b', now=0)
+        window.hit('c', now=0)
+        self.assertEqual(len(window), 2)
+        self.assertTrue(window.hit('a', now=1))
+
+    def test_contact_submit_gets_json_429(self):
+        url = reverse('portfolio:contact_submit')
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, {}).status_code, 400)
+        response = self.client.post(url, {})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        retry_after = response.json()['retry_after']
+        self.assertEqual(response['Retry-After'], str(retry_after))
+        self.assertTrue(1 <= retry_after <= 60)
+
+    def test_contact_page_gets_plain_429_unless_json_is_asked_for(self):
+        url = reverse('portfolio:contact')
+        for _ in range(2):
+            self.client.post(url, {})
+        response = self.client.post(url, {})
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('Retry-After', response)
+        response = self.client.post(url, {}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('retry_after', response.json())
+
+    def test_limits_are_per_client_and_skip_safe_methods(self):
+        url = reverse('portfolio:contact_submit')
+        for _ in range(3):
+            self.client.post(url, {}, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(self.client.post(url, {}, REMOTE_ADDR='10.0.0.2').status_code, 400)
+        self.assertNotEqual(self.client.get(reverse('portfolio:contact'), REMOTE_ADDR='10.0.0.1').status_code, 429)
+
+    def test_rejections_are_counted(self):
+        url = reverse('portfolio:contact_submit')
+        ratelimit.rejection_stats.take()
+        for _ in range(4):
+            self.client.post(url, {})
+        counts = ratelimit.rejection_stats.take()
+        self.assertEqual(sum(counts.values()), 2)
+        self.assertEqual({key[1:] for key in counts}, {('portfolio:contact_submit', 'client')})
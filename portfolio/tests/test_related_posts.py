@@ -0,0 +1,116 @@
+from unittest import mock
+
+import numpy as np
+from django.core import serializers
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import related_posts
+from ..models import BlogPost, BlogPostTerms, RelatedPost
+from .utils import PAGE_SETTINGS
+
+TOPICS = {
+    'kafka': 'kafka consumer partition offset broker topic',
+    'django': 'django template queryset migration middleware view',
+    'numpy': 'numpy array vector matrix broadcast dtype',
+}
+
+
+@override_settings(**PAGE_SETTINGS)
+class RelatedPostsTests(TestCase):
+    def setUp(self):
+        # A new counter, so no corpus is kept from another test's rows.
+        cache.clear()
+
+    def _post(self, slug, topic, extra='', published=True):
+        with self.captureOnCommitCallbacks(execute=True):
+            return BlogPost.objects.create(
+                title=topic.title(), slug=slug, content=f'{TOPICS[topic]} {extra}', published=published,
+            )
+
+    def _related(self, post):
+        return list(RelatedPost.objects.filter(post=post).order_by('rank').values_list('related_id', flat=True))
+
+    def _index(self):
+        return list(RelatedPost.objects.order_by('post_id', 'rank').values_list('post_id', 'related_id', 'rank'))
+
+    def test_saves_refresh_neighbours(self):
+        first = self._post('first', 'kafka', 'replication')
+        second = self._post('second', 'kafka', 'replication lag')
+        third = self._post('third', 'django')
+        self.assertEqual(self._related(first), [second.pk])
+        self.assertEqual(self._related(second), [first.pk])
+        self.assertEqual(self._related(third), [])
+
+        # Rewritten as a Django post, first leaves second for third.
+        with self.captureOnCommitCallbacks(execute=True):
+            first.title = 'Django'
+            first.content = TOPICS['django']
+            first.save()
+        self.assertEqual(self._related(first), [third.pk])
+        self.assertEqual(self._related(third), [first.pk])
+        self.assertEqual(self._related(second), [])
+
+    def test_unpublish_and_delete_drop_the_post_everywhere(self):
+        posts = [self._post(f'post-{i}', 'numpy', f'extra{i}') for i in range(3)]
+        self.assertEqual(len(self._related(posts[0])), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            posts[1].published = False
+            posts[1].save()
+        self.assertEqual(self._related(posts[0]), [posts[2].pk])
+        self.assertEqual(self._related(posts[1]), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            posts[2].delete()
+        self.assertEqual(self._related(posts[0]), [])
+
+    def test_save_without_text_change_does_not_refresh(self):
+        post = self._post('post', 'kafka')
+        with mock.patch.object(related_posts, 'refresh') as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                post.save()
+                BlogPost.objects.get(pk=post.pk).save(update_fields=['updated_at'])
+        refresh.assert_not_called()
+
+    def test_fixture_loads_are_left_to_a_rebuild(self):
+        now = timezone.now()
+        data = serializers.serialize('json', [BlogPost(
+            pk=1000, title='Loaded', slug='loaded', content=TOPICS['kafka'], published=True,
+            created_at=now, updated_at=now,
+        )])
+        for obj in serializers.deserialize('json', data):
+            obj.save()
+        self.assertFalse(BlogPostTerms.objects.exists())
+        other = self._post('other', 'kafka')
+        self.assertEqual(self._related(other), [])
+        list(related_posts.rebuild())
+        self.assertEqual(self._related(other), [1000])
+
+    def test_incremental_refresh_matches_rebuild(self):
+        for i in range(12):
+            self._post(f'post-{i}', list(TOPICS)[i % 3], ' '.join(f'word{j}' for j in range(i % 4, 6)))
+        with self.captureOnCommitCallbacks(execute=True):
+            BlogPost.objects.get(slug='post-4').delete()
+            edited = BlogPost.objects.get(slug='post-5')
+            edited.content = TOPICS['kafka'] + ' word1 word2'
+            edited.save()
+        incremental = self._index()
+        list(related_posts.rebuild())
+        self.assertEqual(self._index(), incremental)
+
+    def test_search_is_exact_while_postings_are_complete(self):
+        terms = [{f'term{(i * 7 + j) % 400}': 1 + (i + j) % 3 for j in range(12)} for i in range(200)]
+        corpus = related_posts.Corpus(list(range(1, 201)), terms)
+        found = corpus.top_neighbours(range(200), top_n=5)
+        self.assertTrue(all(found.values()))
+        scores = corpus.scores(range(200)).toarray()
+        for row in range(200):
+            top = np.lexsort((np.arange(200), -scores[row]))[:5]
+            self.assertEqual([pk for pk, _ in found[row + 1]], [int(col) + 1 for col in top if scores[row, col] > 0])
+
+    def test_detail_page_lists_related_posts(self):
+        post = self._post('post', 'django')
+        other = self._post('other', 'django')
+        response = self.client.get(reverse('portfolio:blog_detail', args=[post.slug]))
+        self.assertEqual([p.pk for p in response.context['related_posts']], [other.pk])
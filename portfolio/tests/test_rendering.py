@@ -0,0 +1,76 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from .. import rendering
+from ..models import BlogPost, Project
+
+
+@mock.patch.object(rendering, 'markdown', None)
+class PlainRenderingTests(SimpleTestCase):
+    def test_paragraphs_are_escaped(self):
+        html = rendering.render('First <b>line</b>\r\n\r\nSecond')
+        self.assertEqual(html, '<p>First &lt;b&gt;line&lt;/b&gt;</p>\n\n<p>Second</p>')
+
+    def test_fenced_code_becomes_a_block(self):
+        with mock.patch.object(rendering, 'highlight', None):
+            html = rendering.render('Before\n\n```python\nx = 1 < 2\n```\n\nAfter')
+        self.assertEqual(html, (
+            '<p>Before</p>\n<pre><code class="language-python">x = 1 &lt; 2\n</code></pre>\n<p>After</p>'
+        ))
+
+    def test_summary_and_reading_time(self):
+        self.assertEqual(rendering.summary('<p>one <em>two</em></p>\n<p>three</p>', words=2), 'one two…')
+        self.assertEqual(rendering.reading_time(0), 1)
+        self.assertEqual(rendering.reading_time(201), 2)
+
+
+class StoredHtmlTests(TestCase):
+    def test_save_stores_rendered_fields(self):
+        post = BlogPost.objects.create(title='Post', slug='post', content='word ' * 401)
+        self.assertTrue(post.content_html.startswith('<p>word word'))
+        self.assertEqual(post.summary, rendering.summary(post.content_html))
+        self.assertEqual((post.word_count, post.reading_time), (401, 3))
+        post.refresh_from_db()
+        self.assertEqual((post.word_count, post.reading_time), (401, 3))
+
+    def test_excerpt_is_the_summary(self):
+        post = BlogPost.objects.create(title='Post', slug='post', content='Body text', excerpt='Short')
+        self.assertEqual(post.summary, 'Short')
+
+    def test_update_fields_rerender_only_when_the_body_changes(self):
+        post = BlogPost.objects.create(title='Post', slug='post', content='old')
+        with mock.patch.object(rendering, 'update_blog_post', wraps=rendering.update_blog_post) as update:
+            post.title = 'Renamed'
+            post.save(update_fields=['title'])
+            update.assert_not_called()
+            post.content = 'new body'
+            post.save(update_fields=['content'])
+            update.assert_called_once()
+        post.refresh_from_db()
+        self.assertIn('new body', post.content_html)
+        self.assertEqual(post.word_count, 2)
+
+    def test_project_description(self):
+        project = Project.objects.create(title='P', description='Some text', short_description='P')
+        self.assertIn('Some text', project.description_html)
+        self.assertEqual(project.word_count, 2)
+
+
+class RenderContentCommandTests(TestCase):
+    def test_fills_unrendered_rows_without_touching_updated_at(self):
+        BlogPost.objects.bulk_create([BlogPost(title='Loaded', slug='loaded', content='Loaded body')])
+        rendered = BlogPost.objects.create(title='Done', slug='done', content='Done body')
+        BlogPost.objects.filter(pk=rendered.pk).update(content_html='<p>kept</p>')
+        before = BlogPost.objects.get(slug='loaded').updated_at
+        out = StringIO()
+        call_command('render_content', stdout=out)
+        self.assertIn('Rendered 1 blog posts', out.getvalue())
+        loaded = BlogPost.objects.get(slug='loaded')
+        self.assertEqual(loaded.content_html, rendering.render('Loaded body'))
+        self.assertEqual(loaded.updated_at, before)
+        self.assertEqual(BlogPost.objects.get(slug='done').content_html, '<p>kept</p>')
+        call_command('render_content', '--all', stdout=out)
+        self.assertEqual(BlogPost.objects.get(slug='done').content_html, rendering.render('Done body'))
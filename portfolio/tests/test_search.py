@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.core import serializers
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import search
+from ..models import BlogPost
+from .utils import PAGE_SETTINGS
+
+
+@override_settings(**PAGE_SETTINGS)
+class BlogSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.title_hit = BlogPost.objects.create(
+            title='Kafka consumer groups', slug='title-hit', content='Partitions and offsets.', published=True,
+        )
+        cls.body_hit = BlogPost.objects.create(
+            title='Streaming notes', slug='body-hit', content='We moved the pipeline to Kafka last year.',
+            published=True,
+        )
+        cls.draft = BlogPost.objects.create(
+            title='Kafka draft', slug='draft', content='Kafka, unpublished.', published=False,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_title_hits_rank_first(self):
+        results = search.SearchResults('kafka')
+        self.assertEqual(results.count(), 2)
+        self.assertEqual([post.pk for post in results[0:10]], [self.title_hit.pk, self.body_hit.pk])
+        self.assertIn('<mark>', results[1].search_snippet)
+
+    def test_last_word_matches_as_prefix(self):
+        self.assertEqual(search.SearchResults('consum').count(), 1)
+
+    def test_search_operators_are_plain_text(self):
+        for query in ['kafka OR', '"kafka', 'NEAR(kafka', '*', '-']:
+            search.SearchResults(query)[0:10]
+
+    def test_blog_page_ranks_results(self):
+        response = self.client.get(reverse('portfolio:blog'), {'search': 'kafka'})
+        self.assertEqual([post.pk for post in response.context['posts']], [self.title_hit.pk, self.body_hit.pk])
+
+    def test_blog_page_falls_back_to_substring_search(self):
+        with mock.patch.object(search, 'is_available', return_value=False):
+            response = self.client.get(reverse('portfolio:blog'), {'search': 'kafka'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {post.pk for post in response.context['posts']},
+            {self.title_hit.pk, self.body_hit.pk},
+        )
+
+    def test_fixture_loads_are_left_to_a_rebuild(self):
+        now = timezone.now()
+        data = serializers.serialize('json', [BlogPost(
+            pk=1000, title='Loaded Kafka post', slug='loaded', content='From a fixture.', published=True,
+            created_at=now, updated_at=now,
+        )])
+        for obj in serializers.deserialize('json', data):
+            obj.save()
+        self.assertEqual(search.SearchResults('loaded').count(), 0)
+        search.rebuild_index()
+        self.assertEqual(search.SearchResults('loaded').count(), 1)
@@ -0,0 +1,83 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import similarity
+from ..models import ProjectSimilarity, Skill
+from .utils import PAGE_SETTINGS, make_project
+
+
+@override_settings(**PAGE_SETTINGS)
+class ProjectSimilarityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.skills = [
+            Skill.objects.create(name=name, category='programming', proficiency=50)
+            for name in ['Python', 'Django', 'Go', 'Rust']
+        ]
+        cls.projects = [make_project(f'Project {i}') for i in range(4)]
+
+    def _set(self, project, *indexes):
+        with self.captureOnCommitCallbacks(execute=True):
+            project.technologies.set([self.skills[i] for i in indexes])
+
+    def _neighbours(self, project):
+        return list(
+            ProjectSimilarity.objects.filter(project=project).order_by('rank').values_list('neighbour_id', 'score')
+        )
+
+    def test_neighbours_follow_technology_changes(self):
+        a, b, c, d = self.projects
+        self._set(a, 0, 1)
+        self._set(b, 0, 1)
+        self._set(c, 0, 2)
+        self._set(d, 3)
+        self.assertEqual(self._neighbours(a), [(b.pk, 1.0), (c.pk, 1 / 3)])
+        self.assertEqual(self._neighbours(c), [(a.pk, 1 / 3), (b.pk, 1 / 3)])
+        self.assertEqual(self._neighbours(d), [])
+
+        # d now shares Go with c; both lists change though only d was saved.
+        self._set(d, 2, 3)
+        self.assertIn((d.pk, 1 / 3), self._neighbours(c))
+        self.assertEqual(self._neighbours(d), [(c.pk, 1 / 3)])
+
+        # Clearing drops a from every list that had it.
+        with self.captureOnCommitCallbacks(execute=True):
+            a.technologies.clear()
+        self.assertEqual(self._neighbours(a), [])
+        self.assertNotIn(a.pk, [pk for pk, _ in self._neighbours(b)])
+
+    def test_reverse_side_and_skill_delete(self):
+        a, b, c, _ = self.projects
+        with self.captureOnCommitCallbacks(execute=True):
+            self.skills[0].projects.add(a, b, c)
+        self.assertEqual([pk for pk, _ in self._neighbours(a)], [b.pk, c.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.skills[0].delete()
+        self.assertFalse(ProjectSimilarity.objects.exists())
+
+    def test_project_delete_refills_lists(self):
+        a, b, c, _ = self.projects
+        for project in (a, b, c):
+            self._set(project, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            b.delete()
+        self.assertEqual(self._neighbours(a), [(c.pk, 1.0)])
+
+    def test_rebuild_matches_incremental_refresh(self):
+        for project, indexes in zip(self.projects, [(0, 1), (0,), (1, 2), (2, 3)]):
+            self._set(project, *indexes)
+        incremental = list(ProjectSimilarity.objects.values_list('project_id', 'neighbour_id', 'score', 'rank'))
+        ProjectSimilarity.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            list(similarity.rebuild(batch_size=2))
+        rebuilt = list(ProjectSimilarity.objects.values_list('project_id', 'neighbour_id', 'score', 'rank'))
+        self.assertEqual(rebuilt, incremental)
+
+    def test_detail_page_lists_neighbours(self):
+        a, b, _, _ = self.projects
+        self._set(a, 0)
+        self._set(b, 0)
+        cache.clear()
+        response = self.client.get(reverse('portfolio:project_detail', args=[a.pk]))
+        self.assertEqual([p.pk for p in response.context['related_projects']], [b.pk])
@@ -0,0 +1,47 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import site_profile
+from ..models import PersonalInfo
+from .utils import PAGE_SETTINGS
+
+
+@override_settings(**PAGE_SETTINGS)
+class SiteProfileTests(TransactionTestCase):
+    # Real commits: the PersonalInfo version is bumped when a save commits.
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(site_profile, '_current', (None, None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.info = PersonalInfo.objects.create(
+            name='Ada', title='Engineer', email='ada@example.com', about_me='About', summary='Summary',
+        )
+
+    def test_profile_is_kept_until_it_changes(self):
+        profile = site_profile.get()
+        self.assertEqual(profile.info.name, 'Ada')
+        self.assertEqual([link['name'] for link in profile.social_links], ['Email'])
+        with self.assertNumQueries(0):
+            self.assertIs(site_profile.get(), profile)
+
+    def test_profile_reloads_after_a_save(self):
+        profile = site_profile.get()
+        self.info.name = 'Ada Lovelace'
+        self.info.github = 'https://github.com/ada'
+        self.info.save()
+        reloaded = site_profile.get()
+        self.assertIsNot(reloaded, profile)
+        self.assertEqual(reloaded.info.name, 'Ada Lovelace')
+        self.assertEqual([link['name'] for link in reloaded.social_links], ['GitHub', 'Email'])
+        self.assertContains(self.client.get(reverse('portfolio:skills')), 'Ada Lovelace')
+
+    def test_profile_is_empty_after_a_delete(self):
+        self.assertTrue(site_profile.get())
+        self.info.delete()
+        self.assertFalse(site_profile.get())
+        self.assertEqual(site_profile.get().social_links, [])
@@ -0,0 +1,60 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+
+from .. import caching, snapshot
+from ..models import BlogPost
+from .utils import LOCMEM_CACHE
+
+
+class PublishTests(TransactionTestCase):
+    # publish() copies the database with the backup API, which waits for an
+    # open write transaction to end.
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        settings = override_settings(CACHES=LOCMEM_CACHE, PORTFOLIO_SNAPSHOT_DIR=str(self.directory))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+        BlogPost.objects.create(title='Post', slug='post', content='Body', published=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _snapshots(self):
+        return sorted(path.name for path in self.directory.glob(f'{snapshot.PREFIX}*'))
+
+    def test_publish_swaps_the_link(self):
+        self.assertIsNone(snapshot.current())
+        versions = caching.versions([BlogPost])
+        path = snapshot.publish()
+        self.assertEqual(snapshot.current(), path)
+        self.assertEqual(os.readlink(self.directory / snapshot.LINK_NAME), path.name)
+        self.assertNotEqual(caching.versions([BlogPost]), versions)
+
+        connection = sqlite3.connect(snapshot.uri(path), uri=True)
+        try:
+            self.assertEqual(
+                connection.execute(f'SELECT title FROM {BlogPost._meta.db_table}').fetchall(), [('Post',)],
+            )
+            self.assertEqual(connection.execute('PRAGMA journal_mode').fetchone(), ('delete',))
+        finally:
+            connection.close()
+
+        BlogPost.objects.update(title='Renamed')
+        newer = snapshot.publish()
+        self.assertEqual(snapshot.current(), newer)
+        self.assertEqual(self._snapshots(), sorted([path.name, newer.name]))
+        self.assertEqual(list(self.directory.glob('*.partial')), [])
+
+    def test_old_snapshots_are_pruned(self):
+        published = [snapshot.publish().name for _ in range(snapshot.KEEP + 3)]
+        # The current file and the KEEP before it, for connections still reading them.
+        self.assertEqual(self._snapshots(), published[-snapshot.KEEP - 1:])
+        self.assertEqual(snapshot.current().name, published[-1])
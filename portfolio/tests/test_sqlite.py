@@ -0,0 +1,42 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, override_settings
+
+
+class JournalModeTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _journal_mode(self, name):
+        """Journal mode of a new connection to ``name``, tuned on connect"""
+        connection = ConnectionHandler({
+            'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(self.directory / name)},
+        })['default']
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('CREATE TABLE IF NOT EXISTS t (id integer)')
+                cursor.execute('PRAGMA journal_mode')
+                return cursor.fetchone()[0]
+        finally:
+            connection.close()
+
+    @override_settings(DEBUG=False)
+    def test_production_databases_switch_to_wal(self):
+        self.assertEqual(self._journal_mode('site.sqlite3'), 'wal')
+
+    @override_settings(DEBUG=True)
+    def test_debug_keeps_the_journal_mode(self):
+        self.assertEqual(self._journal_mode('site.sqlite3'), 'delete')
+        self.assertFalse((self.directory / 'site.sqlite3-wal').exists())
+
+    @override_settings(DEBUG=False)
+    def test_the_committed_database_keeps_the_journal_mode(self):
+        with override_settings(BASE_DIR=self.directory):
+            self.assertEqual(self._journal_mode('db.sqlite3'), 'delete')
+        self.assertFalse((self.directory / 'db.sqlite3-wal').exists())
@@ -0,0 +1,100 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import SimpleTestCase
+from PIL import Image, PngImagePlugin
+
+from ..storage import EXIF_ORIENTATION, INCOMING_DIR, ContentAddressedStorage, is_content_addressed
+
+
+def image_bytes(image_format, size=(40, 20), **options):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (10, 120, 200)).save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+def exif(orientation=1):
+    data = Image.Exif()
+    data[EXIF_ORIENTATION] = orientation
+    data[0x010F] = 'Camera maker'
+    return data
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.directory, max_dimension=100)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _read(self, name):
+        with self.storage.open(name, 'rb') as handle:
+            return handle.read()
+
+    def test_names_are_the_hash_of_the_content(self):
+        name = self.storage.save('docs/cv.pdf', ContentFile(b'%PDF-1.4 resume'))
+        digest = hashlib.sha256(b'%PDF-1.4 resume').hexdigest()
+        self.assertEqual(name, f'docs/{digest[:2]}/{digest[:32]}.pdf')
+        self.assertTrue(is_content_addressed(name))
+
+    def test_identical_uploads_are_stored_once(self):
+        first = self.storage.save('blog/a.txt', ContentFile(b'same'))
+        second = self.storage.save('blog/b.txt', ContentFile(b'same'))
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.storage.listdir(os.path.dirname(first))[1]), 1)
+
+    def test_jpeg_metadata_is_stripped_without_reencoding(self):
+        original = image_bytes('JPEG', exif=exif())
+        name = self.storage.save('projects/photo.jpeg', ContentFile(original))
+        stored = self._read(name)
+        digest = hashlib.sha256(stored).hexdigest()
+        # Named after the stripped bytes, with the canonical extension.
+        self.assertEqual(name, f'projects/{digest[:2]}/{digest[:32]}.jpg')
+        self.assertLess(len(stored), len(original))
+        with Image.open(io.BytesIO(stored)) as image:
+            self.assertEqual(dict(image.getexif()), {})
+            self.assertEqual(image.size, (40, 20))
+        # Only the EXIF segment is gone: the scan data is byte for byte the same.
+        self.assertTrue(original.endswith(stored[stored.index(b'\xff\xda'):]))
+
+    def test_png_text_chunks_are_stripped(self):
+        info = PngImagePlugin.PngInfo()
+        info.add_text('Comment', 'private')
+        name = self.storage.save('projects/logo.png', ContentFile(image_bytes('PNG', pnginfo=info)))
+        stored = self._read(name)
+        self.assertNotIn(b'tEXt', stored)
+        self.assertNotIn(b'private', stored)
+        with Image.open(io.BytesIO(stored)) as image:
+            image.load()
+
+    def test_oversized_and_rotated_images_are_reencoded_upright(self):
+        name = self.storage.save('projects/big.png', ContentFile(image_bytes('PNG', size=(400, 100))))
+        with Image.open(io.BytesIO(self._read(name))) as image:
+            self.assertEqual(image.size, (100, 25))
+        # Orientation 6: stored landscape, shown portrait.
+        name = self.storage.save('projects/turned.jpg', ContentFile(image_bytes('JPEG', exif=exif(6))))
+        with Image.open(io.BytesIO(self._read(name))) as image:
+            self.assertEqual(image.size, (20, 40))
+            self.assertNotIn(EXIF_ORIENTATION, image.getexif())
+
+    def test_temporary_uploads_are_moved(self):
+        upload = TemporaryUploadedFile('notes.txt', 'text/plain', 5, None)
+        upload.write(b'notes')
+        upload.flush()
+        path = upload.temporary_file_path()
+        name = self.storage.save('notes.txt', upload)
+        self.assertEqual(self._read(name), b'notes')
+        self.assertFalse(os.path.exists(path))
+        # As the upload handler does once the request is done.
+        upload.close()
+
+    def test_nothing_is_left_in_the_spool(self):
+        self.storage.save('projects/photo.jpg', ContentFile(image_bytes('JPEG', exif=exif())))
+        self.storage.save('docs/a.txt', ContentFile(b'a'))
+        self.assertEqual(os.listdir(self.storage.path(INCOMING_DIR)), [])
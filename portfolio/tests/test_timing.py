@@ -0,0 +1,86 @@
+import json
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..middleware import TimingStore, timing_store
+from ..models import Skill
+from .utils import PAGE_SETTINGS
+
+TIMED_MIDDLEWARE = [*settings.MIDDLEWARE[:2], 'portfolio.middleware.RequestTimingMiddleware', *settings.MIDDLEWARE[2:]]
+
+
+class TimingStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.store = TimingStore()
+        # Written by the tests themselves rather than a timer.
+        self.store.flush_interval = 3600
+
+    def _sample(self, total, queries=2):
+        return {'total': total, 'view': total / 2, 'db': total / 4, 'template': total / 8, 'queries': queries}
+
+    def test_percentiles_are_within_the_bucket_error(self):
+        for total in range(1, 101):
+            self.store.add('portfolio:home', self._sample(total))
+        rows, workers = self.store.summary()
+        self.assertEqual(workers, 1)
+        [row] = rows
+        self.assertEqual(row['url_name'], 'portfolio:home')
+        self.assertEqual(row['requests'], 100)
+        for percent, exact in ((50, 50), (90, 90), (99, 99)):
+            self.assertAlmostEqual(row[f'total_p{percent}'], exact, delta=exact * 0.05)
+        self.assertEqual(row['queries_p50'], 2)
+
+    def test_workers_are_added_up(self):
+        other = TimingStore()
+        other.flush_interval = 3600
+        self.store.add('portfolio:home', self._sample(10, queries=1))
+        other.add('portfolio:home', self._sample(10, queries=3))
+        # Two processes, as far as the cache can tell.
+        with mock.patch.object(TimingStore, 'worker', new_callable=mock.PropertyMock, return_value='other:1'):
+            other.flush()
+        rows, workers = self.store.summary()
+        self.assertEqual(workers, 2)
+        self.assertEqual(rows[0]['requests'], 2)
+        self.assertEqual((rows[0]['queries_p50'], rows[0]['queries_p99']), (1, 3))
+
+    def test_clear_starts_over(self):
+        self.store.add('portfolio:home', self._sample(10))
+        self.store.flush()
+        self.store.clear()
+        self.assertEqual(self.store.summary(), ([], 1))
+
+
+@override_settings(**PAGE_SETTINGS, MIDDLEWARE=TIMED_MIDDLEWARE, PORTFOLIO_REQUEST_TIMING=True)
+class RequestTimingMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        timing_store.clear()
+        Skill.objects.create(name='Python', category='programming', proficiency=90)
+
+    def test_server_timing_header_and_log(self):
+        with self.assertLogs('portfolio.timing', 'INFO') as logs:
+            response = self.client.get(reverse('portfolio:skills'))
+        metrics = [part.split(';')[0].strip() for part in response['Server-Timing'].split(',')]
+        self.assertEqual(metrics, ['db', 'tpl', 'view', 'total'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['url_name'], 'portfolio:skills')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertIn(f'desc="{record["queries"]} queries"', response['Server-Timing'])
+        self.assertLessEqual(len(record['slow_queries']), 3)
+
+    def test_panel_is_staff_only(self):
+        url = reverse('portfolio:timing_panel')
+        with self.assertLogs('portfolio.timing', 'INFO'):
+            self.assertEqual(self.client.get(url).status_code, 302)
+            self.client.force_login(User.objects.create_user('staff', is_staff=True))
+            self.client.get(reverse('portfolio:skills'))
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'portfolio:skills')
@@ -0,0 +1,16 @@
+from ..models import Project
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+# Page tests use a cache of their own and don't start the contact queue
+# drainer, which would work on the real spool directory.
+PAGE_SETTINGS = {'CACHES': LOCMEM_CACHE, 'PORTFOLIO_CONTACT_WORKER': True}
+
+
+def make_project(title, featured=False, order=0, created_at=None):
+    project = Project.objects.create(
+        title=title, description=f'{title} description', short_description=title,
+        featured=featured, order=order,
+    )
+    if created_at is not None:
+        Project.objects.filter(pk=project.pk).update(created_at=created_at)
+    return project
@@ -9,8 +9,10 @@ urlpatterns = [
     path('projects/', views.projects, name='projects'),
     path('project/<int:project_id>/', views.project_detail, name='project_detail'),
     path('contact/', views.contact, name='contact'),
+    path('contact/submit/', views.contact_submit, name='contact_submit'),
     path('blog/', views.blog, name='blog'),
     path('blog/<slug:slug>/', views.blog_detail, name='blog_detail'),
     path('skills/', views.skills, name='skills'),
+    path('_timing/', views.timing_panel, name='timing_panel'),
 ]
 
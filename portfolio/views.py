@@ -1,29 +1,54 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db.models import Count, Exists, OuterRef, Q
+from django.http import JsonResponse
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import require_POST
 from .models import (
-    PersonalInfo, Skill, Project, Experience, 
+    Skill, Project, Experience, 
     Education, Certification, Contact, BlogPost
 )
 from .forms import ContactForm
+from . import contact_queue, search
+from .caching import cache_page
+from .db_router import replica_reads
+from .conditional import (
+    blog_post_validators, conditional_page, contact_validators, page_validators, project_validators,
+)
+from .middleware import timing_store
+from .facets import ProjectFacets
+from .pagination import BLOG_ORDERING, PROJECT_ORDERING, paginate
+
+# Raw and rendered bodies; listings show the stored summary instead.
+PROJECT_BODY = ('description', 'description_html')
+BLOG_POST_BODY = ('content', 'content_html')
+
+PROJECTS_PER_PAGE = 9
+BLOG_POSTS_PER_PAGE = 6
 
+def with_technologies(projects):
+    """Load project technologies in bulk and annotate how many there are"""
+    return projects.prefetch_related('technologies').annotate(
+        tech_count=Count('technologies', distinct=True)
+    )
+
+@replica_reads
+@conditional_page(page_validators('page:home'))
+@cache_page('page:home')
 def home(request):
     """Home page view with all portfolio information"""
-    try:
-        personal_info = PersonalInfo.objects.first()
-    except PersonalInfo.DoesNotExist:
-        personal_info = None
-    
     skills = Skill.objects.all()
-    featured_projects = Project.objects.filter(featured=True)[:3]
-    recent_projects = Project.objects.exclude(featured=True)[:6]
+    featured_projects = with_technologies(Project.objects.filter(featured=True).defer(*PROJECT_BODY))[:3]
+    recent_projects = with_technologies(Project.objects.exclude(featured=True).defer(*PROJECT_BODY))[:6]
     experiences = Experience.objects.all()
     education = Education.objects.all()
     certifications = Certification.objects.all()
     
     context = {
-        'personal_info': personal_info,
         'skills': skills,
         'featured_projects': featured_projects,
         'recent_projects': recent_projects,
@@ -33,20 +58,17 @@ def home(request):
     }
     return render(request, 'portfolio/home.html', context)
 
+@replica_reads
+@conditional_page(page_validators('page:about'))
+@cache_page('page:about')
 def about(request):
     """About page view"""
-    try:
-        personal_info = PersonalInfo.objects.first()
-    except PersonalInfo.DoesNotExist:
-        personal_info = None
-    
     skills = Skill.objects.all()
-    experiences = Experience.objects.all()
+    experiences = Experience.objects.prefetch_related('technologies_used')
     education = Education.objects.all()
     certifications = Certification.objects.all()
     
     context = {
-        'personal_info': personal_info,
         'skills': skills,
         'experiences': experiences,
         'education': education,
@@ -54,38 +76,55 @@ def about(request):
     }
     return render(request, 'portfolio/about.html', context)
 
+@replica_reads
+@conditional_page(page_validators('page:projects'))
+@cache_page('page:projects')
 def projects(request):
     """Projects listing page"""
-    projects_list = Project.objects.all()
+    projects_list = Project.objects.defer(*PROJECT_BODY).prefetch_related('technologies')
     
     # Search functionality
     search_query = request.GET.get('search', '')
     if search_query:
+        # EXISTS instead of a join so no DISTINCT is needed
         projects_list = projects_list.filter(
             Q(title__icontains=search_query) |
             Q(description__icontains=search_query) |
-            Q(technologies__name__icontains=search_query)
-        ).distinct()
+            Exists(Project.technologies.through.objects.filter(
+                project_id=OuterRef('pk'), skill__name__icontains=search_query,
+            ))
+        )
+    
+    # Facets (technology, skill category, featured, year)
+    facets = ProjectFacets(request.GET)
+    facet_counts = facets.counts(projects_list)
+    projects_list = facets.filter(projects_list)
     
-    # Pagination
-    paginator = Paginator(projects_list, 9)
-    page_number = request.GET.get('page')
-    projects_page = paginator.get_page(page_number)
+    # Pagination: cursor pages, or numbered pages for old ?page= links. The
+    # facet counts query gives the total.
+    total = facet_counts['total']
+    projects_page = paginate(request, projects_list, PROJECTS_PER_PAGE, PROJECT_ORDERING, count=total)
     
     context = {
         'projects': projects_page,
         'search_query': search_query,
+        'facets': facets,
+        'facet_counts': facet_counts,
+        'query_params': facets.querystring(),
     }
     return render(request, 'portfolio/projects.html', context)
 
+@replica_reads
+@conditional_page(project_validators)
+@cache_page('page:project_detail')
 def project_detail(request, project_id):
     """Individual project detail page"""
-    project = get_object_or_404(Project, id=project_id)
+    project = get_object_or_404(with_technologies(Project.objects.defer('description')), id=project_id)
     
-    # Get related projects (same technologies)
-    related_projects = Project.objects.filter(
-        technologies__in=project.technologies.all()
-    ).exclude(id=project.id).distinct()[:3]
+    # Get related projects from the precomputed similarity index
+    related_projects = with_technologies(Project.objects.filter(
+        neighbour_of__project=project
+    ).defer(*PROJECT_BODY)).order_by('neighbour_of__rank')[:3]
     
     context = {
         'project': project,
@@ -93,45 +132,54 @@ def project_detail(request, project_id):
     }
     return render(request, 'portfolio/project_detail.html', context)
 
+@conditional_page(contact_validators, vary=('Cookie',))
 def contact(request):
     """Contact page with form handling"""
     if request.method == 'POST':
         form = ContactForm(request.POST)
         if form.is_valid():
-            form.save()
+            contact_queue.enqueue(form.cleaned_data)
             messages.success(request, 'Thank you for your message! I will get back to you soon.')
             return redirect('portfolio:contact')  # Changed from 'contact' to 'portfolio:contact'
     else:
         form = ContactForm()
     
-    try:
-        personal_info = PersonalInfo.objects.first()
-    except PersonalInfo.DoesNotExist:
-        personal_info = None
-    
     context = {
         'form': form,
-        'personal_info': personal_info,
     }
     return render(request, 'portfolio/contact.html', context)
 
+@require_POST
+async def contact_submit(request):
+    """Queue a contact form submission and answer with JSON"""
+    form = ContactForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+    await sync_to_async(contact_queue.enqueue, thread_sensitive=False)(form.cleaned_data)
+    return JsonResponse({'status': 'queued'}, status=202)
+
+@replica_reads
+@conditional_page(page_validators('page:blog'))
+@cache_page('page:blog')
 def blog(request):
     """Blog listing page"""
-    posts = BlogPost.objects.filter(published=True)
+    posts = BlogPost.objects.filter(published=True).defer(*BLOG_POST_BODY)
     
     # Search functionality
     search_query = request.GET.get('search', '')
-    if search_query:
-        posts = posts.filter(
-            Q(title__icontains=search_query) |
-            Q(content__icontains=search_query) |
-            Q(excerpt__icontains=search_query)
-        )
-    
-    # Pagination
-    paginator = Paginator(posts, 6)
-    page_number = request.GET.get('page')
-    posts_page = paginator.get_page(page_number)
+    if search_query and search.is_available():
+        # Ranked full-text search; pages are fetched from the index lazily.
+        # Results are ordered by rank, so they keep numbered pages.
+        paginator = Paginator(search.SearchResults(search_query), BLOG_POSTS_PER_PAGE)
+        posts_page = paginator.get_page(request.GET.get('page'))
+    else:
+        if search_query:
+            posts = posts.filter(
+                Q(title__icontains=search_query) |
+                Q(content__icontains=search_query) |
+                Q(excerpt__icontains=search_query)
+            )
+        posts_page = paginate(request, posts, BLOG_POSTS_PER_PAGE, BLOG_ORDERING)
     
     context = {
         'posts': posts_page,
@@ -139,12 +187,17 @@ def blog(request):
     }
     return render(request, 'portfolio/blog.html', context)
 
+@replica_reads
+@conditional_page(blog_post_validators)
+@cache_page('page:blog_detail')
 def blog_detail(request, slug):
     """Individual blog post detail page"""
-    post = get_object_or_404(BlogPost, slug=slug, published=True)
+    post = get_object_or_404(BlogPost.objects.defer('content'), slug=slug, published=True)
     
-    # Get related posts
-    related_posts = BlogPost.objects.filter(published=True).exclude(id=post.id)[:3]
+    # Get related posts from the precomputed content-similarity index
+    related_posts = BlogPost.objects.filter(
+        related_to_entries__post=post, published=True
+    ).defer(*BLOG_POST_BODY).order_by('related_to_entries__rank')[:3]
     
     context = {
         'post': post,
@@ -152,19 +205,37 @@ def blog_detail(request, slug):
     }
     return render(request, 'portfolio/blog_detail.html', context)
 
+@replica_reads
+@conditional_page(page_validators('page:skills'))
+@cache_page('page:skills')
 def skills(request):
     """Skills page with detailed skill information"""
-    skills = Skill.objects.all()
-    
-    # Group skills by category
-    skill_categories = {}
-    for skill in skills:
-        category = skill.get_category_display()
-        if category not in skill_categories:
-            skill_categories[category] = []
-        skill_categories[category].append(skill)
+    def group_by_category():
+        skill_categories = {}
+        for skill in Skill.objects.all():
+            category = skill.get_category_display()
+            if category not in skill_categories:
+                skill_categories[category] = []
+            skill_categories[category].append(skill)
+        return skill_categories
     
     context = {
-        'skill_categories': skill_categories,
+        # Grouped lazily so a cached skills grid costs no query
+        'skill_categories': SimpleLazyObject(group_by_category),
     }
     return render(request, 'portfolio/skills.html', context)
+
+@staff_member_required
+def timing_panel(request):
+    """Staff-only request timing percentiles per URL name"""
+    if request.method == 'POST':
+        timing_store.clear()
+        return redirect('portfolio:timing_panel')
+    
+    rows, workers = timing_store.summary()
+    context = {
+        'timing_enabled': getattr(settings, 'PORTFOLIO_REQUEST_TIMING', False),
+        'rows': rows,
+        'workers': workers,
+    }
+    return render(request, 'portfolio/timing_panel.html', context)
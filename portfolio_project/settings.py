@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 from pathlib import Path
 import os
 
+import dj_database_url
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -50,6 +52,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add this line
+    'portfolio.ratelimit.RateLimitMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -58,6 +61,13 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request SQL/template/view timing (Server-Timing header, JSON log and
+# the staff panel at /_timing/). Off by default; when off the middleware is
+# not installed at all.
+PORTFOLIO_REQUEST_TIMING = os.environ.get('REQUEST_TIMING', 'False') == 'True'
+if PORTFOLIO_REQUEST_TIMING:
+    MIDDLEWARE.insert(2, 'portfolio.middleware.RequestTimingMiddleware')
+
 ROOT_URLCONF = 'portfolio_project.urls'
 
 TEMPLATES = [
@@ -71,6 +81,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'portfolio.site_profile.context_processor',
             ],
         },
     },
@@ -82,11 +93,60 @@ WSGI_APPLICATION = 'portfolio_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# DATABASE_URL picks the primary (SQLite in BASE_DIR by default) and
+# REPLICA_DATABASE_URL an optional read replica, which public pages read
+# from (see portfolio/db_router.py). Connections are kept for
+# DB_CONN_MAX_AGE seconds and checked before reuse.
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '600'))
+
 DATABASES = {
-    'default': {
+    'default': dj_database_url.config(
+        default=f'sqlite:///{BASE_DIR / "db.sqlite3"}',
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=True,
+    ),
+}
+if os.environ.get('REPLICA_DATABASE_URL'):
+    DATABASES['replica'] = dj_database_url.parse(
+        os.environ['REPLICA_DATABASE_URL'],
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=True,
+        test_options={'MIRROR': 'default'},
+    )
+
+# Publish mode: with SNAPSHOT_DIR set, public pages read an immutable
+# snapshot of the SQLite database published there by
+# `manage.py publish_snapshot` and after admin saves (see
+# portfolio/snapshot.py).
+PORTFOLIO_SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', '')
+if PORTFOLIO_SNAPSHOT_DIR:
+    DATABASES['snapshot'] = {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': f'file:{os.path.join(PORTFOLIO_SNAPSHOT_DIR, "current.sqlite3")}?mode=ro&immutable=1',
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['portfolio.db_router.ReplicaRouter']
+
+# WAL journaling, a busy timeout and larger caches on every SQLite
+# connection, for several gunicorn workers sharing the file (see
+# portfolio/sqlite.py).
+PORTFOLIO_SQLITE_TUNING = os.environ.get('SQLITE_TUNING', 'True') == 'True'
+
+# Seconds after a write during which every read goes to the primary, so it
+# is not answered from a replica that has not caught up yet.
+PORTFOLIO_REPLICA_LAG = int(os.environ.get('REPLICA_LAG_SECONDS', '10'))
+
+# One cache for every worker on the host, in a SQLite file (see
+# portfolio/cache_backends.py), so cached pages and model versions are
+# shared. CACHE_LOCATION moves the file.
+CACHES = {
+    'default': {
+        'BACKEND': 'portfolio.cache_backends.SQLiteCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / 'var' / 'cache.sqlite3')),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
 
 
@@ -130,9 +190,39 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# `manage.py build_assets` writes vendored libraries and minified bundles to
+# PORTFOLIO_BUILD_DIR/static (see portfolio/assets.py); run it before
+# collectstatic. Without it, pages link the unbundled files and CDNs.
+PORTFOLIO_BUILD_DIR = BASE_DIR / 'build'
+if (PORTFOLIO_BUILD_DIR / 'static').is_dir():
+    STATICFILES_DIRS.insert(0, PORTFOLIO_BUILD_DIR / 'static')
+# `manage.py export_site` renders the public pages here (see
+# portfolio/export.py). With SERVE_STATIC_EXPORT=True the WSGI application
+# serves them directly, so re-export after editing content.
+PORTFOLIO_EXPORT_DIR = PORTFOLIO_BUILD_DIR / 'site'
+PORTFOLIO_SERVE_EXPORT = os.environ.get('SERVE_STATIC_EXPORT', 'False') == 'True'
+# Font Awesome classes to keep besides those found in templates, scripts and
+# skill icons, e.g. for icons you plan to enter in the admin.
+PORTFOLIO_EXTRA_ICONS = []
+
+# Uploads are stored under a hash of their content; see portfolio/storage.py.
+# STORAGES replaces the older STATICFILES_STORAGE setting, which cannot be
+# combined with it.
+STORAGES = {
+    'default': {
+        'BACKEND': 'portfolio.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Longest edge, in pixels, that uploaded images are shrunk to
+PORTFOLIO_MEDIA_MAX_DIMENSION = int(os.environ.get('MEDIA_MAX_DIMENSION', '4096'))
+
 # Add this for static files in production
 if not DEBUG:
-    STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+    STORAGES['staticfiles']['BACKEND'] = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
     # Remove SSL redirect for now
     # SECURE_SSL_REDIRECT = True
     SECURE_HSTS_SECONDS = 31536000
@@ -146,10 +236,69 @@ if not DEBUG:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Hand media transfers to the fronting web server: 'x-sendfile' (Apache,
+# lighttpd) or 'x-accel-redirect' (nginx, with an internal location at
+# PORTFOLIO_MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT). Unset, Django streams them.
+PORTFOLIO_MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE') or None
+PORTFOLIO_MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+# Browser cache lifetime, in seconds, for media that is not a content-hashed
+# upload (image derivatives and manifests included)
+PORTFOLIO_MEDIA_MAX_AGE = 60 * 60
+
+# Limits for form posts, as (requests, window in seconds); see
+# portfolio/ratelimit.py. RATE_LIMIT_SHARED=True counts in the cache so all
+# workers share one limit, which needs a cache that workers share.
+PORTFOLIO_RATE_LIMIT = {
+    'per_client': (int(os.environ.get('RATE_LIMIT_PER_CLIENT', '5')), 60),
+    'global': (int(os.environ.get('RATE_LIMIT_GLOBAL', '100')), 60),
+    'views': ['portfolio:contact', 'portfolio:contact_submit', 'admin:login'],
+    'shared': os.environ.get('RATE_LIMIT_SHARED', 'False') == 'True',
+    'proxies': int(os.environ.get('RATE_LIMIT_PROXIES', '0')),
+}
+
+# Contact form submissions are queued here and saved from a background
+# thread of each web process; see portfolio/contact_queue.py. With
+# CONTACT_QUEUE_WORKER=True they are left to
+# `manage.py process_contact_queue --loop` instead, which must share the
+# directory with the web server.
+PORTFOLIO_CONTACT_QUEUE_DIR = Path(os.environ.get('CONTACT_QUEUE_DIR', BASE_DIR / 'var' / 'contact_queue'))
+PORTFOLIO_CONTACT_WORKER = os.environ.get('CONTACT_QUEUE_WORKER', 'False') == 'True'
+# Who gets notified of new messages; defaults to the PersonalInfo email.
+PORTFOLIO_CONTACT_NOTIFY = [
+    address.strip() for address in os.environ.get('CONTACT_NOTIFY_EMAIL', '').split(',') if address.strip()
+]
+
+# Email
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'False') == 'True'
+EMAIL_TIMEOUT = 30
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+
 # Crispy Forms
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# Logging
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'portfolio': {
+            'handlers': ['console'],
+            'level': os.environ.get('PORTFOLIO_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'portfolio_project.settings')
 
 application = get_wsgi_application()
+
+# Serve pages written by `manage.py export_site` without going through Django.
+from django.conf import settings  # noqa: E402
+
+if settings.PORTFOLIO_SERVE_EXPORT:
+    from portfolio.export import StaticPages
+
+    application = StaticPages(application, settings.PORTFOLIO_EXPORT_DIR)
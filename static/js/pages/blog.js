@@ -0,0 +1,25 @@
+// Initialize blog search functionality
+document.addEventListener('DOMContentLoaded', function() {
+    const searchInput = document.getElementById('blog-search');
+    const blogCards = document.querySelectorAll('.blog-card');
+    
+    if (searchInput) {
+        searchInput.addEventListener('input', function() {
+            const searchTerm = this.value.toLowerCase();
+            
+            blogCards.forEach(card => {
+                const title = card.querySelector('.card-title').textContent.toLowerCase();
+                const excerpt = card.querySelector('.card-text').textContent.toLowerCase();
+                
+                const matches = title.includes(searchTerm) || excerpt.includes(searchTerm);
+                
+                if (matches) {
+                    card.style.display = 'block';
+                    card.classList.add('animate-fade-in-up');
+                } else {
+                    card.style.display = 'none';
+                }
+            });
+        });
+    }
+});
@@ -0,0 +1,61 @@
+// Send the form in the background; fall back to a normal submit on network errors.
+document.addEventListener('DOMContentLoaded', function() {
+    const form = document.getElementById('contact-form');
+    if (!form || !form.dataset.submitUrl || !window.fetch) {
+        return;
+    }
+
+    function showAlert(kind, text) {
+        const alert = document.createElement('div');
+        alert.className = 'alert alert-' + kind + ' alert-dismissible fade show';
+        alert.setAttribute('role', 'alert');
+        alert.textContent = text;
+        const close = document.createElement('button');
+        close.type = 'button';
+        close.className = 'btn-close';
+        close.setAttribute('data-bs-dismiss', 'alert');
+        alert.appendChild(close);
+        form.parentNode.insertBefore(alert, form);
+    }
+
+    form.addEventListener('submit', function(event) {
+        event.preventDefault();
+        const button = form.querySelector('button[type="submit"]');
+        button.disabled = true;
+        form.querySelectorAll('.is-invalid').forEach(field => field.classList.remove('is-invalid'));
+
+        fetch(form.dataset.submitUrl, {
+            method: 'POST',
+            body: new FormData(form),
+            headers: {'X-Requested-With': 'XMLHttpRequest', 'Accept': 'application/json'},
+        }).then(function(response) {
+            return response.json().catch(function() {
+                return {};
+            }).then(function(data) {
+                if (response.status === 202) {
+                    form.reset();
+                    showAlert('success', 'Thank you for your message! I will get back to you soon.');
+                } else if (response.status === 400) {
+                    Object.keys(data.errors || {}).forEach(function(name) {
+                        const field = form.elements[name];
+                        if (field) {
+                            field.classList.add('is-invalid');
+                        }
+                    });
+                    showAlert('danger', 'Please correct the highlighted fields.');
+                } else if (response.status === 429) {
+                    const wait = data.retry_after || response.headers.get('Retry-After');
+                    showAlert('warning', 'Too many messages were sent just now. ' +
+                        (wait ? 'Please try again in ' + wait + ' seconds.' : 'Please try again later.'));
+                } else {
+                    showAlert('danger', 'Your message could not be sent. Please try again later.');
+                }
+            });
+        }, function() {
+            // Network error: the browser may still get through with a normal submit.
+            form.submit();
+        }).finally(function() {
+            button.disabled = false;
+        });
+    });
+});
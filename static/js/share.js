@@ -0,0 +1,59 @@
+// Share buttons of the blog post and project pages. The title, description
+// and copy confirmation come from data-share-* attributes on .share-buttons.
+function shareData() {
+    return document.querySelector('.share-buttons').dataset;
+}
+
+function shareItem(platform) {
+    const url = window.location.href;
+    const title = shareData().shareTitle;
+    const description = shareData().shareDescription;
+    
+    let shareUrl = '';
+    
+    switch(platform) {
+        case 'linkedin':
+            shareUrl = `https://www.linkedin.com/sharing/share-offsite/?url=${encodeURIComponent(url)}&title=${encodeURIComponent(title)}&summary=${encodeURIComponent(description)}`;
+            break;
+        case 'twitter':
+            shareUrl = `https://twitter.com/intent/tweet?url=${encodeURIComponent(url)}&text=${encodeURIComponent(title + ' - ' + description)}`;
+            break;
+    }
+    
+    if (shareUrl) {
+        window.open(shareUrl, '_blank', 'width=600,height=400');
+    }
+}
+
+// Copy the page link to clipboard
+function copyShareLink() {
+    const url = window.location.href;
+    
+    navigator.clipboard.writeText(url).then(function() {
+        // Show success message
+        showNotification(shareData().shareCopied, 'success');
+    }).catch(function(err) {
+        console.error('Could not copy text: ', err);
+        showNotification('Failed to copy link', 'error');
+    });
+}
+
+// Notification function
+function showNotification(message, type = 'info') {
+    const notification = document.createElement('div');
+    notification.className = `alert alert-${type === 'success' ? 'success' : type === 'error' ? 'danger' : 'info'} alert-dismissible fade show position-fixed`;
+    notification.style.cssText = 'top: 20px; right: 20px; z-index: 9999; min-width: 300px;';
+    notification.innerHTML = `
+        ${message}
+        <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+    `;
+    
+    document.body.appendChild(notification);
+    
+    // Auto remove after 3 seconds
+    setTimeout(() => {
+        if (notification.parentNode) {
+            notification.remove();
+        }
+    }, 3000);
+}